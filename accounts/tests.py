@@ -1,3 +1,77 @@
+"""
+Testy wydajności stron kont (allauth): stała liczba zapytań
+niezależnie od liczby użytkowników.
+
+Pełny zestaw dla widoków wspólnot - patrz communities/tests.py.
+"""
+
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.sites.models import Site
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from .models import CustomUser
+
+RESPONSE_TIME_CEILING = float(os.getenv('PERF_TEST_TIME_CEILING', '2.0'))
+
+# Logowanie: użytkownik, adresy email (allauth), zapis sesji, Site
+QUERY_BUDGETS = {
+    'login_page': 1,
+    'signup_page': 1,
+    'login': 13,
+}
+
+PASSWORD = 'test-password'
+
+
+class AccountPagesQueryBudgetMixin:
+    """Budżet zapytań stron logowania/rejestracji - podklasa ustawia `users`."""
+    users = None
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password(PASSWORD)
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'perf_account_{index}', email=f'perf_account_{index}@example.com', password=password)
+            for index in range(cls.users)
+        ])
+        cls.user = CustomUser.objects.get(username='perf_account_0')
+
+    def setUp(self):
+        # Zimny cache (także Site - allauth pobiera bieżącą stronę)
+        cache.clear()
+        Site.objects.clear_cache()
+
+    def request_within_budget(self, budget_name, method, url, data=None):
+        with self.assertNumQueries(QUERY_BUDGETS[budget_name]):
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, data or {})
+            elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, RESPONSE_TIME_CEILING, f'{budget_name}: {elapsed:.2f} s przy {self.users} użytkownikach')
+        return response
+
+    def test_login_page(self):
+        response = self.request_within_budget('login_page', 'get', reverse('account_login'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_signup_page(self):
+        response = self.request_within_budget('signup_page', 'get', reverse('account_signup'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_login(self):
+        response = self.request_within_budget(
+            'login', 'post', reverse('account_login'), {'login': self.user.username, 'password': PASSWORD},
+        )
+        self.assertEqual(response.status_code, 302)
+
+
+class SmallAccountPagesQueryBudgetTests(AccountPagesQueryBudgetMixin, TestCase):
+    users = 10
+
 
-# Create your tests here.
+class MediumAccountPagesQueryBudgetTests(AccountPagesQueryBudgetMixin, TestCase):
+    users = 1000
@@ -1,4 +1,14 @@
-from django.contrib import admin
+import io
+
+from django.contrib import admin, messages
+from django.db.models import Count, Min
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .counters import reconcile_member_counters
+from .forms import CommunityImportForm
+from .importer import ImportBatchError, import_communities, read_rows
+from . import services
 from .models import Tag, CommunityProfile, PersonProfile, Membership
 from accounts.models import CustomUser
 # from allauth.account.models import EmailAddress
@@ -9,6 +19,35 @@ class TagAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ['name']
 
+class CityListFilter(admin.SimpleListFilter):
+    """
+    Filtr po mieście na znormalizowanym kluczu (city_key, z indeksem).
+
+    "Kraków", "Krakow" i "krakow " to jedna pozycja na liście.
+    """
+    title = 'Miasto'
+    parameter_name = 'city_key'
+
+    # Ile najpopularniejszych miast pokazać na liście filtra
+    limit = 50
+
+    def lookups(self, request, model_admin):
+        cities = (
+            model_admin.get_queryset(request)
+            .exclude(city_key='')
+            .order_by()
+            .values('city_key')
+            .annotate(label=Min('city'), total=Count('pk'))
+            .order_by('-total', 'city_key')[:self.limit]
+        )
+        return [(row['city_key'], row['label']) for row in cities]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(city_key=self.value())
+        return queryset
+
+
 @admin.register(CommunityProfile)
 class CommunityProfileAdmin(admin.ModelAdmin):
     """
@@ -33,7 +72,7 @@ class CommunityProfileAdmin(admin.ModelAdmin):
         'is_active', 
         'is_verified', 
         'denomination', 
-        'city', 
+        CityListFilter, 
         'tags',
         ]
     search_fields = ['name', 'city', 'parish', 'description']
@@ -41,10 +80,18 @@ class CommunityProfileAdmin(admin.ModelAdmin):
     readonly_fields = [
         'created_at', 
         'updated_at',
-        'get_member_count',
+        # Liczniki członków (aktualizowane automatycznie - patrz communities/counters.py)
+        'member_count',
+        'owner_count',
+        'admin_count',
+        'leader_count',
+        'service_leader_count',
+        'regular_member_count',
         ]
 
     prepopulated_fields = {'slug': ('name',)}
+    # Przycisk "Importuj z pliku" nad listą
+    change_list_template = 'admin/communities/communityprofile/change_list.html'
 
     fieldsets = (
         ('Podstawowe informacje', {
@@ -68,6 +115,8 @@ class CommunityProfileAdmin(admin.ModelAdmin):
             'fields': (
                 'full_description', 
                 'address', 
+                'latitude', 
+                'longitude', 
                 'contact_email', 
                 'contact_phone', 
                 'website', 
@@ -81,14 +130,75 @@ class CommunityProfileAdmin(admin.ModelAdmin):
         ('Status', {
             'fields': ('is_active', 'is_verified', 'created_at', 'updated_at')
         }),
+        ('Liczniki członków', {
+            'fields': (
+                'member_count',
+                'owner_count',
+                'admin_count',
+                'leader_count',
+                'service_leader_count',
+                'regular_member_count',
+                ),
+            'classes': ('collapse',)
+        }),
     )
-    def member_count(self, obj):
-        return obj.get_member_count()
-    member_count.short_description = 'Liczba członków'
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            super().save_model(request, obj, form, change)
+            return
+        # Nowa wspólnota: założyciel (created_by) od razu jako owner, w tej samej transakcji
+        # (tagi zapisuje dalej admin - save_related)
+        services.create_community(obj, owner=obj.created_by)
+
+    def get_urls(self):
+        urls = [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='communities_communityprofile_import',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """
+        Masowy import wspólnot z pliku (CSV/JSONL) - patrz communities/importer.py.
+        """
+        if not self.has_add_permission(request):
+            return redirect('admin:communities_communityprofile_changelist')
+
+        form = CommunityImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                stats = import_communities(read_rows(upload, form.cleaned_data['file_format']))
+            except (ValueError, UnicodeDecodeError) as error:
+                messages.error(request, f'❌ Błąd pliku: {error}')
+            except ImportBatchError as error:
+                # Poprzednie partie są już zapisane - pokaż ile
+                messages.error(request, f'❌ Błąd bazy danych ({error}). Import przerwany.')
+                messages.warning(request, f'Zapisano wcześniej: {error.stats.summary()}')
+                for message in error.stats.errors:
+                    messages.warning(request, message)
+            else:
+                messages.success(request, f'✅ {stats.summary()}')
+                for message in stats.errors:
+                    messages.warning(request, message)
+                return redirect('admin:communities_communityprofile_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import wspólnot z pliku',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/communities/communityprofile/import_form.html', context)
 
 @admin.register(PersonProfile)
 class PersonProfileAdmin(admin.ModelAdmin):
     list_display = ['first_name', 'last_name', 'city', 'user', 'created_at']
+    list_filter = [CityListFilter]
     search_fields = ['first_name', 'last_name', 'city', 'user__username']
     readonly_fields = ['created_at', 'updated_at']
     
@@ -124,6 +234,8 @@ class MembershipAdmin(admin.ModelAdmin):
         'invited_by',  # ← NOWE
         ]
     list_filter = ['role', 'is_active', 'joined_date']
+    # Membership nie ma domyślnego sortowania - w adminie wg wspólnoty i hierarchii ról
+    ordering = ['community', 'role_rank', '-joined_date']
 
     search_fields = [
         'person__username', 
@@ -156,6 +268,23 @@ class MembershipAdmin(admin.ModelAdmin):
         # if db_field.name == "person":
             kwargs["queryset"] = CustomUser.objects.filter(user_type='person')
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    # Zmiany w adminie omijają widoki - przelicz liczniki dotkniętych wspólnot
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        community_ids = {obj.community_id}
+        if change and 'community' in form.changed_data:
+            community_ids.add(form.initial['community'])
+        reconcile_member_counters(community_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        reconcile_member_counters([obj.community_id])
+
+    def delete_queryset(self, request, queryset):
+        community_ids = set(queryset.values_list('community_id', flat=True))
+        super().delete_queryset(request, queryset)
+        reconcile_member_counters(community_ids)
     
 
 
@@ -0,0 +1,419 @@
+"""
+Benchmark obciążeniowy portalu (komenda benchmark_portal).
+
+Kilka wątków odtwarza ważone scenariusze ruchu:
+    browse  - anonimowe przeglądanie katalogu z filtrami (+ podpowiedzi)
+    detail  - szczegóły wspólnoty (anonimowo)
+    profile - profil zalogowanego użytkownika
+    manage  - panel zarządzania (właściciel wspólnoty)
+    churn   - zapis i wypis ze wspólnoty (join + leave)
+
+Cel (transport):
+    InProcessTransport - aplikacja WSGI w tym samym procesie (django.test.Client),
+                         bez sieci - mierzy samą aplikację i bazę
+    HttpTransport      - serwer HTTP (lokalny gunicorn, patrz local_gunicorn())
+
+Wynik: dla każdego endpointu liczba requestów, błędy, przepustowość
+i opóźnienia p50/p95/p99 (ms) - JSON do porównywania wydań.
+
+Adresy budujemy przez reverse() z nazw w communities/urls.py - zmiana
+ścieżki nie psuje benchmarku, usunięta nazwa od razu zgłosi błąd.
+
+UWAGA: scenariusz churn zmienia dane (członkostwa) - uruchamiać na bazie
+testowej (seed_portal). Logi requestów (communities.performance) też kosztują -
+przy pomiarach warto ustawić COMMUNITIES_LOG_LEVEL=WARNING.
+"""
+
+import http.client
+import math
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .models import CommunityProfile, Membership, Tag
+from .views import CommunityListView
+
+# Domyślne wagi scenariuszy (proporcje, nie muszą sumować się do 100)
+DEFAULT_WEIGHTS = {
+    'browse': 40,
+    'detail': 25,
+    'profile': 10,
+    'manage': 10,
+    'churn': 15,
+}
+
+# Ile wspólnot/użytkowników losujemy z bazy do scenariuszy
+DEFAULT_POOL_SIZE = 200
+
+# Sortowania katalogu bez wyszukiwania i położenia
+BROWSE_SORTS = [sort for sort in CommunityListView.SORT_OPTIONS if sort.lstrip('-') not in ('rank', 'distance')]
+
+Step = namedtuple('Step', 'endpoint method url data session')
+
+
+# --- Dane do scenariuszy ---
+
+def login_session(user):
+    """Klucz sesji zalogowanego użytkownika (jak po zalogowaniu, bez formularza)."""
+    client = Client()
+    client.force_login(user)
+    return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+
+class BenchmarkData:
+    """
+    Próbka danych z bazy, z której scenariusze losują parametry:
+    wspólnoty, miasta, tagi, właściciele (manage), użytkownicy (profile, churn).
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE):
+        communities = list(
+            CommunityProfile.objects.filter(is_active=True).order_by('?')
+            .values_list('pk', 'name', 'city', 'latitude', 'longitude')[:pool_size]
+        )
+        self.community_ids = [community[0] for community in communities]
+        self.search_terms = sorted({word for community in communities for word in community[1].split() if len(word) > 3})
+        self.cities = sorted({community[2] for community in communities})
+        self.locations = [(community[3], community[4]) for community in communities if community[3] is not None]
+        self.tag_ids = list(Tag.objects.values_list('pk', flat=True))
+
+        User = get_user_model()
+        owners = list(
+            Membership.objects.filter(role='owner', is_active=True, community__is_active=True)
+            .order_by('?').values_list('person_id', 'community_id')[:max(pool_size // 4, 1)]
+        )
+        users = User.objects.filter(is_active=True, person_profile__isnull=False).order_by('?')[:pool_size]
+        self.user_sessions = [login_session(user) for user in users]
+        sessions = {user.pk: login_session(user) for user in User.objects.filter(pk__in={owner for owner, _c in owners})}
+        self.owner_sessions = [(sessions[owner], community_id) for owner, community_id in owners]
+        self.csrf_token = get_random_string(32)
+
+    def cookies(self, session):
+        """Ciasteczka requestu: CSRF (POST) i - opcjonalnie - sesja."""
+        cookies = {settings.CSRF_COOKIE_NAME: self.csrf_token}
+        if session:
+            cookies[settings.SESSION_COOKIE_NAME] = session
+        return cookies
+
+
+# --- Scenariusze ---
+
+def browse_directory(rng, data):
+    """Lista wspólnot z losowym filtrem i sortowaniem, czasem podpowiedzi."""
+    variants = ['plain', 'city', 'tags', 'search']
+    if data.locations:
+        variants.append('near')
+    variant = rng.choice(variants)
+    params = {}
+    if variant == 'city':
+        params['city'] = rng.choice(data.cities)
+    elif variant == 'tags' and data.tag_ids:
+        params['tags'] = rng.sample(data.tag_ids, min(rng.randint(1, 2), len(data.tag_ids)))
+        params['tags_mode'] = rng.choice(('any', 'all'))
+    elif variant == 'search' and data.search_terms:
+        params['search'] = rng.choice(data.search_terms)
+    elif variant == 'near':
+        latitude, longitude = rng.choice(data.locations)
+        params.update(lat=f'{latitude:.4f}', lng=f'{longitude:.4f}', radius=rng.choice((5, 20, 50)))
+    if variant in ('plain', 'city', 'tags'):
+        params['sort'] = rng.choice(BROWSE_SORTS)
+
+    steps = []
+    if data.search_terms and rng.random() < 0.3:
+        # Kilka naciśnięć klawiszy w polu wyszukiwania
+        term = rng.choice(data.search_terms)
+        steps.extend(
+            Step('community_autocomplete', 'GET', reverse('communities:community_autocomplete'), {'q': term[:length]}, None)
+            for length in range(2, min(len(term), 5) + 1)
+        )
+    steps.append(Step(f'community_list[{variant}]', 'GET', reverse('communities:community_list'), params, None))
+    return steps
+
+
+def view_detail(rng, data):
+    community_id = rng.choice(data.community_ids)
+    return [Step('community_detail', 'GET', reverse('communities:community_detail', args=[community_id]), None, None)]
+
+
+def view_profile(rng, data):
+    return [Step('profile', 'GET', reverse('communities:profile'), None, rng.choice(data.user_sessions))]
+
+
+def manage_dashboard(rng, data):
+    session, community_id = rng.choice(data.owner_sessions)
+    return [Step('community_manage', 'GET', reverse('communities:community_manage', args=[community_id]), None, session)]
+
+
+def join_leave_churn(rng, data):
+    session = rng.choice(data.user_sessions)
+    community_id = rng.choice(data.community_ids)
+    return [
+        Step('join_community', 'POST', reverse('communities:join_community', args=[community_id]), None, session),
+        Step('leave_community', 'POST', reverse('communities:leave_community', args=[community_id]), None, session),
+    ]
+
+
+SCENARIOS = {
+    'browse': browse_directory,
+    'detail': view_detail,
+    'profile': view_profile,
+    'manage': manage_dashboard,
+    'churn': join_leave_churn,
+}
+
+
+def parse_weights(value):
+    """'browse=50,churn=0' → wagi scenariuszy (pozostałe domyślne)."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _sep, weight = item.partition('=')
+        if name not in SCENARIOS or not weight.isdigit():
+            raise ValueError(f'Nieprawidłowa waga "{item}" (scenariusze: {", ".join(SCENARIOS)})')
+        weights[name] = int(weight)
+    if not any(weights.values()):
+        raise ValueError('Wszystkie wagi są zerowe.')
+    return weights
+
+
+# --- Transport ---
+
+class InProcessTransport:
+    """Aplikacja WSGI w tym procesie (django.test.Client) - po jednym kliencie na wątek."""
+
+    def __init__(self):
+        self.target = 'in-process'
+        self.host = next((host for host in settings.ALLOWED_HOSTS if not host.startswith(('.', '*'))), 'localhost')
+        self.local = threading.local()
+
+    def request(self, method, url, data, cookies):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client(HTTP_HOST=self.host)
+        client.cookies = SimpleCookie(cookies)
+        # secure=True - bez przekierowania na HTTPS (SECURE_SSL_REDIRECT)
+        response = getattr(client, method.lower())(url, data or {}, secure=True)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        response.close()
+        return response.status_code
+
+    def close_thread(self):
+        connections.close_all()
+
+
+class HttpTransport:
+    """Serwer HTTP (np. lokalny gunicorn) - jedno połączenie keep-alive na wątek."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.target = base_url
+        self.netloc = parts.netloc
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.local = threading.local()
+
+    def _connection(self, reconnect=False):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or reconnect:
+            if connection is not None:
+                connection.close()
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        return connection
+
+    def request(self, method, url, data, cookies):
+        query = urlencode(data or {}, doseq=True)
+        headers = {
+            'Cookie': '; '.join(f'{name}={value}' for name, value in cookies.items()),
+            # Jak za proxy z TLS (SECURE_PROXY_SSL_HEADER) - bez przekierowania na HTTPS,
+            # Referer wymagany przez CSRF przy HTTPS
+            'X-Forwarded-Proto': 'https',
+            'Referer': f'https://{self.netloc}/',
+        }
+        body = None
+        if method == 'GET':
+            url = f'{url}?{query}' if query else url
+        else:
+            body = query
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = cookies[settings.CSRF_COOKIE_NAME]
+
+        for attempt in (1, 2):
+            connection = self._connection(reconnect=attempt > 1)
+            try:
+                connection.request(method, url, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, ConnectionError):
+                # Serwer zamknął połączenie keep-alive - jedna ponowna próba
+                if attempt > 1:
+                    raise
+
+    def close_thread(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+
+
+@contextmanager
+def local_gunicorn(base_url, workers, timeout=30):
+    """Uruchom gunicorn z aplikacją projektu na adresie base_url na czas benchmarku."""
+    parts = urlsplit(base_url)
+    application = settings.WSGI_APPLICATION.rsplit('.', 1)
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', ':'.join(application),
+            '--bind', parts.netloc, '--workers', str(workers), '--log-level', 'warning',
+        ],
+        cwd=settings.BASE_DIR,
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'gunicorn zakończył się z kodem {process.returncode}')
+            try:
+                socket.create_connection((parts.hostname, parts.port or 80), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f'gunicorn nie odpowiada na {base_url} po {timeout} s')
+                time.sleep(0.2)
+        yield
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+# --- Pomiar ---
+
+def percentile(sorted_values, percent):
+    """Percentyl metodą najbliższej rangi (sorted_values posortowane rosnąco)."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+class EndpointStats:
+    """Czasy odpowiedzi i statusy jednego endpointu."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    def record(self, latency, status):
+        self.latencies.append(latency)
+        self.statuses[str(status)] += 1
+        # 2xx i przekierowania (join/leave, logowanie) są poprawne
+        if not 200 <= status < 400:
+            self.errors += 1
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.errors += other.errors
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'latency_ms': {
+                'p50': ms(percentile(latencies, 50)),
+                'p95': ms(percentile(latencies, 95)),
+                'p99': ms(percentile(latencies, 99)),
+                'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+                'max': ms(latencies[-1]) if latencies else None,
+            },
+            'statuses': dict(sorted(self.statuses.items())),
+        }
+
+
+def _worker(transport, data, weights, rng, measure_from, deadline, results, failures):
+    names = [name for name, weight in weights.items() if weight]
+    scenario_weights = [weights[name] for name in names]
+    try:
+        while time.perf_counter() < deadline:
+            scenario = SCENARIOS[rng.choices(names, weights=scenario_weights)[0]]
+            for step in scenario(rng, data):
+                start = time.perf_counter()
+                try:
+                    status = transport.request(step.method, step.url, step.data, data.cookies(step.session))
+                except Exception as error:
+                    status = 0
+                    failures[f'{step.endpoint}: {type(error).__name__}: {error}'] += 1
+                if start >= measure_from:
+                    results.setdefault(step.endpoint, EndpointStats()).record(time.perf_counter() - start, status)
+    finally:
+        transport.close_thread()
+
+
+def run_benchmark(transport, data, weights=None, duration=30.0, warmup=3.0, concurrency=4, seed=1):
+    """
+    Uruchom `concurrency` wątków na `warmup + duration` sekund. Zwraca raport (dict).
+
+    Requesty z rozgrzewki (warmup) nie są liczone. Każdy wątek ma własny
+    generator losowy (seed + numer wątku) - ta sama sekwencja scenariuszy.
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    per_thread = [({}, Counter()) for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(transport, data, weights, random.Random(seed + index), measure_from, deadline, results, failures),
+            daemon=True,
+        )
+        for index, (results, failures) in enumerate(per_thread)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Ostatnie requesty mogły skończyć się chwilę po deadline
+    elapsed = max(time.perf_counter() - measure_from, 0.0)
+
+    endpoints = {}
+    failures = Counter()
+    for results, thread_failures in per_thread:
+        for endpoint, stats in results.items():
+            endpoints.setdefault(endpoint, EndpointStats()).merge(stats)
+        failures.update(thread_failures)
+    total = EndpointStats()
+    for stats in endpoints.values():
+        total.merge(stats)
+
+    return {
+        'target': transport.target,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'warmup_s': warmup,
+        'seed': seed,
+        'weights': weights,
+        'total': total.summary(elapsed),
+        'endpoints': {endpoint: stats.summary(elapsed) for endpoint, stats in sorted(endpoints.items())},
+        'failures': dict(failures.most_common(20)),
+    }
@@ -0,0 +1,141 @@
+"""
+Liczniki członków zapisane w CommunityProfile (denormalizacja).
+
+Zamiast liczyć COUNT(*) na memberships przy każdym wyświetleniu,
+wspólnota ma pola:
+    member_count          - wszyscy aktywni członkowie
+    owner_count, admin_count, leader_count,
+    service_leader_count, regular_member_count - rozbicie na role
+
+Liczniki są aktualizowane jednym UPDATE ... SET x = x + 1 (F()),
+w tej samej transakcji co zmiana Membership (join/leave/usunięcie/zmiana roli).
+Gdyby coś się rozjechało (np. edycja w adminie, ręczne zmiany w bazie)
+- komenda `python manage.py reconcile_member_counters` przelicza je od nowa.
+"""
+
+from django.db.models import Count, F, Q
+
+from .models import CommunityProfile, Membership
+
+# Rola → pole licznika w CommunityProfile
+ROLE_COUNTER_FIELDS = {
+    'owner': 'owner_count',
+    'admin': 'admin_count',
+    'leader': 'leader_count',
+    'service_leader': 'service_leader_count',
+    'member': 'regular_member_count',
+}
+
+ALL_COUNTER_FIELDS = ['member_count', *ROLE_COUNTER_FIELDS.values()]
+
+
+def apply_counter_delta(community_id, delta):
+    """
+    Zmień liczniki wspólnoty o podane wartości (jedno zapytanie UPDATE).
+
+    delta - słownik {pole: zmiana}, np. {'member_count': 1, 'owner_count': 1}
+    """
+    delta = {field: change for field, change in delta.items() if change}
+    if not delta:
+        return
+    CommunityProfile.objects.filter(pk=community_id).update(
+        **{field: F(field) + change for field, change in delta.items()}
+    )
+
+
+def membership_added(community_id, role):
+    """Nowy aktywny członek z daną rolą."""
+    apply_counter_delta(community_id, {'member_count': 1, ROLE_COUNTER_FIELDS[role]: 1})
+
+
+def membership_removed(community_id, role):
+    """Aktywny członek z daną rolą usunięty lub dezaktywowany."""
+    apply_counter_delta(community_id, {'member_count': -1, ROLE_COUNTER_FIELDS[role]: -1})
+
+
+def membership_role_changed(community_id, old_role, new_role):
+    """Zmiana roli aktywnego członka (łączna liczba członków bez zmian)."""
+    if old_role == new_role:
+        return
+    apply_counter_delta(community_id, {
+        ROLE_COUNTER_FIELDS[old_role]: -1,
+        ROLE_COUNTER_FIELDS[new_role]: 1,
+    })
+
+
+def memberships_changed(community_id, removed_roles=(), added_roles=()):
+    """
+    Wiele zmian naraz (akcje zbiorcze w panelu zarządzania) - jedno zapytanie UPDATE.
+
+    removed_roles - role członków, którzy przestali być aktywni
+    added_roles   - role nowych aktywnych członków
+    Zmiana roli = stara rola w removed_roles + nowa w added_roles.
+    """
+    delta = dict.fromkeys(ALL_COUNTER_FIELDS, 0)
+    for role in removed_roles:
+        delta['member_count'] -= 1
+        delta[ROLE_COUNTER_FIELDS[role]] -= 1
+    for role in added_roles:
+        delta['member_count'] += 1
+        delta[ROLE_COUNTER_FIELDS[role]] += 1
+    apply_counter_delta(community_id, delta)
+
+
+def count_members(community_ids):
+    """
+    Policz (od nowa) aktywnych członków podanych wspólnot - jednym zapytaniem GROUP BY.
+
+    Zwraca {community_id: {pole_licznika: wartość}}.
+    """
+    aggregates = {'member_count': Count('pk')}
+    for role, field in ROLE_COUNTER_FIELDS.items():
+        aggregates[field] = Count('pk', filter=Q(role=role))
+
+    rows = (
+        Membership.objects
+        .filter(community_id__in=community_ids, is_active=True)
+        .order_by()
+        .values('community_id')
+        .annotate(**aggregates)
+    )
+    counts = {pk: dict.fromkeys(ALL_COUNTER_FIELDS, 0) for pk in community_ids}
+    for row in rows:
+        community_id = row.pop('community_id')
+        counts[community_id] = row
+    return counts
+
+
+def reconcile_member_counters(community_ids=None, batch_size=1000, dry_run=False):
+    """
+    Porównaj zapisane liczniki z faktycznym stanem i popraw rozbieżności.
+
+    community_ids - opcjonalnie tylko wybrane wspólnoty (domyślnie wszystkie)
+    Zwraca liczbę poprawionych wspólnot.
+    """
+    queryset = CommunityProfile.objects.order_by('pk').only('pk', *ALL_COUNTER_FIELDS)
+    if community_ids is not None:
+        queryset = queryset.filter(pk__in=community_ids)
+
+    fixed = 0
+    last_pk = 0
+    while True:
+        # Paczkami po pk (bez OFFSET)
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        counts = count_members([community.pk for community in batch])
+        drifted = []
+        for community in batch:
+            actual = counts[community.pk]
+            if any(getattr(community, field) != actual[field] for field in ALL_COUNTER_FIELDS):
+                for field in ALL_COUNTER_FIELDS:
+                    setattr(community, field, actual[field])
+                drifted.append(community)
+
+        if drifted and not dry_run:
+            CommunityProfile.objects.bulk_update(drifted, ALL_COUNTER_FIELDS)
+        fixed += len(drifted)
+
+    return fixed
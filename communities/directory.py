@@ -0,0 +1,163 @@
+"""
+Filtry katalogu wspólnot (lista wspólnot, liczniki filtrów, cache).
+
+Parametry GET są najpierw normalizowane (normalize_filters) - dzięki temu
+"?city=Kraków " i "?city=Kraków" to ten sam zestaw filtrów
+(i ten sam klucz w cache).
+Potem filter_communities() buduje z nich queryset.
+
+CACHE WYNIKÓW:
+Wyniki katalogu (lista ID + liczba wyników) i facety są trzymane w cache.
+Każdy klucz zawiera "generację" katalogu - token zmieniany przez sygnały
+przy każdej zmianie wspólnoty lub jej tagów. Po zmianie wszystkie stare
+klucze po prostu przestają być używane (i same wygasają).
+"""
+
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+
+from .geo import DEFAULT_RADIUS_KM, MAX_RADIUS_KM, filter_nearby
+from .models import CommunityProfile
+from .search import search_communities
+from .tagging import TAGS_MODE_ALL, TAGS_MODE_ANY, filter_by_tags
+from .text import fold_text
+
+DIRECTORY_GENERATION_KEY = 'communities:directory:generation'
+
+# Największe ID tagu (bigint) - większe liczby z URL-a są pomijane
+MAX_TAG_ID = 2 ** 63 - 1
+
+
+def normalize_filters(params):
+    """
+    Zamień parametry GET na słownik filtrów w postaci kanonicznej.
+
+    - puste wartości są pomijane
+    - tekst jest przycięty (strip)
+    - miasto jest znormalizowane ("Kraków " i "krakow" to ten sam filtr)
+    - lista tagów (?tags=1&tags=3) to posortowane, unikalne liczby całkowite
+      (+ ?tags_mode=all - wspólnota musi mieć wszystkie)
+    - położenie (?lat=50.06&lng=19.94&radius=20) - liczby, promień w km
+    """
+    filters = {}
+    for name in ('search', 'city', 'denomination', 'tag'):
+        value = (params.get(name) or '').strip()
+        if value:
+            filters[name] = value
+
+    if 'city' in filters:
+        filters['city'] = fold_text(filters['city'])
+        if not filters['city']:
+            del filters['city']
+
+    tag_ids = sorted({
+        int(value) for value in params.getlist('tags')
+        if value.strip().isdecimal() and 0 < int(value) <= MAX_TAG_ID
+    })
+    if tag_ids:
+        filters['tags'] = tag_ids
+        # Domyślnie którykolwiek z tagów, ?tags_mode=all - wszystkie naraz
+        if params.get('tags_mode') == TAGS_MODE_ALL:
+            filters['tags_mode'] = TAGS_MODE_ALL
+
+    location = _parse_location(params)
+    if location:
+        filters.update(location)
+
+    return filters
+
+
+def _parse_location(params):
+    """
+    Punkt i promień wyszukiwania "w pobliżu" - albo None (brak/błędne dane).
+
+    Współrzędne zaokrąglone do ~100 m - bliskie punkty dają ten sam klucz cache.
+    """
+    try:
+        latitude = float(params.get('lat', ''))
+        longitude = float(params.get('lng', ''))
+    except ValueError:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+
+    try:
+        radius = float(params.get('radius') or DEFAULT_RADIUS_KM)
+    except ValueError:
+        radius = DEFAULT_RADIUS_KM
+    radius = min(max(radius, 1), MAX_RADIUS_KM)
+
+    return {'lat': round(latitude, 3), 'lng': round(longitude, 3), 'radius': radius}
+
+
+def get_directory_generation():
+    """Aktualna generacja katalogu (część kluczy cache)."""
+    generation = cache.get(DIRECTORY_GENERATION_KEY)
+    if generation is None:
+        cache.add(DIRECTORY_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(DIRECTORY_GENERATION_KEY)
+    return generation
+
+
+def bump_directory_generation():
+    """
+    Unieważnij wszystkie zapamiętane wyniki katalogu (wywoływane z sygnałów).
+
+    Generacja to losowy token, nie licznik - po wypadnięciu klucza z cache
+    nie wrócimy do starej generacji (i starych wyników). Zapis przez set()
+    bez wygasania: cache.incr() w FileBasedCache to get+set z domyślnym
+    TIMEOUT i nie jest atomowy między workerami.
+    """
+    cache.set(DIRECTORY_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def filters_cache_key(prefix, filters):
+    """
+    Stabilny klucz cache dla zestawu filtrów (i aktualnej generacji katalogu).
+    """
+    digest = hashlib.md5(
+        json.dumps(filters, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+    return f'{prefix}:g{get_directory_generation()}:{digest}'
+
+
+def filter_communities(filters, queryset=None):
+    """
+    Zastosuj filtry katalogu do querysetu aktywnych wspólnot.
+
+    Wynik NIE jest posortowany. Przy wyszukiwaniu ma adnotację `rank`.
+    """
+    if queryset is None:
+        queryset = CommunityProfile.objects.filter(is_active=True)
+
+    # Wyszukiwanie pełnotekstowe (nazwa > tagi > miasto > opis)
+    # Indeks GIN na search_vector - patrz communities/search.py
+    if 'search' in filters:
+        queryset = search_communities(queryset, filters['search'])
+
+    # Filtrowanie po mieście - prefiks znormalizowanego klucza ("krak" → Kraków)
+    # LIKE 'krak%' korzysta z indeksu varchar_pattern_ops
+    if 'city' in filters:
+        queryset = queryset.filter(city_key__startswith=filters['city'])
+
+    # Filtrowanie po denominacji
+    if 'denomination' in filters:
+        queryset = queryset.filter(denomination=filters['denomination'])
+
+    # Filtrowanie tag (tylko jeden z dropdown)
+    if 'tag' in filters:
+        queryset = queryset.filter(tags__slug=filters['tag'])
+
+    # Filtrowanie po tagach - WYBÓR WIELU
+    # Którykolwiek / wszystkie z wybranych tagów - warunek na tablicy tag_ids (GIN), bez JOIN-a
+    if 'tags' in filters:
+        queryset = filter_by_tags(queryset, filters['tags'], filters.get('tags_mode', TAGS_MODE_ANY))
+
+    # Wspólnoty w pobliżu - adnotacja `distance` (km)
+    if 'lat' in filters:
+        queryset = filter_nearby(queryset, filters['lat'], filters['lng'], filters['radius'])
+
+    return queryset
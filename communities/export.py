@@ -0,0 +1,103 @@
+"""
+Eksport listy członków wspólnoty (CSV / JSONL) - strumieniowo.
+
+Wspólnota może mieć dziesiątki tysięcy członków. Zamiast budować cały
+plik w pamięci, wiersze pobieramy kursorem po stronie serwera
+(queryset.iterator(chunk_size=...)) i od razu wysyłamy do przeglądarki
+(StreamingHttpResponse). Zużycie pamięci jest stałe - niezależne
+od liczby członków.
+
+    rows = member_export_rows(community)
+    response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+"""
+
+import csv
+import json
+
+from .models import Membership
+
+# Ile wierszy pobierać z bazy naraz (kursor po stronie serwera)
+EXPORT_CHUNK_SIZE = 2000
+
+# Obsługiwane formaty: format -> (content_type, rozszerzenie pliku)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+# Początki komórek, które Excel/LibreOffice traktują jak formułę (tylko CSV)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Kolumny eksportu (klucze w JSONL, nagłówek w CSV)
+EXPORT_COLUMNS = ('first_name', 'last_name', 'username', 'role', 'joined_date', 'invited_by')
+
+
+def member_export_rows(community):
+    """
+    Aktywni członkowie wspólnoty jako krotki (w kolejności EXPORT_COLUMNS).
+
+    Jedno zapytanie (JOIN z profilem i zapraszającym), czytane partiami.
+    """
+    role_names = dict(Membership.ROLE_CHOICES)
+    rows = (
+        Membership.objects
+        .filter(community=community, is_active=True)
+        .order_by('role_rank', '-joined_date', '-pk')
+        .values_list(
+            'person__person_profile__first_name',
+            'person__person_profile__last_name',
+            'person__username',
+            'role',
+            'joined_date',
+            'invited_by__username',
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for first_name, last_name, username, role, joined_date, invited_by in rows:
+        yield (
+            first_name or '',
+            last_name or '',
+            username,
+            role_names.get(role, role),
+            joined_date.isoformat(),
+            invited_by or '',
+        )
+
+
+class _Echo:
+    """Udaje plik dla csv.writer - zwraca zapisany wiersz zamiast go buforować."""
+
+    def write(self, value):
+        return value
+
+
+def _safe_cell(value):
+    """
+    Komórka, której arkusz nie potraktuje jak formuły (CSV injection).
+
+    Tekst wpisany przez użytkownika ("=HYPERLINK(...)", "+48...", "@SUM")
+    dostaje na początku apostrof - Excel pokaże go jako zwykły tekst.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    """Wiersze jako kolejne linie CSV (z BOM - żeby Excel poprawnie czytał polskie znaki)."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow([_safe_cell(value) for value in row])
+
+
+def stream_jsonl(rows):
+    """Wiersze jako JSON Lines (jeden obiekt JSON na linię)."""
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+
+
+EXPORT_STREAMS = {
+    'csv': stream_csv,
+    'jsonl': stream_jsonl,
+}
@@ -0,0 +1,99 @@
+"""
+Liczniki filtrów (facety) dla katalogu wspólnot.
+
+Przy każdej denominacji, mieście i tagu w formularzu filtrów pokazujemy
+ile wspólnot znajdzie się po jego wybraniu - użytkownik nie wybiera filtra,
+który da pustą stronę.
+
+Zamiast jednego COUNT na każdą wartość (N zapytań) robimy trzy zapytania
+GROUP BY: denominacje, miasta, tagi. Wynik trafia na chwilę do cache
+(klucz = znormalizowany zestaw filtrów).
+"""
+
+from django.core.cache import cache
+from django.db.models import Count, Min
+
+from .directory import filter_communities, filters_cache_key
+from .models import CommunityProfile, Tag
+from .tagging import TAGS_MODE_ALL
+
+# Jak długo (w sekundach) trzymać policzone facety w cache
+FACETS_CACHE_TIMEOUT = 60
+
+# Ile najpopularniejszych miast pokazać
+CITY_FACETS_LIMIT = 10
+
+
+def _without(filters, *names):
+    """Filtry bez podanych wymiarów."""
+    return {name: value for name, value in filters.items() if name not in names}
+
+
+def _matching(filters):
+    """Podzapytanie z ID pasujących wspólnot (bez sortowania, bez DISTINCT w GROUP BY)."""
+    return filter_communities(filters).order_by().values('pk')
+
+
+def compute_facets(filters):
+    """
+    Policz facety dla wspólnot pasujących do filtrów (3 zapytania).
+
+    Każdy wymiar liczymy BEZ jego własnego filtra - po wybraniu denominacji
+    pozostałe denominacje dalej pokazują, ile wspólnot by znalazły
+    (inaczej wszystkie miałyby 0 i byłyby zablokowane). Tagi w trybie
+    "wszystkie" zostają w filtrze - licznik mówi, ile zostanie po dodaniu tagu.
+
+    Zwraca słownik:
+        'denomination' - {wartość: liczba}
+        'city'         - [(miasto, liczba), ...] - najpopularniejsze
+        'tag'          - {id_tagu: liczba}
+    """
+    denominations = {
+        row['denomination']: row['count']
+        for row in (
+            CommunityProfile.objects
+            .filter(pk__in=_matching(_without(filters, 'denomination')))
+            .order_by()
+            .values('denomination')
+            .annotate(count=Count('pk'))
+        )
+    }
+
+    # Grupowanie po znormalizowanym kluczu - "Kraków" i "krakow" to jedno miasto
+    cities = [
+        (row['name'], row['count'])
+        for row in (
+            CommunityProfile.objects
+            .filter(pk__in=_matching(_without(filters, 'city')))
+            .order_by()
+            .values('city_key')
+            .annotate(name=Min('city'), count=Count('pk'))
+            .order_by('-count', 'city_key')[:CITY_FACETS_LIMIT]
+        )
+    ]
+
+    tag_dimension = ('tag',) if filters.get('tags_mode') == TAGS_MODE_ALL else ('tag', 'tags', 'tags_mode')
+    tags = {
+        row['pk']: row['count']
+        for row in (
+            Tag.objects
+            .filter(communities__in=_matching(_without(filters, *tag_dimension)))
+            .order_by()
+            .values('pk')
+            .annotate(count=Count('communities'))
+        )
+    }
+
+    return {'denomination': denominations, 'city': cities, 'tag': tags}
+
+
+def get_facets(filters):
+    """
+    Facety z krótkotrwałego cache (albo policzone od nowa).
+    """
+    key = filters_cache_key('communities:facets', filters)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(filters)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
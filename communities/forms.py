@@ -5,6 +5,7 @@ Zawiera formularze do:
 - Tworzenia wspólnoty
 - Edycji profilu wspólnoty
 - Edycji profilu osoby (później)
+- Masowego importu wspólnot (admin)
 """
 
 from django import forms
@@ -199,4 +200,17 @@ class CommunityEditForm(forms.ModelForm):
         labels = {
             'full_description': 'Pełny opis działalności',
             'address': 'Adres (ulica, nr budynku)',
-        }
\ No newline at end of file
+        }
+
+
+class CommunityImportForm(forms.Form):
+    """
+    Upload pliku do masowego importu wspólnot (panel admina).
+    Format pliku - patrz communities/importer.py.
+    """
+    file = forms.FileField(label='Plik CSV lub JSONL')
+    file_format = forms.ChoiceField(
+        label='Format',
+        choices=(('csv', 'CSV'), ('jsonl', 'JSONL')),
+        initial='csv',
+    )
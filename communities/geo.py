@@ -0,0 +1,81 @@
+"""
+Wyszukiwanie wspólnot w pobliżu ("wspólnoty blisko mnie").
+
+Wspólnota może mieć współrzędne (latitude/longitude) - uzupełniane
+komendą geocode_communities z lokalnego pliku z miastami.
+
+Zapytanie "w promieniu 20 km" działa w dwóch krokach:
+    1. prostokąt (bounding box) wokół punktu - zwykłe warunki BETWEEN,
+       korzystają z indeksu (latitude, longitude), więc baza czyta
+       tylko wspólnoty z okolicy, a nie całą tabelę
+    2. dokładna odległość (wzór haversine) - liczona tylko dla tych kandydatów
+"""
+
+import math
+
+from django.db.models import FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+# Średni promień Ziemi (km)
+EARTH_RADIUS_KM = 6371.0
+
+# Domyślny i maksymalny promień wyszukiwania (km)
+DEFAULT_RADIUS_KM = 20
+MAX_RADIUS_KM = 200
+
+# Promienie do wyboru w formularzu "Blisko mnie" (km)
+RADIUS_OPTIONS = (5, 10, 20, 50, 100)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Prostokąt (min_lat, max_lat, min_lng, max_lng) zawierający okrąg o danym promieniu.
+
+    Jeśli prostokąt obejmuje biegun albo przechodzi przez południk 180°,
+    zakres długości to None (filtrujemy wtedy tylko po szerokości).
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    lng_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(latitude))))
+    min_lng, max_lng = longitude - lng_delta, longitude + lng_delta
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, None, None
+
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def distance_expression(latitude, longitude):
+    """
+    Odległość (km) wspólnoty od punktu - wzór haversine jako wyrażenie SQL.
+    """
+    lat = math.radians(latitude)
+    lng = math.radians(longitude)
+    half_dlat = (Radians('latitude') - lat) / 2
+    half_dlng = (Radians('longitude') - lng) / 2
+    a = Power(Sin(half_dlat), 2) + math.cos(lat) * Cos(Radians('latitude')) * Power(Sin(half_dlng), 2)
+    return (2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def filter_nearby(queryset, latitude, longitude, radius_km=DEFAULT_RADIUS_KM):
+    """
+    Wspólnoty w promieniu radius_km od punktu, z adnotacją `distance` (km).
+
+    Wynik NIE jest posortowany (sortowanie: order_by('distance', 'pk')).
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+
+    # Krok 1: prostokąt - indeks (latitude, longitude)
+    box = Q(latitude__range=(min_lat, max_lat))
+    if min_lng is not None:
+        box &= Q(longitude__range=(min_lng, max_lng))
+
+    # Krok 2: dokładna odległość tylko dla kandydatów z prostokąta
+    return (
+        queryset
+        .filter(box)
+        .annotate(distance=distance_expression(latitude, longitude))
+        .filter(distance__lte=radius_km)
+    )
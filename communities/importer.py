@@ -0,0 +1,356 @@
+"""
+Masowy import wspólnot i członkostw (CSV / JSONL).
+
+Wdrożenie np. całej diecezji to setki wspólnot i tysiące członkostw.
+Formularz tworzenia (i admin) zapisuje wspólnoty po jednej: pętla
+szukająca wolnego sluga, sygnały, liczniki, dokument wyszukiwania...
+Tutaj wiersze przetwarzamy PARTIAMI (domyślnie po 1000) i każda partia to
+stała liczba zapytań, niezależnie od jej wielkości:
+
+    - tagi i użytkownicy:       po jednym SELECT (+ bulk_create brakujących tagów)
+    - slugi:                    jedno zapytanie o zajęte slugi (communities/slugs.py)
+    - wspólnoty, tagi (M2M), członkostwa i dokument wyszukiwania:
+      services.create_communities() - bulk_create z licznikami członków,
+      city_key, tag_ids i role_rank ustawionymi od razu, jeden UPDATE dokumentów
+
+bulk_create omija save() i sygnały - to, co normalnie robią sygnały
+(cache katalogu, podpowiedzi, wersje ról), robimy tu raz na koniec.
+
+Format wiersza (nagłówki CSV / klucze JSONL):
+    name, city, description, parish, denomination, denomination_other,
+    address, contact_email, contact_phone, website, latitude, longitude,
+    tags     - nazwy tagów: "modlitwa;młodzież" (w JSONL może być lista)
+    owner    - nazwa użytkownika właściciela
+    members  - "jan;anna:leader;piotr:admin" (rola po dwukropku, domyślnie member;
+               w JSONL może być lista)
+
+    with open('wspolnoty.csv', encoding='utf-8-sig') as file:
+        stats = import_communities(read_rows(file, 'csv'))
+"""
+
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils.text import slugify
+
+from .counters import ROLE_COUNTER_FIELDS
+from .directory import bump_directory_generation
+from .models import CommunityProfile, Membership, Tag
+from .permissions import bump_membership_versions
+from .services import create_communities
+from .slugs import SAVE_ATTEMPTS, allocate_slugs, is_slug_conflict
+from .text import fold_text
+from .typeahead import typeahead_index
+
+# Ile wierszy przetwarzać w jednej partii (jednej transakcji)
+IMPORT_BATCH_SIZE = 1000
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# Proste pola tekstowe wspólnoty przepisywane z pliku 1:1
+TEXT_FIELDS = (
+    'name', 'city', 'description', 'parish', 'address',
+    'contact_email', 'contact_phone', 'website',
+)
+
+# Separator list w CSV (tagi, członkowie)
+LIST_SEPARATOR = ';'
+
+
+class ImportBatchError(DatabaseError):
+    """
+    Błąd bazy w jednej partii importu.
+
+    Poprzednie partie są już zapisane - `stats` mówi ile (z czasem do chwili błędu),
+    `first_line` i `last_line` - które wiersze pliku były w nieudanej partii.
+    """
+
+    def __init__(self, error, stats, first_line, last_line):
+        super().__init__(f'wiersze {first_line}-{last_line}: {error}')
+        self.stats = stats
+        self.first_line = first_line
+        self.last_line = last_line
+
+
+class ImportStats:
+    """Podsumowanie importu (ile zapisano, ile pominięto, jak szybko)."""
+
+    # Ile błędów zapamiętać do raportu
+    MAX_ERRORS = 50
+
+    def __init__(self):
+        self.rows = 0
+        self.communities = 0
+        self.memberships = 0
+        self.tags_created = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(f'wiersz {line}: {message}')
+
+    def warn(self, message):
+        """Uwaga, która nie pomija wiersza (np. nieznany użytkownik)."""
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(message)
+
+    def merge(self, other):
+        """Dolicz wyniki zatwierdzonej partii."""
+        self.communities += other.communities
+        self.memberships += other.memberships
+        self.tags_created += other.tags_created
+        for message in other.errors:
+            self.warn(message)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (
+            f'Wspólnot: {self.communities}, członkostw: {self.memberships}, '
+            f'nowych tagów: {self.tags_created}, pominięto wierszy: {self.skipped} '
+            f'- {self.rows} wierszy w {self.elapsed:.2f} s ({self.rows_per_second:.0f} wierszy/s)'
+        )
+
+
+def read_rows(file, file_format):
+    """
+    Wiersze pliku jako słowniki (leniwie - plik nie jest wczytywany w całości).
+
+    file - plik tekstowy (dla uploadu: io.TextIOWrapper(upload, encoding='utf-8-sig'))
+    """
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+    elif file_format == 'jsonl':
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f'Nieznany format importu: {file_format}')
+
+
+def _split_list(value):
+    """'a; b;;c' albo ['a', 'b'] → ['a', 'b', 'c']"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def _parse_members(value, owner):
+    """Członkowie wiersza: {username: rola} (właściciel z kolumny owner ma zawsze rolę owner)."""
+    members = {}
+    for entry in _split_list(value):
+        username, _sep, role = entry.partition(':')
+        role = role.strip() or 'member'
+        if role not in ROLE_COUNTER_FIELDS:
+            raise ValueError(f'nieznana rola "{role}" ({username})')
+        username = username.strip()
+        # Ta sama osoba dwa razy → zostaje wyższa rola
+        if username not in members or Membership.ROLE_RANKS[role] < Membership.ROLE_RANKS[members[username]]:
+            members[username] = role
+    if owner:
+        members[owner] = 'owner'
+    return members
+
+
+def _parse_coordinate(value, limit):
+    if value in (None, ''):
+        return None
+    coordinate = float(value)
+    if not -limit <= coordinate <= limit:
+        raise ValueError(f'współrzędna poza zakresem: {value}')
+    return coordinate
+
+
+def parse_row(row):
+    """
+    Wiersz pliku → słownik gotowy do zapisu.
+
+    Rzuca ValueError z opisem, jeśli wiersza nie da się zaimportować.
+    """
+    data = {field: str(row.get(field) or '').strip() for field in TEXT_FIELDS}
+    if not data['name']:
+        raise ValueError('brak nazwy wspólnoty')
+    if not data['city']:
+        raise ValueError('brak miasta')
+    for field in TEXT_FIELDS:
+        max_length = CommunityProfile._meta.get_field(field).max_length
+        if max_length and len(data[field]) > max_length:
+            raise ValueError(f'pole {field} dłuższe niż {max_length} znaków')
+
+    denomination = str(row.get('denomination') or '').strip()
+    denomination_other = str(row.get('denomination_other') or '').strip()
+    if denomination and denomination not in dict(CommunityProfile.DENOMINATION_CHOICES):
+        # Nieznana denominacja → "Inna" z nazwą z pliku
+        denomination, denomination_other = 'other', denomination_other or denomination
+    data['denomination'] = denomination
+    data['denomination_other'] = denomination_other[:100]
+
+    data['latitude'] = _parse_coordinate(row.get('latitude'), 90)
+    data['longitude'] = _parse_coordinate(row.get('longitude'), 180)
+
+    owner = str(row.get('owner') or '').strip()
+    data['owner'] = owner
+    data['tags'] = _split_list(row.get('tags'))
+    data['members'] = _parse_members(row.get('members'), owner)
+    return data
+
+
+def _resolve_tags(rows, stats):
+    """
+    Nazwy tagów → ID (brakujące tagi tworzone jednym bulk_create).
+
+    Nazwy porównujemy po fold_text ("Młodzież" = "mlodziez") - tagów jest
+    niewiele, więc czytamy wszystkie jednym zapytaniem.
+    """
+    names = {name for row in rows for name in row['tags']}
+    if not names:
+        return {}
+    tags = {fold_text(name): pk for name, pk in Tag.objects.values_list('name', 'pk')}
+    missing = {}
+    for name in names:
+        if fold_text(name) not in tags:
+            missing.setdefault(fold_text(name), name[:50])
+    if missing:
+        # Wyścig z innym importem/adminem (albo zajęty slug) → ignore_conflicts, potem czytamy ID
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slugify(name)[:50] or key[:50]) for key, name in missing.items()],
+            ignore_conflicts=True,
+        )
+        created = dict(Tag.objects.filter(name__in=missing.values()).values_list('name', 'pk'))
+        stats.tags_created += len(created)
+        tags.update((fold_text(name), pk) for name, pk in created.items())
+        for name in missing.values():
+            if name not in created:
+                stats.warn(f'nie udało się utworzyć tagu "{name}" (zajęty slug)')
+    return {name: tags[fold_text(name)] for name in names if fold_text(name) in tags}
+
+
+def _resolve_users(rows):
+    """Nazwy użytkowników (właściciele + członkowie) → ID, jedno zapytanie."""
+    usernames = {username for row in rows for username in row['members']}
+    if not usernames:
+        return {}
+    return dict(
+        get_user_model().objects
+        .filter(username__in=usernames, user_type='person')
+        .values_list('username', 'pk')
+    )
+
+
+def _import_batch(rows, stats):
+    """
+    Zapisz jedną partię: lista (numer_wiersza, sparsowany wiersz).
+
+    Zwraca (ID wspólnot, ID osób). Wyniki dopisuje do stats (osobny obiekt
+    na każdą próbę - patrz import_communities).
+    """
+    parsed = [row for _line, row in rows]
+    tag_ids = _resolve_tags(parsed, stats)
+    user_ids = _resolve_users(parsed)
+    slugs = allocate_slugs(CommunityProfile, [row['name'] for row in parsed])
+
+    communities = []
+    members = []
+    for (line, row), slug in zip(rows, slugs):
+        # Nieznani użytkownicy są pomijani (wspólnota i tak powstaje)
+        roles = {user_ids[username]: role for username, role in row['members'].items() if username in user_ids}
+        unknown = [username for username in row['members'] if username not in user_ids]
+        if unknown:
+            stats.warn(f'wiersz {line}: nieznani użytkownicy: {", ".join(unknown[:5])}')
+
+        community = CommunityProfile(
+            **{field: row[field] for field in TEXT_FIELDS},
+            slug=slug,
+            city_key=fold_text(row['city']),
+            denomination=row['denomination'],
+            denomination_other=row['denomination_other'],
+            latitude=row['latitude'],
+            longitude=row['longitude'],
+            created_by_id=user_ids.get(row['owner']),
+            tag_ids=sorted({tag_ids[name] for name in row['tags'] if name in tag_ids}),
+        )
+        communities.append(community)
+        members.append(roles)
+
+    # Wspólnoty + tagi + członkostwa (liczniki ustawione od razu) - communities/services.py
+    memberships = create_communities(communities, members)
+
+    community_ids = [community.pk for community in communities]
+
+    stats.communities += len(communities)
+    stats.memberships += len(memberships)
+    return community_ids, {membership.person_id for membership in memberships}
+
+
+def import_communities(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Zaimportuj wspólnoty z wierszy (np. read_rows(...)). Zwraca ImportStats.
+
+    Każda partia w osobnej transakcji - błąd bazy przerywa import na bieżącej
+    partii (poprzednie zostają zapisane) i kończy się ImportBatchError.
+    Konflikt slugów z równoległym zapisem → partia jest powtarzana z nowymi slugami
+    (inne naruszenia ograniczeń - od razu ImportBatchError).
+    """
+    stats = ImportStats()
+    numbered = enumerate(rows, start=1)
+    person_ids = set()
+    imported = []
+    try:
+        while True:
+            batch = list(islice(numbered, batch_size))
+            if not batch:
+                break
+            stats.rows += len(batch)
+
+            parsed = []
+            for line, raw in batch:
+                try:
+                    parsed.append((line, parse_row(raw)))
+                except (ValueError, TypeError) as error:
+                    stats.error(line, error)
+            if not parsed:
+                continue
+
+            for attempt in range(1, SAVE_ATTEMPTS + 1):
+                batch_stats = ImportStats()
+                try:
+                    with transaction.atomic():
+                        community_ids, batch_person_ids = _import_batch(parsed, batch_stats)
+                    break
+                except IntegrityError as error:
+                    # Ponawiamy tylko konflikt slugów (równoległy zapis) - inne naruszenia
+                    # (klucz obcy, NOT NULL...) za drugim razem skończą się tak samo
+                    if attempt == SAVE_ATTEMPTS or not is_slug_conflict(CommunityProfile, error):
+                        raise ImportBatchError(error, stats, batch[0][0], batch[-1][0]) from error
+                except DatabaseError as error:
+                    raise ImportBatchError(error, stats, batch[0][0], batch[-1][0]) from error
+            stats.merge(batch_stats)
+            imported.extend(community_ids)
+            person_ids |= batch_person_ids
+    finally:
+        # To, co zwykle robią sygnały - raz dla całego importu
+        if imported:
+            bump_directory_generation()
+            bump_membership_versions(person_ids)
+            if typeahead_index.built_at is not None:
+                imported_communities = CommunityProfile.objects.filter(pk__in=imported).only('name', 'city', 'is_active')
+                for community in imported_communities.iterator(chunk_size=batch_size):
+                    typeahead_index.update_community(community)
+        stats.finish()
+    return stats
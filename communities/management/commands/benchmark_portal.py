@@ -0,0 +1,106 @@
+"""
+Komenda: python manage.py benchmark_portal --duration 60 --concurrency 8 --output wynik.json
+
+Benchmark obciążeniowy (communities/benchmark.py): ważone scenariusze ruchu,
+przepustowość i opóźnienia p50/p95/p99 na endpoint, wynik w JSON.
+
+    benchmark_portal                                  # aplikacja w tym procesie
+    benchmark_portal --url http://127.0.0.1:8000      # działający serwer
+    benchmark_portal --gunicorn-workers 4 --warmup 30 # uruchom lokalny gunicorn
+
+Świeże workery gunicorna pierwsze requesty obsługują kilka sekund
+(rozgrzewka cache, indeks podpowiedzi) - --warmup powinien to pokryć.
+
+Dane: najpierw seed_portal. Scenariusz churn zmienia członkostwa -
+NIE uruchamiać na produkcji.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from communities.benchmark import (
+    DEFAULT_POOL_SIZE,
+    BenchmarkData,
+    HttpTransport,
+    InProcessTransport,
+    local_gunicorn,
+    parse_weights,
+    run_benchmark,
+)
+
+DEFAULT_GUNICORN_URL = 'http://127.0.0.1:8765'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark obciążeniowy: przepustowość i opóźnienia p50/p95/p99 na endpoint (JSON).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=30.0, help='Czas pomiaru w sekundach (domyślnie 30)')
+        parser.add_argument('--warmup', type=float, default=3.0, help='Rozgrzewka bez pomiaru, w sekundach (domyślnie 3)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Liczba równoległych wątków (domyślnie 4)')
+        parser.add_argument('--seed', type=int, default=1, help='Ziarno losowania scenariuszy (domyślnie 1)')
+        parser.add_argument(
+            '--weights', default='',
+            help='Wagi scenariuszy, np. "browse=50,churn=0" (browse, detail, profile, manage, churn)',
+        )
+        parser.add_argument(
+            '--pool-size', type=int, default=DEFAULT_POOL_SIZE,
+            help=f'Ile wspólnot/użytkowników losować z bazy (domyślnie {DEFAULT_POOL_SIZE})',
+        )
+        parser.add_argument('--url', help='Adres serwera HTTP (domyślnie aplikacja w tym procesie)')
+        parser.add_argument(
+            '--gunicorn-workers', type=int, default=0,
+            help=f'Uruchom lokalny gunicorn z N workerami (na --url, domyślnie {DEFAULT_GUNICORN_URL})',
+        )
+        parser.add_argument('--label', default='', help='Etykieta wyniku (np. numer wydania)')
+        parser.add_argument('--output', help='Zapisz JSON do pliku (domyślnie na standardowe wyjście)')
+
+    def handle(self, *args, **options):
+        try:
+            weights = parse_weights(options['weights'])
+        except ValueError as error:
+            raise CommandError(str(error))
+        if options['concurrency'] < 1 or options['duration'] <= 0:
+            raise CommandError('--concurrency i --duration muszą być dodatnie.')
+
+        data = BenchmarkData(pool_size=options['pool_size'])
+        if not data.community_ids:
+            raise CommandError('Brak wspólnot w bazie - najpierw: python manage.py seed_portal')
+        # Scenariusze bez danych (np. brak właścicieli) są pomijane
+        missing = {'manage': data.owner_sessions, 'profile': data.user_sessions, 'churn': data.user_sessions}
+        for name, pool in missing.items():
+            if weights[name] and not pool:
+                self.stderr.write(f'⚠️ Pomijam scenariusz {name} - brak danych w bazie')
+                weights[name] = 0
+
+        url = options['url']
+        if options['gunicorn_workers'] > 0:
+            url = url or DEFAULT_GUNICORN_URL
+        transport = HttpTransport(url) if url else InProcessTransport()
+
+        benchmark = dict(
+            transport=transport, data=data, weights=weights, duration=options['duration'],
+            warmup=options['warmup'], concurrency=options['concurrency'], seed=options['seed'],
+        )
+        try:
+            if options['gunicorn_workers'] > 0:
+                with local_gunicorn(url, options['gunicorn_workers']):
+                    report = run_benchmark(**benchmark)
+            else:
+                report = run_benchmark(**benchmark)
+        except RuntimeError as error:
+            raise CommandError(str(error))
+        report = {'label': options['label'], **report}
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            total = report['total']
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {total["requests"]} requestów, {total["throughput_rps"]} req/s, '
+                f'p95 {total["latency_ms"]["p95"]} ms, błędów: {total["errors"]} → {options["output"]}'
+            ))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,104 @@
+"""
+Komenda: python manage.py geocode_communities miasta.csv
+
+Uzupełnia współrzędne wspólnot (latitude/longitude) na podstawie miasta,
+korzystając z LOKALNEGO pliku z miejscowościami (bez zewnętrznego API).
+
+Format pliku (CSV, z nagłówkiem):
+    city,latitude,longitude
+    Kraków,50.0614,19.9366
+    Warszawa,52.2297,21.0122
+
+Miasta są porównywane po znormalizowanym kluczu (city_key),
+więc "Krakow" w pliku pasuje do "Kraków" we wspólnocie.
+"""
+
+import csv
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from communities.directory import bump_directory_generation
+from communities.models import CommunityProfile
+from communities.text import fold_text
+
+
+class Command(BaseCommand):
+    help = 'Uzupełnij współrzędne wspólnot z lokalnego pliku z miejscowościami (CSV).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('gazetteer', help='Plik CSV z kolumnami: city, latitude, longitude')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Ile wspólnot zapisywać w jednej paczce (domyślnie 1000)',
+        )
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Nadpisz też wspólnoty, które mają już współrzędne',
+        )
+
+    def load_gazetteer(self, path):
+        """Słownik city_key → (latitude, longitude)."""
+        places = {}
+        try:
+            with open(path, newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    try:
+                        coordinates = (float(row['latitude']), float(row['longitude']))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    key = fold_text(row.get('city'))
+                    if key:
+                        places.setdefault(key, coordinates)
+        except OSError as error:
+            raise CommandError(f'Nie można odczytać pliku {path}: {error}')
+        return places
+
+    def handle(self, *args, **options):
+        places = self.load_gazetteer(options['gazetteer'])
+        if not places:
+            raise CommandError('Plik nie zawiera żadnych miejscowości (kolumny: city, latitude, longitude).')
+        self.stdout.write(f'Wczytano miejscowości: {len(places)}')
+
+        communities = CommunityProfile.objects.order_by('pk').only('pk', 'city_key')
+        if not options['overwrite']:
+            communities = communities.filter(latitude__isnull=True)
+
+        batch_size = options['batch_size']
+        updated = 0
+        missing = Counter()
+        batch = []
+        last_pk = 0
+
+        # Partiami po pk - nie trzymamy całej tabeli w pamięci
+        while True:
+            chunk = list(communities.filter(pk__gt=last_pk)[:batch_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            for community in chunk:
+                coordinates = places.get(community.city_key)
+                if coordinates is None:
+                    missing[community.city_key] += 1
+                    continue
+                community.latitude, community.longitude = coordinates
+                batch.append(community)
+
+            if batch:
+                CommunityProfile.objects.bulk_update(batch, ['latitude', 'longitude'])
+                updated += len(batch)
+                batch = []
+
+        if updated:
+            # bulk_update nie wysyła sygnałów - unieważnij cache katalogu ręcznie
+            bump_directory_generation()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Uzupełniono współrzędne {updated} wspólnot.'))
+        if missing:
+            self.stdout.write(f'Nie znaleziono miejscowości dla {sum(missing.values())} wspólnot, najczęstsze:')
+            for city_key, count in missing.most_common(10):
+                self.stdout.write(f'  {city_key or "(brak miasta)"}: {count}')
@@ -0,0 +1,53 @@
+"""
+Komenda: python manage.py import_communities wspolnoty.csv
+
+Masowy import wspólnot z członkostwami (CSV albo JSONL) - partiami,
+przez bulk_create. Format pliku opisany w communities/importer.py.
+
+Przykład CSV:
+    name,city,description,tags,owner,members
+    Oaza Młodzieżowa,Kraków,Spotkania w piątki,modlitwa;młodzież,jan,anna:leader;piotr
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from communities.importer import (
+    IMPORT_BATCH_SIZE, IMPORT_FORMATS, ImportBatchError, import_communities, read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = 'Masowy import wspólnot i członkostw z pliku CSV/JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Plik CSV lub JSONL')
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='Format pliku (domyślnie wg rozszerzenia)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Ile wierszy w jednej partii/transakcji (domyślnie {IMPORT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as file:
+                stats = import_communities(read_rows(file, file_format), batch_size=options['batch_size'])
+        except OSError as error:
+            raise CommandError(f'Nie można odczytać pliku {path}: {error}')
+        except ValueError as error:
+            # Np. uszkodzona linia JSON - poprzednie partie zostają zapisane
+            raise CommandError(f'Błąd pliku {path}: {error}')
+        except ImportBatchError as error:
+            raise CommandError(f'Błąd bazy danych ({error}). Zapisano wcześniej: {error.stats.summary()}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {stats.summary()}'))
+        for message in stats.errors:
+            self.stdout.write(f'  {message}')
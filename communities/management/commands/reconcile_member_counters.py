@@ -0,0 +1,46 @@
+"""
+Komenda: python manage.py reconcile_member_counters
+
+Przelicza od nowa liczniki członków (member_count, owner_count, ...)
+zapisane w CommunityProfile i poprawia rozbieżności.
+Uruchamiaj np. po ręcznych zmianach w bazie albo okresowo (cron).
+"""
+
+from django.core.management.base import BaseCommand
+
+from communities.counters import reconcile_member_counters
+
+
+class Command(BaseCommand):
+    help = 'Przelicz liczniki członków wspólnot i popraw rozbieżności.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'community_ids',
+            nargs='*',
+            type=int,
+            help='ID wspólnot do sprawdzenia (domyślnie wszystkie)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Ile wspólnot sprawdzać w jednej paczce (domyślnie 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Tylko pokaż ile wspólnot ma błędne liczniki, nic nie zapisuj',
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_member_counters(
+            community_ids=options['community_ids'] or None,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'Wspólnoty z rozbieżnymi licznikami: {fixed}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Poprawiono liczniki {fixed} wspólnot.'))
@@ -0,0 +1,59 @@
+"""
+Komenda: python manage.py seed_portal --users 50000 --communities 20000 --memberships 1000000
+
+Dane syntetyczne do benchmarków i testów obciążeniowych (communities/seeding.py):
+użytkownicy z profilami, wspólnoty, skośny rozkład tagów i członkostw.
+Ten sam --seed daje te same dane. Użytkownicy mają hasło --password
+(benchmark_portal loguje się nimi).
+
+NIE uruchamiać na produkcji.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from communities.seeding import seed_portal
+from communities.services import BULK_INSERT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Generuje syntetyczne dane (użytkownicy, wspólnoty, członkostwa) do benchmarków.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Liczba użytkowników (domyślnie 10000)')
+        parser.add_argument('--communities', type=int, default=5000, help='Liczba wspólnot (domyślnie 5000)')
+        parser.add_argument(
+            '--memberships', type=int, default=100000,
+            help='Docelowa łączna liczba członkostw (domyślnie 100000)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Ziarno generatora (domyślnie 42)')
+        parser.add_argument('--prefix', default='seed_', help='Prefiks nazw użytkowników (domyślnie seed_)')
+        parser.add_argument('--password', default='seed-password', help='Hasło wszystkich użytkowników')
+        parser.add_argument(
+            '--batch-size', type=int, default=BULK_INSERT_BATCH_SIZE,
+            help=(
+                f'Wielkość partii: użytkownicy w jednym INSERT, wspólnoty (z członkostwami) '
+                f'w partiach 5x mniejszych (domyślnie {BULK_INSERT_BATCH_SIZE})'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['communities'], options['batch_size']) < 1:
+            raise CommandError('--users, --communities i --batch-size muszą być dodatnie.')
+        if get_user_model().objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f'Istnieją już użytkownicy z prefiksem "{options["prefix"]}" - użyj innego --prefix.'
+            )
+
+        verbose = options['verbosity'] > 1
+        stats = seed_portal(
+            users=options['users'],
+            communities=options['communities'],
+            memberships=options['memberships'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            password=options['password'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write if verbose else (lambda message: None),
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ {stats.summary()}'))
@@ -0,0 +1,144 @@
+"""
+Lista członków w panelu zarządzania wspólnotą (CommunityManageView).
+
+Zamiast osobnego zapytania dla każdej roli (właściciele, administratorzy,
+liderzy, członkowie) - i renderowania wszystkich tysięcy członków naraz -
+pobieramy JEDNYM zapytaniem tylko to, co widać na ekranie:
+
+    - członków dzielimy na sekcje (CASE po roli)
+    - w każdej sekcji numerujemy wiersze (ROW_NUMBER() OVER (PARTITION BY sekcja))
+      i liczymy wszystkich (COUNT(*) OVER (PARTITION BY sekcja))
+    - zostawiamy tylko wiersze z aktualnej strony KAŻDEJ sekcji
+
+Potem w Pythonie rozkładamy wynik na sekcje i budujemy obiekty Page
+(każda sekcja ma własny parametr strony: ?owners_page=2, ?members_page=5).
+Opcjonalne wyszukiwanie (?q=) po nazwie użytkownika, imieniu i nazwisku.
+"""
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Case, CharField, Count, F, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from .models import Membership
+
+# Ile osób na stronę w każdej sekcji
+MEMBERS_PER_PAGE = 25
+
+# Sekcje panelu: (klucz, tytuł, klasa CSS nagłówka, role)
+MEMBER_SECTIONS = (
+    ('owners', '👑 Właściciele', 'text-primary', ('owner',)),
+    ('admins', '⚙️ Administratorzy', 'text-info', ('admin',)),
+    ('leaders', '🌟 Liderzy', 'text-success', ('leader', 'service_leader')),
+    ('members', '👤 Członkowie', '', ('member',)),
+)
+
+# Liczniki z CommunityProfile dla każdej sekcji (bez wyszukiwania znamy liczby z góry)
+SECTION_COUNTERS = {
+    'owners': ('owner_count',),
+    'admins': ('admin_count',),
+    'leaders': ('leader_count', 'service_leader_count'),
+    'members': ('regular_member_count',),
+}
+
+
+class MemberSection:
+    """Jedna sekcja panelu: tytuł + strona członków (Page)."""
+
+    def __init__(self, key, title, css_class, page):
+        self.key = key
+        self.title = title
+        self.css_class = css_class
+        self.page = page
+
+    @property
+    def page_param(self):
+        return f'{self.key}_page'
+
+    # Parametry linków paginacji (dla {% querystring %} - nazwa parametru zależy od sekcji)
+    @property
+    def previous_page_params(self):
+        return {self.page_param: self.page.previous_page_number()}
+
+    @property
+    def next_page_params(self):
+        return {self.page_param: self.page.next_page_number()}
+
+
+def _page_number(params, key, total, per_page):
+    try:
+        number = int(params.get(f'{key}_page', 1))
+    except (TypeError, ValueError):
+        number = 1
+    number = max(number, 1)
+    if total is not None:
+        # Nie wychodź poza ostatnią stronę
+        number = min(number, max((total - 1) // per_page + 1, 1))
+    return number
+
+
+def load_member_sections(community, params, per_page=MEMBERS_PER_PAGE):
+    """
+    Sekcje członków wspólnoty (jedno zapytanie).
+
+    params - request.GET (numery stron sekcji i wyszukiwanie ?q=)
+    Zwraca listę MemberSection (także pustych - template je pomija).
+    """
+    search = (params.get('q') or '').strip()
+
+    # Bez wyszukiwania liczby członków w sekcjach są w licznikach wspólnoty
+    known_totals = {}
+    if not search:
+        for key, fields in SECTION_COUNTERS.items():
+            known_totals[key] = sum(getattr(community, field) for field in fields)
+
+    pages = {
+        key: _page_number(params, key, known_totals.get(key), per_page)
+        for key, _title, _css, _roles in MEMBER_SECTIONS
+    }
+
+    section = Case(
+        *[When(role__in=roles, then=Value(key)) for key, _title, _css, roles in MEMBER_SECTIONS],
+        output_field=CharField(),
+    )
+    queryset = (
+        Membership.objects
+        .filter(community=community, is_active=True)
+        .select_related('person__person_profile')
+        .annotate(section=section)
+    )
+    if search:
+        queryset = queryset.filter(
+            Q(person__username__icontains=search)
+            | Q(person__person_profile__first_name__icontains=search)
+            | Q(person__person_profile__last_name__icontains=search)
+        )
+
+    queryset = queryset.annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('section')],
+            order_by=[F('role_rank'), F('joined_date').desc(), F('pk').desc()],
+        ),
+        section_total=Window(Count('pk'), partition_by=[F('section')]),
+    )
+
+    # Tylko wiersze z aktualnej strony każdej sekcji
+    visible = Q()
+    for key, number in pages.items():
+        start = (number - 1) * per_page
+        visible |= Q(section=key, position__gt=start, position__lte=start + per_page)
+    rows = queryset.filter(visible).order_by('position')
+
+    by_section = {key: [] for key in pages}
+    totals = dict(known_totals)
+    for membership in rows:
+        by_section[membership.section].append(membership)
+        totals[membership.section] = membership.section_total
+
+    sections = []
+    for key, title, css_class, _roles in MEMBER_SECTIONS:
+        paginator = Paginator([], per_page)
+        paginator.count = totals.get(key, 0)  # bez osobnego COUNT(*)
+        page = Page(by_section[key], pages[key], paginator)
+        sections.append(MemberSection(key, title, css_class, page))
+    return sections
@@ -0,0 +1,275 @@
+"""
+Middleware pomiaru wydajności requestów.
+
+Dla każdego (próbkowanego) requestu mierzy:
+    db    - liczba zapytań SQL i łączny czas bazy (connection.execute_wrapper)
+    tpl   - czas renderowania szablonu (TemplateResponse - widoki klasowe, allauth)
+    view  - czas widoku bez szablonu (widoki funkcyjne z render() liczą tu też szablon)
+    total - cały request od tego middleware w dół
+
+Wynik trafia do nagłówka Server-Timing (widoczny w DevTools przeglądarki)
+i do logu 'communities.performance' (jedna linia na request, pola w `extra`).
+
+Ustawienia (settings.py):
+    PERF_TIMING_SAMPLE_RATE - jaka część requestów jest mierzona (0.0 - 1.0)
+    PERF_TIMING_HEADER      - czy wysyłać nagłówek Server-Timing (domyślnie DEBUG)
+
+Pliki statyczne i media (STATIC_URL, MEDIA_URL) nie są mierzone.
+
+Odpowiedzi strumieniowe (eksport członków) - zapytania wykonane podczas
+wysyłania pliku nie są już liczone.
+
+WYKRYWANIE N+1 (NPlusOneMiddleware):
+Zapomniany select_related/prefetch_related w szablonie (np. pętla po
+membership.person.person_profile) to setki zapytań o TYM SAMYM kształcie.
+Middleware normalizuje SQL każdego zapytania (bez liczb, tekstów, list IN)
+i jeśli jeden kształt powtórzy się co najmniej NPLUSONE_THRESHOLD razy:
+    NPLUSONE_MODE = 'raise' - NPlusOneError (testy - test nie przejdzie)
+    NPLUSONE_MODE = 'warn'  - ostrzeżenie w logu ze stosem wywołań (staging)
+    NPLUSONE_MODE = 'off'   - middleware wyłączony (produkcja)
+"""
+
+import logging
+import random
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('communities.performance')
+nplusone_logger = logging.getLogger('communities.nplusone')
+
+
+class QueryRecorder:
+    """
+    execute_wrapper zliczający zapytania i ich łączny czas.
+
+    Podpinany pod wszystkie połączenia na czas jednego requestu.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - start)
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+
+
+class RequestTiming:
+    """Pomiary jednego requestu."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = QueryRecorder()
+        self.template = 0.0
+        self.total = 0.0
+        self._template_started = None
+
+    def template_started(self):
+        self._template_started = time.perf_counter()
+
+    def template_finished(self, response):
+        if self._template_started is not None:
+            self.template = time.perf_counter() - self._template_started
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    @property
+    def view(self):
+        return max(self.total - self.template, 0.0)
+
+    def server_timing(self):
+        """Wartość nagłówka Server-Timing (czasy w milisekundach)."""
+        return ', '.join([
+            f'db;dur={self.queries.duration * 1000:.1f};desc="{self.queries.count} queries"',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'view;dur={self.view * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+
+class PerformanceTimingMiddleware:
+    """
+    Pomiar czasu requestu: Server-Timing + linia w logu.
+
+    Umieść na początku MIDDLEWARE (po SecurityMiddleware), żeby objąć
+    również zapytania innych middleware (sesja, użytkownik).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_TIMING_SAMPLE_RATE', 1.0)
+        self.send_header = getattr(settings, 'PERF_TIMING_HEADER', settings.DEBUG)
+        # WhiteNoise jest niżej - bez tego każdy plik CSS/JS to linia w logu
+        self.skip_prefixes = tuple(
+            prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL)
+            if prefix and prefix.startswith('/')
+        )
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+        if self.skip_prefixes and request.path.startswith(self.skip_prefixes):
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        request.performance_timing = timing
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing.queries))
+            response = self.get_response(request)
+        timing.finish()
+
+        if self.send_header:
+            response['Server-Timing'] = timing.server_timing()
+        self.log(request, response, timing)
+        return response
+
+    def process_template_response(self, request, response):
+        # Szablon renderuje się PO wszystkich process_template_response - mierzymy callbackiem
+        timing = getattr(request, 'performance_timing', None)
+        if timing is not None:
+            timing.template_started()
+            response.add_post_render_callback(timing.template_finished)
+        return response
+
+    def log(self, request, response, timing):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else ''
+        logger.info(
+            '%s %s %s %.1fms db=%.1fms/%dq tpl=%.1fms view=%.1fms',
+            request.method, request.path, response.status_code,
+            timing.total * 1000, timing.queries.duration * 1000, timing.queries.count,
+            timing.template * 1000, timing.view * 1000,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'view_name': view_name,
+                'status': response.status_code,
+                'total_ms': round(timing.total * 1000, 1),
+                'db_ms': round(timing.queries.duration * 1000, 1),
+                'db_queries': timing.queries.count,
+                'template_ms': round(timing.template * 1000, 1),
+                'view_ms': round(timing.view * 1000, 1),
+            },
+        )
+
+
+# --- Wykrywanie N+1 ---
+
+class NPlusOneError(Exception):
+    """Request wykonał wiele zapytań o tym samym kształcie (brak select_related?)."""
+
+
+# Normalizacja SQL: wartości → "?", listy IN (...) → jedna pozycja
+_SQL_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),                # teksty
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),              # liczby
+    (re.compile(r'%s'), '?'),                            # parametry
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),   # IN (?, ?, ?)
+    (re.compile(r'\s+'), ' '),
+)
+
+# Zapytania sterujące transakcją - powtarzają się naturalnie
+_IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK', 'BEGIN', 'COMMIT')
+
+
+def fingerprint_sql(sql):
+    """Kształt zapytania: ten sam SQL z innymi wartościami → ten sam odcisk."""
+    for pattern, replacement in _SQL_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def _caller_stack():
+    """Stos wywołań ograniczony do kodu projektu (bez Django i bibliotek)."""
+    frames = traceback.extract_stack()[:-3]
+    project = [
+        frame for frame in frames
+        if str(settings.BASE_DIR) in frame.filename
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(project or frames[-10:]))
+
+
+class FingerprintRecorder(QueryRecorder):
+    """QueryRecorder, który dodatkowo liczy zapytania wg kształtu."""
+
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+        self.fingerprints = Counter()
+        self.stacks = {}
+
+    def record(self, sql, duration):
+        super().record(sql, duration)
+        if sql.lstrip().upper().startswith(_IGNORED_PREFIXES):
+            return
+        fingerprint = fingerprint_sql(sql)
+        self.fingerprints[fingerprint] += 1
+        if self.fingerprints[fingerprint] == self.threshold:
+            # Stos z miejsca, w którym powtórzenie przekroczyło próg (pętla w szablonie/widoku)
+            self.stacks[fingerprint] = _caller_stack()
+
+    def repeated(self):
+        """[(odcisk, liczba powtórzeń, stos)] dla kształtów powyżej progu."""
+        return [
+            (fingerprint, count, self.stacks.get(fingerprint, ''))
+            for fingerprint, count in self.fingerprints.most_common()
+            if count >= self.threshold
+        ]
+
+
+class NPlusOneMiddleware:
+    """
+    Wykrywanie N+1: powtarzające się zapytania o tym samym kształcie.
+
+    Ustawienia: NPLUSONE_MODE ('raise' / 'warn' / 'off'), NPLUSONE_THRESHOLD.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = getattr(settings, 'NPLUSONE_MODE', 'off')
+        self.threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 10)
+        if self.mode not in ('raise', 'warn'):
+            raise MiddlewareNotUsed  # produkcja - zero narzutu
+
+    def __call__(self, request):
+        recorder = FingerprintRecorder(self.threshold)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            # Odpowiedź wraca już wyrenderowana - zapytania z szablonu są policzone
+            response = self.get_response(request)
+
+        repeated = recorder.repeated()
+        if repeated:
+            self.report(request, repeated)
+        return response
+
+    def report(self, request, repeated):
+        summary = '; '.join(f'{count}x {fingerprint[:200]}' for fingerprint, count, _stack in repeated)
+        message = f'N+1: {request.method} {request.path} - {summary}'
+        if self.mode == 'raise':
+            raise NPlusOneError(f'{message}\n{repeated[0][2]}')
+        for fingerprint, count, stack in repeated:
+            nplusone_logger.warning(
+                'N+1: %s %s - %dx %s\n%s',
+                request.method, request.path, count, fingerprint[:500], stack,
+                extra={'path': request.path, 'count': count, 'fingerprint': fingerprint},
+            )
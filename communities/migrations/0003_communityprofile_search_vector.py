@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-16 20:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, StringAgg, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Zbuduj dokument wyszukiwania dla istniejących wspólnot."""
+    CommunityProfile = apps.get_model('communities', 'CommunityProfile')
+    through = CommunityProfile.tags.through
+    tag_names = (
+        through.objects
+        .filter(communityprofile_id=OuterRef('pk'))
+        .order_by()
+        .values('communityprofile_id')
+        .annotate(names=StringAgg('tag__name', delimiter=Value(' ')))
+        .values('names')
+    )
+    CommunityProfile.objects.update(
+        search_vector=(
+            SearchVector('name', weight='A', config='simple')
+            + SearchVector(Coalesce(Subquery(tag_names), Value(''), output_field=TextField()), weight='B', config='simple')
+            + SearchVector('city', weight='C', config='simple')
+            + SearchVector('description', weight='D', config='simple')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0002_alter_membership_person'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communityprofile',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Dokument wyszukiwania'),
+        ),
+        migrations.AddIndex(
+            model_name='communityprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='community_search_gin'),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-16 20:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0003_communityprofile_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communityprofile',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='community_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communityprofile',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name', 'id'], name='community_active_name_idx'),
+        ),
+    ]
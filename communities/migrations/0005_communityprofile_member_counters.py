@@ -0,0 +1,78 @@
+# Generated by Django 6.0.1 on 2026-10-16 20:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_member_counters(apps, schema_editor):
+    """Policz członków istniejących wspólnot (jedno zapytanie UPDATE)."""
+    CommunityProfile = apps.get_model('communities', 'CommunityProfile')
+    Membership = apps.get_model('communities', 'Membership')
+
+    def active_count(**filters):
+        counted = (
+            Membership.objects
+            .filter(community_id=OuterRef('pk'), is_active=True, **filters)
+            .order_by()
+            .values('community_id')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(counted), 0)
+
+    CommunityProfile.objects.update(
+        member_count=active_count(),
+        owner_count=active_count(role='owner'),
+        admin_count=active_count(role='admin'),
+        leader_count=active_count(role='leader'),
+        service_leader_count=active_count(role='service_leader'),
+        regular_member_count=active_count(role='member'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0004_communityprofile_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communityprofile',
+            name='admin_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Liczba administratorów'),
+        ),
+        migrations.AddField(
+            model_name='communityprofile',
+            name='leader_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Liczba liderów'),
+        ),
+        migrations.AddField(
+            model_name='communityprofile',
+            name='member_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Liczba członków'),
+        ),
+        migrations.AddField(
+            model_name='communityprofile',
+            name='owner_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Liczba właścicieli'),
+        ),
+        migrations.AddField(
+            model_name='communityprofile',
+            name='regular_member_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Liczba zwykłych członków'),
+        ),
+        migrations.AddField(
+            model_name='communityprofile',
+            name='service_leader_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Liczba liderów diakonii'),
+        ),
+        migrations.AddIndex(
+            model_name='communityprofile',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-member_count', '-id'], name='community_active_popular_idx'),
+        ),
+        migrations.RunPython(backfill_member_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-16 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+from communities.text import fold_text
+
+# Ile wierszy aktualizować na raz
+BATCH_SIZE = 1000
+
+
+def backfill_city_keys(apps, schema_editor):
+    """Ustaw city_key istniejącym wspólnotom i osobom (partiami po BATCH_SIZE)."""
+    for model_name in ('CommunityProfile', 'PersonProfile'):
+        Model = apps.get_model('communities', model_name)
+        last_pk = 0
+        while True:
+            batch = list(Model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'city')[:BATCH_SIZE])
+            if not batch:
+                break
+            for obj in batch:
+                obj.city_key = fold_text(obj.city)
+            Model.objects.bulk_update(batch, ['city_key'])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0006_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communityprofile',
+            name='city_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Miasto (klucz)'),
+        ),
+        migrations.AddField(
+            model_name='personprofile',
+            name='city_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Miasto (klucz)'),
+        ),
+        migrations.RunPython(backfill_city_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='communityprofile',
+            index=models.Index(fields=['city_key'], name='community_city_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='personprofile',
+            index=models.Index(fields=['city_key'], name='person_city_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-16 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0007_city_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communityprofile',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Szerokość geograficzna'),
+        ),
+        migrations.AddField(
+            model_name='communityprofile',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Długość geograficzna'),
+        ),
+        migrations.AddIndex(
+            model_name='communityprofile',
+            index=models.Index(condition=models.Q(('is_active', True), ('latitude__isnull', False)), fields=['latitude', 'longitude'], name='community_active_geo_idx'),
+        ),
+    ]
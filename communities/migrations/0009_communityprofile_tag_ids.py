@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-16 20:59
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import migrations, models
+from django.db.models import OuterRef
+
+
+def backfill_tag_ids(apps, schema_editor):
+    """Skopiuj tagi istniejących wspólnot do tablicy tag_ids (jedno zapytanie UPDATE)."""
+    CommunityProfile = apps.get_model('communities', 'CommunityProfile')
+    through = CommunityProfile.tags.through
+    CommunityProfile.objects.update(
+        tag_ids=ArraySubquery(
+            through.objects
+            .filter(communityprofile_id=OuterRef('pk'))
+            .order_by('tag_id')
+            .values('tag_id')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0008_communityprofile_coordinates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communityprofile',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, verbose_name='ID tagów'),
+        ),
+        migrations.RunPython(backfill_tag_ids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='communityprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='community_tag_ids_gin'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-16 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+# Kopia Membership.ROLE_RANKS z chwili tworzenia migracji
+ROLE_RANKS = {
+    'owner': 0,
+    'admin': 1,
+    'leader': 2,
+    'service_leader': 3,
+    'member': 4,
+}
+
+
+def backfill_role_rank(apps, schema_editor):
+    """Ustaw rangę roli istniejącym członkostwom (jedno zapytanie UPDATE)."""
+    Membership = apps.get_model('communities', 'Membership')
+    Membership.objects.update(
+        role_rank=Case(
+            *[When(role=role, then=Value(rank)) for role, rank in ROLE_RANKS.items()],
+            default=Value(ROLE_RANKS['member']),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0009_communityprofile_tag_ids'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='membership',
+            options={'verbose_name': 'Członkostwo', 'verbose_name_plural': 'Członkostwa'},
+        ),
+        migrations.AddField(
+            model_name='membership',
+            name='role_rank',
+            field=models.PositiveSmallIntegerField(default=4, editable=False, verbose_name='Ranga roli'),
+        ),
+        migrations.RunPython(backfill_role_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['community', 'is_active', 'role_rank', '-joined_date'], name='membership_community_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['person', 'is_active'], name='membership_person_active_idx'),
+        ),
+    ]
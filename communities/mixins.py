@@ -9,6 +9,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from .models import CommunityProfile
+from .permissions import get_membership_resolver
 
 
 class CommunityPermissionMixin(LoginRequiredMixin):
@@ -51,11 +52,8 @@ class CommunityPermissionMixin(LoginRequiredMixin):
             return True
         
         # Sprawdź czy użytkownik ma odpowiednią rolę we wspólnocie
-        return self.community.memberships.filter(
-            person=self.request.user,
-            role__in=self.required_roles,
-            is_active=True
-        ).exists()
+        # (role użytkownika pobierane raz na request - patrz communities/permissions.py)
+        return get_membership_resolver(self.request.user).has_role(self.community, self.required_roles)
     
     def get_context_data(self, **kwargs):
         """
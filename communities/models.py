@@ -1,6 +1,11 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import URLValidator
+from .slugs import save_with_unique_slug
+from .text import fold_text
 
 class Tag(models.Model):
     """
@@ -13,6 +18,10 @@ class Tag(models.Model):
         verbose_name = 'Tag'
         verbose_name_plural = 'Tagi'
         ordering = ['name']
+        indexes = [
+            # Podpowiedzi przy literówkach (pg_trgm) - patrz communities/suggestions.py
+            GinIndex(fields=['name'], name='tag_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return self.name
@@ -53,6 +62,8 @@ class CommunityProfile(models.Model):
     slug = models.SlugField(max_length=200, unique=True, blank=True, verbose_name='Slug (URL)')
     description = models.TextField(verbose_name='Krótki opis', max_length=500)
     city = models.CharField(max_length=100, verbose_name='Miasto')
+    # Znormalizowane miasto do filtrowania: "Kraków " → "krakow" (ustawiane w save())
+    city_key = models.CharField(max_length=100, blank=True, editable=False, verbose_name='Miasto (klucz)')
     parish = models.CharField(max_length=200, blank=True, verbose_name='Parafia')
 
     # Denominacja
@@ -83,10 +94,15 @@ class CommunityProfile(models.Model):
     
     # Tagi
     tags = models.ManyToManyField(Tag, blank=True, related_name='communities', verbose_name='Tagi')
+    # Kopia ID tagów jako tablica - szybki filtr po wielu tagach (patrz communities/tagging.py)
+    tag_ids = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False, verbose_name='ID tagów')
     
     # Dodatkowe informacje (podstrona "Informacje")
     full_description = models.TextField(blank=True, verbose_name='Pełny opis działalności')
     address = models.CharField(max_length=300, blank=True, verbose_name='Adres')
+    # Współrzędne (wyszukiwanie "blisko mnie") - komenda geocode_communities
+    latitude = models.FloatField(null=True, blank=True, verbose_name='Szerokość geograficzna')
+    longitude = models.FloatField(null=True, blank=True, verbose_name='Długość geograficzna')
     contact_email = models.EmailField(blank=True, verbose_name='Email kontaktowy')
     contact_phone = models.CharField(max_length=20, blank=True, verbose_name='Telefon')
     website = models.URLField(blank=True, verbose_name='Strona WWW')
@@ -109,11 +125,65 @@ class CommunityProfile(models.Model):
     # Status
     is_active = models.BooleanField(default=True, verbose_name='Profil aktywny')
     is_verified = models.BooleanField(default=False, verbose_name='Zweryfikowana')
+
+    # Wyszukiwanie pełnotekstowe - dokument (nazwa > tagi > miasto > opis)
+    # Uzupełniany automatycznie przez sygnały (patrz communities/search.py)
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name='Dokument wyszukiwania')
+
+    # Liczniki członków (denormalizacja) - aktualizowane razem ze zmianą Membership
+    # Patrz communities/counters.py
+    member_count = models.IntegerField(default=0, editable=False, verbose_name='Liczba członków')
+    owner_count = models.IntegerField(default=0, editable=False, verbose_name='Liczba właścicieli')
+    admin_count = models.IntegerField(default=0, editable=False, verbose_name='Liczba administratorów')
+    leader_count = models.IntegerField(default=0, editable=False, verbose_name='Liczba liderów')
+    service_leader_count = models.IntegerField(default=0, editable=False, verbose_name='Liczba liderów diakonii')
+    regular_member_count = models.IntegerField(default=0, editable=False, verbose_name='Liczba zwykłych członków')
+
+    # Pola utrzymywane zapytaniami UPDATE (liczniki, sygnały) - save() istniejącej
+    # wspólnoty ich NIE zapisuje, żeby nie nadpisać nowszych wartości starymi z formularza
+    DENORMALIZED_FIELDS = frozenset({
+        'member_count', 'owner_count', 'admin_count', 'leader_count',
+        'service_leader_count', 'regular_member_count', 'search_vector', 'tag_ids',
+    })
     
     class Meta:
         verbose_name = 'Profil wspólnoty'
         verbose_name_plural = 'Profile wspólnot'
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='community_search_gin'),
+            # Filtr po wielu tagach: tag_ids @> / && ARRAY[...]
+            GinIndex(fields=['tag_ids'], name='community_tag_ids_gin'),
+            # Podpowiedzi przy literówkach (pg_trgm) - patrz communities/suggestions.py
+            GinIndex(fields=['name'], name='community_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['city'], name='community_city_trgm', opclasses=['gin_trgm_ops']),
+            # Filtr miasta: równość lub prefiks (LIKE 'krak%') na znormalizowanym kluczu
+            models.Index(fields=['city_key'], name='community_city_key_idx', opclasses=['varchar_pattern_ops']),
+            # Paginacja kursorowa listy wspólnot - jeden indeks na każde sortowanie
+            # (kolumna sortowania + id, tylko aktywne wspólnoty)
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='community_active_created_idx',
+            ),
+            models.Index(
+                fields=['name', 'id'],
+                condition=models.Q(is_active=True),
+                name='community_active_name_idx',
+            ),
+            # Wspólnoty w pobliżu - prostokąt wokół punktu (patrz communities/geo.py)
+            models.Index(
+                fields=['latitude', 'longitude'],
+                condition=models.Q(is_active=True, latitude__isnull=False),
+                name='community_active_geo_idx',
+            ),
+            # Sortowanie po popularności (liczba członków)
+            models.Index(
+                fields=['-member_count', '-id'],
+                condition=models.Q(is_active=True),
+                name='community_active_popular_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.name
@@ -123,37 +193,43 @@ class CommunityProfile(models.Model):
         """
         Auto-generuj slug z nazwy (dla ładnych URL-i).
         Np. "Wspólnota Emmanuel Kraków" → "wspolnota-emmanuel-krakow"
+        (unikalny - patrz communities/slugs.py)
         """
+        # Klucz miasta zawsze zgodny z miastem
+        self.city_key = fold_text(self.city)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'city' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'city_key'}
+        elif update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Edycja (formularz, admin): bez liczników członków, tag_ids i dokumentu wyszukiwania -
+            # join/leave zatwierdzony w międzyczasie nie zostanie cofnięty
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+            ]
+
         if not self.slug:
-            from django.utils.text import slugify
-            base_slug = slugify(self.name, allow_unicode=True)
-            slug = base_slug
-            counter = 1
-            
-            # Upewnij się że slug jest unikalny
-            while CommunityProfile.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            self.slug = slug
-        
+            # Wolny slug jednym zapytaniem, ponowienie przy równoległym zapisie tej samej nazwy
+            save_with_unique_slug(self, lambda: super(CommunityProfile, self).save(*args, **kwargs))
+            return
+
         super().save(*args, **kwargs)
     
     def get_member_count(self):
-        """Zwraca liczbę członków"""
-        return self.memberships.filter(is_active=True).count()
+        """Zwraca liczbę członków (zapisany licznik - bez zapytania do bazy)"""
+        return self.member_count
     
     # Nowe: - dodanie uprawnien
     def get_owners(self):
         """Zwraca listę właścicieli (owner) wspólnoty"""
-        return self.memberships.filter(role='owner', is_active=True).select_related('person')
+        return self.memberships.filter(role='owner', is_active=True).select_related('person').order_by('-joined_date')
     
     def get_admins(self):
         """Zwraca listę administratorów (owner + admin) wspólnoty"""
         return self.memberships.filter(
             role__in=['owner', 'admin'], 
             is_active=True
-        ).select_related('person')
+        ).select_related('person').order_by('role_rank', '-joined_date')
     
     def user_can_edit(self, user):
         """
@@ -166,11 +242,8 @@ class CommunityProfile(models.Model):
         if user.is_superuser:
             return True
         
-        return self.memberships.filter(
-            person=user,
-            role__in=['owner', 'admin'],
-            is_active=True
-        ).exists()
+        from .permissions import get_membership_resolver
+        return get_membership_resolver(user).has_role(self, ['owner', 'admin'])
     
     def user_can_manage_members(self, user):
         """
@@ -183,11 +256,8 @@ class CommunityProfile(models.Model):
         if user.is_superuser:
             return True
         
-        return self.memberships.filter(
-            person=user,
-            role__in=['owner', 'admin', 'leader'],
-            is_active=True
-        ).exists()
+        from .permissions import get_membership_resolver
+        return get_membership_resolver(user).has_role(self, ['owner', 'admin', 'leader'])
 
 
 class PersonProfile(models.Model):
@@ -208,6 +278,7 @@ class PersonProfile(models.Model):
     first_name = models.CharField(max_length=100, verbose_name='Imię')
     last_name = models.CharField(max_length=100, blank=True, verbose_name='Nazwisko')
     city = models.CharField(max_length=100, blank=True, verbose_name='Miasto')
+    city_key = models.CharField(max_length=100, blank=True, editable=False, verbose_name='Miasto (klucz)')
     bio = models.TextField(max_length=500, blank=True, verbose_name='O mnie')
     
     # Zdjęcie profilowe (URL)
@@ -220,10 +291,21 @@ class PersonProfile(models.Model):
     class Meta:
         verbose_name = 'Profil osoby'
         verbose_name_plural = 'Profile osób'
+        indexes = [
+            models.Index(fields=['city_key'], name='person_city_key_idx', opclasses=['varchar_pattern_ops']),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}".strip() or self.user.username
 
+    def save(self, *args, **kwargs):
+        """Ustaw znormalizowany klucz miasta (patrz CommunityProfile.save)."""
+        self.city_key = fold_text(self.city)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'city' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'city_key'}
+        super().save(*args, **kwargs)
+
 
 class Membership(models.Model):
     """
@@ -250,6 +332,15 @@ class Membership(models.Model):
         ('service_leader', 'Lider diakonii'),  # Organizuje posługi
         ('member', 'Członek'),             # Zwykły członek
     )
+
+    # Pozycja roli w hierarchii (0 = najwyższa) - do sortowania list członków
+    ROLE_RANKS = {
+        'owner': 0,
+        'admin': 1,
+        'leader': 2,
+        'service_leader': 3,
+        'member': 4,
+    }
     person = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -273,6 +364,8 @@ class Membership(models.Model):
     )
     
     joined_date = models.DateTimeField(auto_now_add=True, verbose_name='Data dołączenia')
+    # Ranga roli (ROLE_RANKS) - ustawiana w save(), NIE edytuj ręcznie
+    role_rank = models.PositiveSmallIntegerField(default=4, editable=False, verbose_name='Ranga roli')
     is_active = models.BooleanField(default=True, verbose_name='Aktywne członkostwo')
 
     # NOWE POLA - dla lepszego zarządzania
@@ -295,11 +388,29 @@ class Membership(models.Model):
         verbose_name = 'Członkostwo'
         verbose_name_plural = 'Członkostwa'
         unique_together = ('person', 'community')  # Osoba może należeć do wspólnoty tylko raz
-        ordering = ['role','-joined_date'] # Sortuj: najpierw owners, potem admin, etc.
+        # Bez domyślnego sortowania - zapytania sortują tylko tam, gdzie kolejność ma znaczenie
+        # (listy członków: order_by('role_rank', '-joined_date') - najpierw owners, potem admin, etc.)
+        indexes = [
+            # Lista członków wspólnoty w kolejności hierarchii
+            models.Index(
+                fields=['community', 'is_active', 'role_rank', '-joined_date'],
+                name='membership_community_rank_idx',
+            ),
+            # Członkostwa użytkownika (uprawnienia, profil)
+            models.Index(fields=['person', 'is_active'], name='membership_person_active_idx'),
+        ]
     
     def __str__(self):
         return f"{self.person.username} → {self.community.name} ({self.get_role_display()})"
     
+    def save(self, *args, **kwargs):
+        """Ranga roli zawsze zgodna z rolą."""
+        self.role_rank = self.ROLE_RANKS.get(self.role, self.ROLE_RANKS['member'])
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'role' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'role_rank'}
+        super().save(*args, **kwargs)
+
     def is_owner(self):
         """Sprawdź czy to właściciel"""
         return self.role == 'owner'
@@ -0,0 +1,176 @@
+"""
+Paginacja kursorowa (keyset pagination) dla listy wspólnot.
+
+Zwykła paginacja Django (Paginator) robi:
+- COUNT(*) na całym (często DISTINCT) zapytaniu - żeby policzyć strony
+- OFFSET (strona - 1) * 12 - baza i tak musi przejść wszystkie pominięte wiersze
+
+Im dalsza strona, tym wolniej. Paginacja kursorowa zapamiętuje wartości
+kolumn sortowania ostatniego wiersza ("kursor") i pobiera następną stronę
+warunkiem WHERE (created_at, id) < (...). Przy pasującym indeksie
+strona 1000 kosztuje tyle samo co strona 1.
+
+Kursor jest podpisany (django.core.signing) - użytkownik nie może go
+podmienić na dowolne wartości.
+"""
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'communities.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    """Kursor jest uszkodzony albo nie pasuje do aktualnego sortowania."""
+
+
+class CursorPage:
+    """
+    Jedna strona wyników paginacji kursorowej.
+
+    Udaje (w podstawowym zakresie) obiekt Page z Django, żeby można go było
+    przekazać do template jako `page_obj`.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginator kursorowy.
+
+    Parametry:
+        queryset - już przefiltrowany queryset
+        per_page - liczba elementów na stronę
+        ordering - krotka pól sortowania, np. ('-created_at', '-pk').
+                   Ostatnie pole MUSI być unikalne (pk), żeby kolejność była jednoznaczna.
+                   Może zawierać adnotacje (np. '-rank').
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    # --- Kodowanie kursora ---
+
+    def _fields(self):
+        """Nazwy pól sortowania (bez '-')."""
+        return [name.lstrip('-') for name in self.ordering]
+
+    def _output_field(self, name):
+        """Pole modelu lub adnotacji - potrzebne do odtworzenia typu wartości."""
+        if name == 'pk':
+            return self.queryset.model._meta.pk
+        annotations = self.queryset.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        return self.queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        values = []
+        for name in self._fields():
+            value = getattr(obj, name)
+            # datetime → tekst ISO (JSON nie obsługuje dat)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return signing.dumps(
+            {'o': list(self.ordering), 'd': direction, 'v': values},
+            salt=CURSOR_SALT,
+            compress=True,
+        )
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            raise InvalidCursor('Nieprawidłowy kursor.')
+
+        # Kursor z innego sortowania nie ma sensu (inne kolumny)
+        if payload.get('o') != list(self.ordering) or payload.get('d') not in ('next', 'prev'):
+            raise InvalidCursor('Kursor nie pasuje do sortowania.')
+
+        values = [
+            self._output_field(name).to_python(value)
+            for name, value in zip(self._fields(), payload['v'])
+        ]
+        return payload['d'], values
+
+    # --- Budowanie zapytania ---
+
+    @staticmethod
+    def _reverse(ordering):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+    @staticmethod
+    def _after(ordering, values):
+        """
+        Warunek "wiersze PO kursorze" dla danej kolejności.
+
+        Dla (a DESC, b DESC) i kursora (x, y):
+            a <= x AND (a < x OR (a = x AND b < y))
+
+        Pierwszy warunek (a <= x) jest nadmiarowy, ale pozwala bazie
+        zacząć skan indeksu od właściwego miejsca.
+        """
+        names = [name.lstrip('-') for name in ordering]
+        lookups = ['lt' if name.startswith('-') else 'gt' for name in ordering]
+
+        condition = Q()
+        for i in range(len(names)):
+            step = Q(**{f'{names[i]}__{lookups[i]}': values[i]})
+            for j in range(i):
+                step &= Q(**{names[j]: values[j]})
+            condition |= step
+
+        leading = Q(**{f'{names[0]}__{lookups[0]}e': values[0]})
+        return leading & condition
+
+    def page(self, cursor=None):
+        """
+        Zwróć stronę zaczynającą się za kursorem (lub pierwszą jeśli brak kursora).
+        """
+        direction, values = ('next', None)
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+
+        ordering = self.ordering if direction == 'next' else self._reverse(self.ordering)
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+
+        # Pobierz o jeden więcej - tak wiemy czy jest kolejna strona (bez COUNT)
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'next':
+            has_next, has_previous = has_more, values is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], 'next')
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], 'prev')
+
+        return CursorPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
@@ -0,0 +1,211 @@
+"""
+Role użytkownika we wspólnotach - jedno zapytanie na request.
+
+Jeden request potrafi kilka razy pytać "jaką rolę ma użytkownik w tej
+wspólnocie?" (mixin uprawnień, user_can_edit, widok, template...).
+Zamiast osobnego zapytania za każdym razem, MembershipResolver pobiera
+WSZYSTKIE aktywne członkostwa użytkownika jednym zapytaniem i dalej
+odpowiada z pamięci.
+
+Resolver jest zapamiętany na obiekcie użytkownika (request.user),
+więc żyje tyle co request:
+
+    resolver = get_membership_resolver(request.user)
+    resolver.role_in(community)                        # 'admin' / None
+    resolver.has_role(community, ['owner', 'admin'])   # True / False
+
+Po zmianie członkostw użytkownika w trakcie requestu: resolver.invalidate()
+
+CACHE MIĘDZY REQUESTAMI (i workerami):
+Członkostwa użytkownika są też trzymane we wspólnym cache (settings.CACHES)
+pod kluczem z WERSJĄ użytkownika. Każdy zapis/usunięcie Membership
+zmienia wersję na nową (sygnały, po zatwierdzeniu transakcji) - stary wpis
+przestaje być czytany we wszystkich workerach naraz.
+Zmiany z pominięciem sygnałów (queryset.update(), bulk_create)
+muszą same wywołać bump_membership_versions([...]).
+"""
+
+import uuid
+
+from django.core.cache import cache
+
+from .models import Membership
+
+# Atrybut obiektu użytkownika, na którym trzymamy resolver
+RESOLVER_ATTRIBUTE = '_membership_resolver'
+
+# Jak długo (w sekundach) trzymać członkostwa użytkownika w cache
+# (unieważnienie i tak następuje od razu - przez wersję)
+ROLES_CACHE_TIMEOUT = 3600
+
+
+# Role, które mogą zarządzać członkami (usuwać, dezaktywować)
+MANAGER_ROLES = ('owner', 'admin', 'leader')
+
+# Role, które admin może nadawać (owner może nadać każdą)
+ADMIN_ASSIGNABLE_ROLES = ('member', 'service_leader', 'leader')
+
+
+# --- Zasady zarządzania członkami ---
+# Zwracają komunikat błędu albo None (wolno). Nie robią zapytań - działają
+# na już pobranych członkostwach, więc można je sprawdzać dla wielu osób naraz.
+
+def role_change_error(actor, target, new_role):
+    """
+    Czy `actor` (członkostwo zarządzającego) może nadać `target` rolę `new_role`?
+
+    - Owner może nadać każdą rolę
+    - Admin może nadawać role do poziomu leader (NIE admin/owner)
+    - Leader nie może zmieniać ról
+    - Nikt nie zmienia roli samemu sobie
+    """
+    if target.person_id == actor.person_id:
+        return 'Nie możesz zmienić własnej roli. Poproś innego admina.'
+    if actor.role == 'leader':
+        return (
+            'Jako lider nie masz uprawnień do zmiany ról. '
+            'Role może zmieniać tylko właściciel lub administrator.'
+        )
+    if actor.role == 'owner':
+        if new_role not in dict(Membership.ROLE_CHOICES):
+            return 'Nieprawidłowa rola.'
+        return None
+    if actor.role == 'admin':
+        if new_role not in ADMIN_ASSIGNABLE_ROLES:
+            return (
+                'Jako administrator możesz nadawać role tylko do poziomu Leader. '
+                'Role Admin/Owner może nadać tylko właściciel.'
+            )
+        return None
+    return 'Nie masz uprawnień do zmiany ról.'
+
+
+def removal_error(actor, target):
+    """
+    Czy `actor` może usunąć (lub dezaktywować) członkostwo `target`?
+
+    - Zarządzać członkami mogą owner, admin, leader
+    - Nie można usunąć samego siebie (od tego jest "Opuść wspólnotę")
+    - Nie można usunąć właściciela
+    - Leader może usuwać tylko zwykłych członków
+    """
+    if actor.role not in MANAGER_ROLES:
+        return 'Nie masz uprawnień do zarządzania członkami.'
+    if target.person_id == actor.person_id:
+        return 'Nie możesz usunąć samego siebie. Użyj przycisku "Opuść wspólnotę".'
+    if target.role == 'owner':
+        return (
+            'Nie można usunąć właściciela (owner). '
+            'Właściciel musi sam opuścić wspólnotę lub przekazać uprawnienia.'
+        )
+    if actor.role == 'leader' and target.role in ('admin', 'leader', 'service_leader'):
+        return (
+            'Jako lider możesz usuwać tylko zwykłych członków. '
+            'Administratorów i innych liderów może usunąć tylko właściciel lub administrator.'
+        )
+    return None
+
+
+def _version_key(user_id):
+    return f'communities:roles:version:{user_id}'
+
+
+def _new_version():
+    """
+    Nowy token wersji - nigdy się nie powtarza.
+
+    Nie licznik: gdy klucz wersji wypadnie z cache (FileBasedCache usuwa
+    losowe wpisy po MAX_ENTRIES), licznik zacząłby znowu od 1 i stary wpis
+    z rolami "v1" byłby czytany ponownie.
+    """
+    return uuid.uuid4().hex
+
+
+def get_membership_version(user_id):
+    """Aktualna wersja członkostw użytkownika (część klucza cache)."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_membership_versions(user_ids):
+    """
+    Unieważnij zapamiętane członkostwa podanych użytkowników (we wszystkich workerach).
+
+    Zwykły set() bez wygasania - cache.incr() w FileBasedCache to get+set
+    z domyślnym TIMEOUT, a do tego nie jest atomowy między workerami.
+    """
+    cache.set_many(
+        {_version_key(user_id): _new_version() for user_id in set(user_ids)},
+        timeout=None,
+    )
+
+
+class MembershipResolver:
+    """
+    Aktywne członkostwa jednego użytkownika: {community_id: Membership}.
+
+    Wspólnotę można podać jako obiekt albo jako ID.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._memberships = None
+
+    def _load(self):
+        if self._memberships is None:
+            if not self.user.is_authenticated:
+                self._memberships = {}
+            else:
+                self._memberships = self._load_cached()
+        return self._memberships
+
+    def _load_cached(self):
+        """Członkostwa ze wspólnego cache albo z bazy (jedno zapytanie)."""
+        key = f'communities:roles:{self.user.pk}:v{get_membership_version(self.user.pk)}'
+        memberships = cache.get(key)
+        if memberships is None:
+            memberships = {
+                membership.community_id: membership
+                for membership in Membership.objects.filter(person_id=self.user.pk, is_active=True)
+            }
+            cache.set(key, memberships, ROLES_CACHE_TIMEOUT)
+        return memberships
+
+    @staticmethod
+    def _community_id(community):
+        return getattr(community, 'pk', community)
+
+    def membership_in(self, community):
+        """Aktywne członkostwo użytkownika we wspólnocie (albo None)."""
+        return self._load().get(self._community_id(community))
+
+    def role_in(self, community):
+        """Rola użytkownika we wspólnocie (albo None, jeśli nie jest członkiem)."""
+        membership = self.membership_in(community)
+        return membership.role if membership else None
+
+    def has_role(self, community, roles):
+        """Czy użytkownik ma we wspólnocie którąś z podanych ról."""
+        return self.role_in(community) in roles
+
+    def is_member(self, community):
+        return self.membership_in(community) is not None
+
+    def invalidate(self):
+        """Zapomnij członkostwa - następne pytanie pobierze je od nowa."""
+        self._memberships = None
+
+
+def get_membership_resolver(user):
+    """
+    Resolver ról dla użytkownika (jeden na obiekt użytkownika = jeden na request).
+    """
+    resolver = getattr(user, RESOLVER_ATTRIBUTE, None)
+    if resolver is None:
+        resolver = MembershipResolver(user)
+        setattr(user, RESOLVER_ATTRIBUTE, resolver)
+    return resolver
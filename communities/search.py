@@ -0,0 +1,97 @@
+"""
+Wyszukiwanie pełnotekstowe wspólnot (PostgreSQL full-text search).
+
+Zamiast OR-a z kilku `icontains` (LIKE '%...%' + JOIN po tagach + DISTINCT),
+każda wspólnota ma zapisany dokument wyszukiwania (`search_vector`)
+z wagami:
+    A - nazwa
+    B - tagi
+    C - miasto
+    D - opis
+
+Dokument jest indeksowany GIN-em, więc wyszukiwanie nie skanuje całej tabeli.
+Aktualizacja dokumentu odbywa się w sygnałach (communities/signals.py)
+po zapisaniu wspólnoty lub zmianie jej tagów.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, OuterRef, StringAgg, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce
+
+from .models import CommunityProfile
+
+# 'simple' - bez stemmingu (PostgreSQL domyślnie nie ma słownika polskiego)
+SEARCH_CONFIG = 'simple'
+
+
+def build_search_vector():
+    """
+    Zwraca wyrażenie budujące ważony dokument wyszukiwania wspólnoty.
+
+    Tagi są doklejane podzapytaniem (string_agg po tabeli pośredniej),
+    dzięki czemu wyrażenie działa w UPDATE bez JOIN-a.
+    """
+    through = CommunityProfile.tags.through
+    tag_names = (
+        through.objects
+        .filter(communityprofile_id=OuterRef('pk'))
+        .order_by()
+        .values('communityprofile_id')
+        .annotate(names=StringAgg('tag__name', delimiter=Value(' ')))
+        .values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Coalesce(Subquery(tag_names), Value(''), output_field=TextField()), weight='B', config=SEARCH_CONFIG)
+        + SearchVector('city', weight='C', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(community_ids):
+    """
+    Przelicz dokument wyszukiwania dla podanych wspólnot (jedno zapytanie UPDATE).
+    """
+    community_ids = list(community_ids)
+    if not community_ids:
+        return 0
+    return CommunityProfile.objects.filter(pk__in=community_ids).update(
+        search_vector=build_search_vector()
+    )
+
+
+def build_search_query(text):
+    """
+    Zamień tekst wpisany przez użytkownika na zapytanie tsquery.
+
+    Każde słowo jest traktowane jako prefiks ("wspol krak" → wspol:* & krak:*),
+    żeby wyniki pojawiały się już w trakcie pisania.
+    Zwraca None jeśli w tekście nie ma żadnych słów.
+    """
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    raw = ' & '.join(f'{word}:*' for word in words)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_communities(queryset, text):
+    """
+    Zawęź queryset do wspólnot pasujących do tekstu i dodaj adnotację `rank`.
+
+    Wyniki NIE są tu sortowane - o kolejności decyduje widok
+    (domyślnie po `-rank`).
+
+    ts_rank zwraca `real` (float4) - rzutujemy na double precision, żeby
+    wartość w kursorze paginacji (float Pythona) była dokładnie równa tej
+    z bazy. Bez tego `rank = x` na granicy strony nigdy nie jest prawdą
+    i wiersze z tą samą trafnością są pomijane lub powtarzane.
+    """
+    query = build_search_query(text)
+    if query is None:
+        return queryset
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
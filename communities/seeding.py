@@ -0,0 +1,274 @@
+"""
+Generator danych syntetycznych do benchmarków (komenda seed_portal).
+
+Tworzy realistyczny wolumen danych:
+    - użytkowników z PersonProfile (polskie imiona, nazwiska, miasta)
+    - wspólnoty o "polskich" nazwach ("Oaza Betania", "Krąg Biblijny Emmanuel"),
+      w miastach ważonych liczbą mieszkańców, ze współrzędnymi
+    - tagi o skośnym rozkładzie (kilka bardzo popularnych, długi ogon)
+    - członkostwa o rozkładzie potęgowym: kilka wspólnot z tysiącami członków,
+      większość z kilkoma - z pełną hierarchią ról
+
+Wszystko deterministyczne (random.Random(seed)) i zapisywane partiami
+przez bulk_create (services.create_communities - liczniki, tag_ids, dokument
+wyszukiwania ustawione od razu). 1M członkostw to kilka minut.
+
+    stats = seed_portal(users=50000, communities=20000, memberships=1000000, seed=42)
+"""
+
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.text import slugify
+
+from .directory import bump_directory_generation
+from .models import CommunityProfile, PersonProfile, Tag
+from .services import BULK_INSERT_BATCH_SIZE, create_communities
+from .slugs import allocate_slugs
+from .text import fold_text
+
+# Miasta: (nazwa, szerokość, długość, waga ~ liczba mieszkańców w tys.)
+CITIES = (
+    ('Warszawa', 52.2297, 21.0122, 1860),
+    ('Kraków', 50.0614, 19.9366, 800),
+    ('Wrocław', 51.1079, 17.0385, 670),
+    ('Łódź', 51.7592, 19.4560, 660),
+    ('Poznań', 52.4064, 16.9252, 540),
+    ('Gdańsk', 54.3520, 18.6466, 490),
+    ('Szczecin', 53.4285, 14.5528, 390),
+    ('Bydgoszcz', 53.1235, 18.0084, 330),
+    ('Lublin', 51.2465, 22.5684, 330),
+    ('Białystok', 53.1325, 23.1688, 290),
+    ('Katowice', 50.2649, 19.0238, 280),
+    ('Gdynia', 54.5189, 18.5305, 240),
+    ('Częstochowa', 50.8118, 19.1203, 210),
+    ('Radom', 51.4027, 21.1471, 200),
+    ('Rzeszów', 50.0412, 21.9991, 200),
+    ('Toruń', 53.0138, 18.5984, 195),
+    ('Kielce', 50.8661, 20.6286, 185),
+    ('Olsztyn', 53.7784, 20.4801, 170),
+    ('Opole', 50.6751, 17.9213, 125),
+    ('Zielona Góra', 51.9356, 15.5062, 140),
+    ('Tarnów', 50.0121, 20.9858, 105),
+    ('Nowy Sącz', 49.6218, 20.6970, 83),
+    ('Zakopane', 49.2992, 19.9496, 27),
+    ('Wadowice', 49.8833, 19.4933, 19),
+)
+
+# Tagi od najpopularniejszego - waga ~ 1 / pozycja (rozkład Zipfa)
+TAG_NAMES = (
+    'modlitwa', 'młodzież', 'rodziny', 'uwielbienie', 'biblia', 'ewangelizacja',
+    'studenci', 'diakonia', 'muzyka', 'dzieci', 'małżeństwa', 'adoracja',
+    'rekolekcje', 'charyzmaty', 'misje', 'seniorzy', 'wolontariat', 'pielgrzymki',
+    'liturgia', 'formacja', 'mężczyźni', 'kobiety', 'sport', 'sztuka',
+)
+
+NAME_PREFIXES = (
+    'Wspólnota', 'Oaza', 'Krąg Biblijny', 'Odnowa w Duchu Świętym', 'Domowy Kościół',
+    'Grupa Modlitewna', 'Duszpasterstwo Akademickie', 'Schola', 'Diakonia', 'Szkoła Nowej Ewangelizacji',
+    'Wspólnota Młodzieżowa', 'Ruch Światło-Życie', 'Krąg Rodzin', 'Zespół Uwielbienia',
+)
+NAME_PATRONS = (
+    'Emmanuel', 'Betania', 'Miriam', 'Jordan', 'Galilea', 'Effatha', 'Maranatha', 'Kana',
+    'Syloe', 'Siloe', 'Tabor', 'Nazaret', 'Betlejem', 'Magnificat', 'Hosanna', 'Agape',
+    'św. Józefa', 'św. Jana Pawła II', 'św. Faustyny', 'św. Franciszka', 'Miłosierdzia Bożego',
+    'Ducha Świętego', 'Dobrego Pasterza', 'Przemienienia', 'Zwiastowania', 'Wieczernik',
+)
+
+FIRST_NAMES = (
+    'Anna', 'Maria', 'Katarzyna', 'Małgorzata', 'Agnieszka', 'Barbara', 'Ewa', 'Magdalena',
+    'Zofia', 'Joanna', 'Piotr', 'Krzysztof', 'Andrzej', 'Tomasz', 'Paweł', 'Jan', 'Michał',
+    'Marcin', 'Jakub', 'Łukasz', 'Mateusz', 'Józef', 'Wojciech', 'Szymon',
+)
+LAST_NAMES = (
+    'Nowak', 'Kowalski', 'Wiśniewski', 'Wójcik', 'Kowalczyk', 'Kamiński', 'Lewandowski',
+    'Zieliński', 'Szymański', 'Woźniak', 'Dąbrowski', 'Kozłowski', 'Jankowski', 'Mazur',
+    'Kwiatkowski', 'Krawczyk', 'Piotrowski', 'Grabowski', 'Nowakowski', 'Pawłowski', 'Michalski',
+)
+
+# Denominacje: (wartość, waga)
+DENOMINATIONS = (
+    ('catholic', 70), ('charismatic', 8), ('evangelical', 6), ('pentecostal', 5),
+    ('protestant', 4), ('baptist', 3), ('orthodox', 2), ('methodist', 1), ('', 1),
+)
+
+# Wykładnik rozkładu potęgowego wielkości wspólnot (większy = bardziej skośny)
+COMMUNITY_SIZE_EXPONENT = 1.1
+
+# Jaka część wspólnot ma współrzędne (reszta - do uzupełnienia geocode_communities)
+GEOCODED_SHARE = 0.8
+
+
+def _weighted(rng, items, weights, count):
+    return rng.choices(items, weights=weights, k=count)
+
+
+def community_sizes(rng, communities, memberships, max_size):
+    """
+    Liczba członków każdej wspólnoty - rozkład potęgowy (waga ~ 1 / pozycja^s).
+
+    Pozycje są losowo przypisane do wspólnot, suma ≈ memberships.
+    Każda wspólnota ma co najmniej właściciela.
+    """
+    weights = [1 / (rank ** COMMUNITY_SIZE_EXPONENT) for rank in range(1, communities + 1)]
+    total = sum(weights)
+    sizes = [min(max(1, round(memberships * weight / total)), max_size) for weight in weights]
+    rng.shuffle(sizes)
+    return sizes
+
+
+def community_roles(person_ids):
+    """
+    Role w jednej wspólnocie: pierwszy to owner, dalej kilku adminów
+    i liderów (proporcjonalnie do wielkości), reszta to członkowie.
+    """
+    size = len(person_ids)
+    admins = min(3, size // 50)
+    leaders = size // 25
+    service_leaders = size // 40
+    roles = {person_ids[0]: 'owner'}
+    position = 1
+    for role, count in (('admin', admins), ('leader', leaders), ('service_leader', service_leaders)):
+        for person_id in person_ids[position:position + count]:
+            roles[person_id] = role
+        position += count
+    for person_id in person_ids[position:]:
+        roles[person_id] = 'member'
+    return roles
+
+
+class SeedStats:
+    """Ile utworzono i w jakim czasie (dla raportu komendy)."""
+
+    def __init__(self):
+        self.users = 0
+        self.communities = 0
+        self.memberships = 0
+        self.tags = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        elapsed = self.elapsed
+        return (
+            f'Użytkowników: {self.users}, wspólnot: {self.communities}, '
+            f'członkostw: {self.memberships}, tagów: {self.tags} '
+            f'- {elapsed:.1f} s ({self.memberships / elapsed if elapsed else 0:.0f} członkostw/s)'
+        )
+
+
+def seed_tags(stats):
+    """Tagi z TAG_NAMES (istniejące zostają). Zwraca listę ID w kolejności popularności."""
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=slugify(name)) for name in TAG_NAMES],
+        ignore_conflicts=True,
+    )
+    tags = dict(Tag.objects.filter(name__in=TAG_NAMES).values_list('name', 'pk'))
+    stats.tags = len(tags)
+    return [tags[name] for name in TAG_NAMES if name in tags]
+
+
+def seed_users(rng, count, prefix, password, batch_size, stats, log):
+    """Użytkownicy + PersonProfile (hasło hashowane raz). Zwraca listę ID."""
+    User = get_user_model()
+    password_hash = make_password(password)
+    city_weights = [city[3] for city in CITIES]
+    user_ids = []
+    for start in range(0, count, batch_size):
+        indexes = range(start, min(start + batch_size, count))
+        first_names = _weighted(rng, FIRST_NAMES, None, len(indexes))
+        last_names = _weighted(rng, LAST_NAMES, None, len(indexes))
+        cities = _weighted(rng, CITIES, city_weights, len(indexes))
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{prefix}{index}',
+                    email=f'{prefix}{index}@example.com',
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password_hash,
+                )
+                for index, first_name, last_name in zip(indexes, first_names, last_names)
+            ])
+            PersonProfile.objects.bulk_create([
+                PersonProfile(
+                    user_id=user.pk,
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    city=city[0],
+                    city_key=fold_text(city[0]),
+                )
+                for user, city in zip(users, cities)
+            ])
+        user_ids.extend(user.pk for user in users)
+        stats.users += len(users)
+        log(f'  użytkownicy: {stats.users}/{count}')
+    return user_ids
+
+
+def _build_community(rng, index, tag_ids, tag_weights):
+    city, latitude, longitude, _population = rng.choices(CITIES, weights=[city[3] for city in CITIES])[0]
+    name = f'{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_PATRONS)}'
+    if rng.random() < 0.3:
+        name = f'{name} {city}'
+    tags = {rng.choices(tag_ids, weights=tag_weights)[0] for _ in range(rng.randint(1, 4))}
+    community = CommunityProfile(
+        name=name,
+        description=f'{name} - spotkania co tydzień, zapraszamy! ({index})',
+        city=city,
+        city_key=fold_text(city),
+        denomination=rng.choices([value for value, _w in DENOMINATIONS], weights=[w for _v, w in DENOMINATIONS])[0],
+        tag_ids=sorted(tags),
+        is_verified=rng.random() < 0.4,
+    )
+    if rng.random() < GEOCODED_SHARE:
+        # Rozrzut kilku km wokół centrum miasta
+        community.latitude = round(latitude + rng.gauss(0, 0.03), 6)
+        community.longitude = round(longitude + rng.gauss(0, 0.05), 6)
+    return community
+
+
+def seed_communities(rng, count, memberships, user_ids, tag_ids, batch_size, stats, log):
+    """Wspólnoty z członkami (rozkład potęgowy), partiami po batch_size wspólnot."""
+    tag_weights = [1 / rank for rank in range(1, len(tag_ids) + 1)]
+    sizes = community_sizes(rng, count, memberships, len(user_ids))
+    for start in range(0, count, batch_size):
+        indexes = range(start, min(start + batch_size, count))
+        communities = [_build_community(rng, index, tag_ids, tag_weights) for index in indexes]
+        for community, slug in zip(communities, allocate_slugs(CommunityProfile, [c.name for c in communities])):
+            community.slug = slug
+
+        members = []
+        for community, index in zip(communities, indexes):
+            person_ids = rng.sample(user_ids, sizes[index])
+            community.created_by_id = person_ids[0]
+            members.append(community_roles(person_ids))
+
+        with transaction.atomic():
+            created = create_communities(communities, members)
+        stats.communities += len(communities)
+        stats.memberships += len(created)
+        log(f'  wspólnoty: {stats.communities}/{count}, członkostwa: {stats.memberships}')
+
+
+def seed_portal(users, communities, memberships, seed=42, prefix='seed_', password='seed-password',
+                batch_size=BULK_INSERT_BATCH_SIZE, log=lambda message: None):
+    """
+    Wygeneruj dane (deterministycznie - ten sam seed = te same dane). Zwraca SeedStats.
+
+    prefix - początek nazw użytkowników (kolejne uruchomienia: inny prefiks)
+    """
+    rng = random.Random(seed)
+    stats = SeedStats()
+    tag_ids = seed_tags(stats)
+    user_ids = seed_users(rng, users, prefix, password, batch_size, stats, log)
+    # Mniejsze partie wspólnot - jedna partia to też wszystkie jej członkostwa
+    seed_communities(rng, communities, memberships, user_ids, tag_ids, max(batch_size // 5, 1), stats, log)
+    bump_directory_generation()
+    return stats
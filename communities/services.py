@@ -0,0 +1,290 @@
+"""
+Operacje na członkostwach wykonywane JEDNYM zapytaniem SQL.
+
+Dołączenie do wspólnoty (join) i jej opuszczenie (leave) to najczęstsze
+zapisy w portalu - np. gdy wspólnota udostępni link do dołączenia,
+wiele osób klika naraz (a czasem ta sama osoba klika dwa razy).
+
+Wersja "sprawdź exists() → create()" ma dwa problemy:
+    - dwa równoległe kliknięcia mogą przejść sprawdzenie i drugie
+      kończy się IntegrityError (unique_together person + community)
+    - nieaktywne członkostwo (is_active=False) blokuje ponowne dołączenie
+
+Dlatego:
+    join  - INSERT ... ON CONFLICT DO UPDATE (reaktywacja nieaktywnego wiersza)
+    leave - DELETE ... WHERE (warunki) RETURNING
+W tym samym zapytaniu (CTE) aktualizujemy liczniki członków wspólnoty
+(patrz communities/counters.py) - tylko jeśli wiersz faktycznie się zmienił.
+
+TWORZENIE WSPÓLNOTY (create_community / create_communities):
+wspólnota + członkostwo właściciela + tagi w jednej transakcji, z licznikami
+członków ustawionymi już w INSERT - bez sygnału, który dopytywał exists()
+i osobno aktualizował liczniki. Używane przez formularz tworzenia, admina
+i import (communities/importer.py).
+
+AKCJE ZBIORCZE (panel zarządzania): usunięcie / dezaktywacja / zmiana roli
+wielu członków naraz - jedno zapytanie DELETE/UPDATE na operację
++ jedna aktualizacja liczników.
+
+Zapytania omijają sygnały Django - unieważnienie ról użytkownika
+(communities/permissions.py) wywołujemy tu ręcznie.
+"""
+
+import logging
+
+from django.db import connection, transaction
+
+from .counters import ROLE_COUNTER_FIELDS, memberships_changed
+from .models import CommunityProfile, Membership
+from .permissions import bump_membership_versions
+from .search import update_search_vectors
+
+logger = logging.getLogger(__name__)
+
+# Role, które nie mogą same opuścić wspólnoty (muszą przekazać uprawnienia)
+ROLES_THAT_CANNOT_LEAVE = ('owner', 'admin')
+
+# Ile wierszy w jednym INSERT przy tworzeniu wielu wspólnot (członkostw może być dużo)
+BULK_INSERT_BATCH_SIZE = 5000
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return quote(Membership._meta.db_table), quote(CommunityProfile._meta.db_table)
+
+
+def _bump_roles_on_commit(person_ids):
+    person_ids = list(person_ids)
+    transaction.on_commit(lambda: bump_membership_versions(person_ids))
+
+
+def _preset_counters(community, roles):
+    """Liczniki członków nowej wspólnoty zgodne z rolami, które zaraz dostanie."""
+    community.member_count = len(roles)
+    for field in ROLE_COUNTER_FIELDS.values():
+        setattr(community, field, 0)
+    for role in roles:
+        field = ROLE_COUNTER_FIELDS[role]
+        setattr(community, field, getattr(community, field) + 1)
+
+
+def _add_tag_rows(communities):
+    """Wiersze tabeli pośredniej tagów wg community.tag_ids (jeden INSERT, bez m2m_changed)."""
+    through = CommunityProfile.tags.through
+    through.objects.bulk_create([
+        through(communityprofile_id=community.pk, tag_id=tag_id)
+        for community in communities
+        for tag_id in community.tag_ids
+    ], batch_size=BULK_INSERT_BATCH_SIZE)
+
+
+def create_community(community, owner=None, tags=()):
+    """
+    Zapisz NOWĄ wspólnotę razem z właścicielem i tagami (jedna transakcja).
+
+    community - niezapisany CommunityProfile (np. form.save(commit=False))
+    owner     - założyciel: zostaje created_by i członkiem z rolą owner
+    tags      - tagi (obiekty albo ID); formularz/admin mogą zamiast tego
+                zapisać tagi po swojemu (form.save_m2m())
+
+    Zapytania: slug, INSERT wspólnoty (liczniki już ustawione), INSERT
+    członkostwa, INSERT tagów i jeden UPDATE dokumentu wyszukiwania.
+    """
+    tag_ids = sorted({getattr(tag, 'pk', tag) for tag in tags})
+    if owner is not None:
+        community.created_by = owner
+    _preset_counters(community, ['owner'] if owner is not None else [])
+    community.tag_ids = tag_ids
+
+    with transaction.atomic():
+        # Dokument wyszukiwania liczymy raz - po dodaniu tagów (patrz signals.py)
+        community._defer_search_vector = True
+        try:
+            community.save()
+        finally:
+            del community._defer_search_vector
+
+        if owner is not None:
+            Membership.objects.create(person=owner, community=community, role='owner', is_active=True)
+        if tag_ids:
+            _add_tag_rows([community])
+        update_search_vectors([community.pk])
+
+    logger.info(
+        'Utworzono wspólnotę %s (id=%s), właściciel: %s',
+        community.name, community.pk, owner.username if owner is not None else '-',
+        extra={'community_id': community.pk, 'owner_id': getattr(owner, 'pk', None)},
+    )
+    return community
+
+
+def create_communities(communities, members):
+    """
+    Wiele nowych wspólnot naraz (import) - stała liczba zapytań.
+
+    communities - niezapisane CommunityProfile z ustawionymi slugami i tag_ids
+                  (bulk_create omija save() i sygnały)
+    members     - dla każdej wspólnoty {person_id: rola}
+    Zwraca listę utworzonych członkostw. Wywoływać wewnątrz transaction.atomic().
+    """
+    for community, roles in zip(communities, members):
+        _preset_counters(community, roles.values())
+    CommunityProfile.objects.bulk_create(communities, batch_size=BULK_INSERT_BATCH_SIZE)
+    _add_tag_rows(communities)
+
+    memberships = [
+        Membership(
+            person_id=person_id,
+            community_id=community.pk,
+            role=role,
+            role_rank=Membership.ROLE_RANKS[role],
+            is_active=True,
+        )
+        for community, roles in zip(communities, members)
+        for person_id, role in roles.items()
+    ]
+    Membership.objects.bulk_create(memberships, batch_size=BULK_INSERT_BATCH_SIZE)
+    update_search_vectors([community.pk for community in communities])
+
+    logger.info(
+        'Utworzono %s wspólnot (import), członkostw: %s', len(communities), len(memberships),
+        extra={'communities': len(communities), 'memberships': len(memberships)},
+    )
+    return memberships
+
+
+def join_community(person_id, community_id, role='member'):
+    """
+    Dodaj (albo reaktywuj) członkostwo - jedno zapytanie.
+
+    Zwraca ID członkostwa, albo None jeśli osoba JUŻ jest aktywnym członkiem.
+    """
+    membership_table, community_table = _tables()
+    role_counter = ROLE_COUNTER_FIELDS[role]
+    sql = f"""
+        WITH joined AS (
+            INSERT INTO {membership_table}
+                (person_id, community_id, role, role_rank, joined_date, is_active, notes, invited_by_id)
+            VALUES (%(person_id)s, %(community_id)s, %(role)s, %(role_rank)s, NOW(), TRUE, '', NULL)
+            ON CONFLICT (person_id, community_id) DO UPDATE
+                SET is_active = TRUE,
+                    role = EXCLUDED.role,
+                    role_rank = EXCLUDED.role_rank,
+                    joined_date = EXCLUDED.joined_date
+                WHERE {membership_table}.is_active = FALSE
+            RETURNING id
+        ), counted AS (
+            UPDATE {community_table}
+            SET member_count = member_count + 1,
+                {role_counter} = {role_counter} + 1
+            WHERE id = %(community_id)s AND EXISTS (SELECT 1 FROM joined)
+        )
+        SELECT id FROM joined
+    """
+    params = {
+        'person_id': person_id,
+        'community_id': community_id,
+        'role': role,
+        'role_rank': Membership.ROLE_RANKS[role],
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+    _bump_roles_on_commit([person_id])
+    return row[0]
+
+
+def leave_community(person_id, community_id):
+    """
+    Usuń aktywne członkostwo osoby - jedno zapytanie.
+
+    Właściciel i administrator NIE są usuwani (ROLES_THAT_CANNOT_LEAVE).
+    Zwraca rolę usuniętego członka, albo None jeśli nic nie usunięto.
+    """
+    membership_table, community_table = _tables()
+    # Licznik roli zmniejszamy tylko dla roli usuniętego członka
+    role_counters = ',\n                '.join(
+        f"{field} = {field} - (removed.role = '{role}')::int"
+        for role, field in ROLE_COUNTER_FIELDS.items()
+    )
+    sql = f"""
+        WITH removed AS (
+            DELETE FROM {membership_table}
+            WHERE person_id = %(person_id)s
+              AND community_id = %(community_id)s
+              AND is_active
+              AND NOT (role = ANY(%(protected_roles)s))
+            RETURNING role
+        ), counted AS (
+            UPDATE {community_table}
+            SET member_count = member_count - 1,
+                {role_counters}
+            FROM removed
+            WHERE {community_table}.id = %(community_id)s
+        )
+        SELECT role FROM removed
+    """
+    params = {
+        'person_id': person_id,
+        'community_id': community_id,
+        'protected_roles': list(ROLES_THAT_CANNOT_LEAVE),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+    _bump_roles_on_commit([person_id])
+    return row[0]
+
+
+# --- Akcje zbiorcze ---
+# Przyjmują członkostwa już sprawdzone (communities/permissions.py) i zablokowane
+# (select_for_update) - wywoływać wewnątrz transaction.atomic().
+
+def remove_memberships(community_id, memberships):
+    """Usuń członkostwa (jeden DELETE). Zwraca liczbę usuniętych."""
+    if not memberships:
+        return 0
+    membership_table, _community_table = _tables()
+    with connection.cursor() as cursor:
+        # Bez kolektora Django (SELECT + sygnały dla każdego wiersza) - nic nie wskazuje na Membership
+        cursor.execute(
+            f'DELETE FROM {membership_table} WHERE id = ANY(%s)',
+            [[membership.pk for membership in memberships]],
+        )
+    memberships_changed(community_id, removed_roles=[membership.role for membership in memberships])
+    _bump_roles_on_commit(membership.person_id for membership in memberships)
+    return len(memberships)
+
+
+def deactivate_memberships(community_id, memberships):
+    """Dezaktywuj członkostwa - zostają w historii (jeden UPDATE). Zwraca liczbę zmienionych."""
+    if not memberships:
+        return 0
+    Membership.objects.filter(pk__in=[membership.pk for membership in memberships]).update(is_active=False)
+    memberships_changed(community_id, removed_roles=[membership.role for membership in memberships])
+    _bump_roles_on_commit(membership.person_id for membership in memberships)
+    return len(memberships)
+
+
+def set_memberships_role(community_id, memberships, role):
+    """Nadaj wszystkim tę samą rolę (jeden UPDATE). Zwraca liczbę zmienionych."""
+    changed = [membership for membership in memberships if membership.role != role]
+    if not changed:
+        return 0
+    Membership.objects.filter(pk__in=[membership.pk for membership in changed]).update(
+        role=role,
+        role_rank=Membership.ROLE_RANKS[role],
+    )
+    memberships_changed(
+        community_id,
+        removed_roles=[membership.role for membership in changed],
+        added_roles=[role] * len(changed),
+    )
+    _bump_roles_on_commit(membership.person_id for membership in changed)
+    return len(changed)
@@ -4,58 +4,170 @@ Sygnały Django dla aplikacji communities.
 Sygnały to automatyczne akcje wywoływane po określonych wydarzeniach,
 np. po zapisaniu obiektu do bazy danych.
 
-Używamy ich do automatycznego tworzenia członkostwa (Membership)
-gdy ktoś zakłada nową wspólnotę.
+Używamy ich do:
+- aktualizacji dokumentu wyszukiwania pełnotekstowego (search_vector)
+- aktualizacji tablicy tagów wspólnoty (tag_ids)
+- unieważniania cache katalogu wspólnot (generacja katalogu)
+- aktualizacji indeksu podpowiedzi (typeahead) w pamięci procesu
+- unieważniania zapamiętanych ról użytkowników (communities/permissions.py)
+
+Członkostwo właściciela nowej wspólnoty NIE jest tworzone sygnałem -
+robi to services.create_community() w tej samej transakcji co wspólnotę.
 """
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from .models import CommunityProfile, Membership
+from .directory import bump_directory_generation
+from .models import CommunityProfile, Membership, Tag
+from .permissions import bump_membership_versions
+from .search import update_search_vectors
+from .tagging import update_tag_ids
+from .typeahead import typeahead_index
+
+
+@receiver(post_save, sender=CommunityProfile)
+def refresh_community_search_vector(sender, instance, raw=False, **kwargs):
+    """
+    Po zapisaniu wspólnoty przelicz jej dokument wyszukiwania.
+    (nazwa, miasto lub opis mogły się zmienić)
+    """
+    if raw:
+        # Ładowanie fixtures - baza może nie być jeszcze spójna
+        return
+    if getattr(instance, '_defer_search_vector', False):
+        # services.create_community() przeliczy dokument raz - po dodaniu tagów
+        return
+    update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+def refresh_tagged_communities_search_vector(sender, instance, created, raw=False, **kwargs):
+    """
+    Zmiana nazwy tagu zmienia dokument wszystkich wspólnot z tym tagiem.
+    """
+    if created or raw:
+        return
+    update_search_vectors(instance.communities.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=CommunityProfile.tags.through)
+def refresh_search_vector_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Dodanie/usunięcie tagów zmienia dokument wyszukiwania.
+
+    reverse=False → instance to wspólnota (community.tags.add(...))
+    reverse=True  → instance to tag, pk_set to ID wspólnot (tag.communities.add(...))
+    """
+    if action == 'pre_clear' and reverse:
+        # Po clear() nie będziemy już wiedzieć których wspólnot to dotyczyło
+        instance._cleared_community_ids = list(instance.communities.values_list('pk', flat=True))
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        update_search_vectors([instance.pk])
+    elif action == 'post_clear':
+        update_search_vectors(getattr(instance, '_cleared_community_ids', []))
+    else:
+        update_search_vectors(pk_set or [])
+
+
+@receiver(m2m_changed, sender=CommunityProfile.tags.through)
+def refresh_tag_ids_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Dodanie/usunięcie tagów → przelicz tablicę tag_ids.
+
+    Lista wspólnot przy clear() z tagu jest zapamiętana w pre_clear
+    (refresh_search_vector_on_tags_change).
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        update_tag_ids([instance.pk])
+    elif action == 'post_clear':
+        update_tag_ids(getattr(instance, '_cleared_community_ids', []))
+    else:
+        update_tag_ids(pk_set or [])
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_communities(sender, instance, **kwargs):
+    """
+    Usunięcie tagu kasuje wiersze tabeli pośredniej BEZ m2m_changed -
+    zapamiętaj wspólnoty, żeby po usunięciu poprawić ich tag_ids.
+    """
+    instance._tagged_community_ids = list(instance.communities.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def refresh_tag_ids_on_tag_delete(sender, instance, **kwargs):
+    update_tag_ids(getattr(instance, '_tagged_community_ids', []))
+
+
+@receiver(post_save, sender=CommunityProfile)
+@receiver(post_delete, sender=CommunityProfile)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_directory_cache(sender, **kwargs):
+    """
+    Zmiana wspólnoty lub tagu → zapamiętane wyniki katalogu są nieaktualne.
+
+    Po zatwierdzeniu transakcji - inaczej równoległy request mógłby zapisać
+    w cache (już pod nową generacją) dane sprzed zmiany.
+    """
+    transaction.on_commit(bump_directory_generation)
+
+
+@receiver(m2m_changed, sender=CommunityProfile.tags.through)
+def invalidate_directory_cache_on_tags_change(sender, action, **kwargs):
+    """
+    Zmiana tagów wspólnoty → wyniki filtrowania po tagach są nieaktualne.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_directory_generation)
 
 
 @receiver(post_save, sender=CommunityProfile)
-def create_owner_membership(sender, instance, created, **kwargs):
-    """
-    Automatycznie dodaj założyciela wspólnoty jako właściciela (owner).
-    
-    Parametry:
-        sender - model który wysłał sygnał (CommunityProfile)
-        instance - konkretny obiekt który został zapisany
-        created - True jeśli to nowy obiekt, False jeśli aktualizacja
-        **kwargs - dodatkowe argumenty
-    
-    Logika:
-        - Jeśli to NOWA wspólnota (created=True)
-        - I ma przypisanego założyciela (created_by)
-        - I założyciel jeszcze NIE jest członkiem
-        - To stwórz Membership z rolą 'owner'
-    """
-    
-    # Tylko dla nowo utworzonych wspólnot
-    if not created:
-        return
-    
-    # Sprawdź czy wspólnota ma założyciela
-    if not instance.created_by:
-        return
-    
-    # Sprawdź czy założyciel już jest członkiem (może został dodany ręcznie) =//na pewno nie//
-    membership_exists = Membership.objects.filter(
-        person=instance.created_by,
-        community=instance
-    ).exists()
-    
-    if membership_exists:
-        # Już jest członkiem, nie dodawaj ponownie
-        return
-    
-    # Stwórz członkostwo z rolą OWNER
-    Membership.objects.create(
-        person=instance.created_by,
-        community=instance,
-        role='owner',
-        is_active=True,
-        # invited_by można zostawić puste (sam się dodał jako założyciel)
-    )
-    
-    print(f"✅ Automatycznie dodano {instance.created_by.username} jako owner wspólnoty '{instance.name}'")
\ No newline at end of file
+def update_typeahead_community(sender, instance, raw=False, **kwargs):
+    """
+    Nowa nazwa/miasto wspólnoty → od razu w podpowiedziach (po zatwierdzeniu transakcji).
+    """
+    if raw:
+        return
+    transaction.on_commit(lambda: typeahead_index.update_community(instance))
+
+
+@receiver(post_delete, sender=CommunityProfile)
+def remove_typeahead_community(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: typeahead_index.remove_community(pk))
+
+
+@receiver(post_save, sender=Tag)
+def update_typeahead_tag(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: typeahead_index.update_tag(instance))
+
+
+@receiver(post_delete, sender=Tag)
+def remove_typeahead_tag(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: typeahead_index.remove_tag(pk))
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_cached_roles(sender, instance, **kwargs):
+    """
+    Zmiana członkostwa → nowa wersja ról użytkownika (wszystkie workery).
+
+    Dopiero po zatwierdzeniu transakcji - inaczej inny worker mógłby
+    zapamiętać stare role już pod nową wersją.
+    """
+    person_id = instance.person_id
+    transaction.on_commit(lambda: bump_membership_versions([person_id]))
@@ -0,0 +1,142 @@
+"""
+Unikalne slugi wspólnot: "oaza", "oaza-1", "oaza-2"...
+
+Wcześniej save() sprawdzał kolejne kandydaty pętlą exists() - przy
+popularnych nazwach ("Oaza", "Wspólnota Emmanuel") to jedno zapytanie
+na każdą istniejącą wspólnotę o tej nazwie. Teraz:
+
+    - JEDNO zapytanie pobiera zajęte slugi zaczynające się od bazy
+      (LIKE 'oaza%' - korzysta z indeksu na unikalnym slugu)
+    - wolny slug: sama baza albo najwyższy zajęty numer + 1
+    - dla wielu nazw naraz (import) - też jedno zapytanie
+
+Dwa równoległe zapisy mogą mimo to wybrać ten sam slug - unikalny indeks
+odrzuci drugi, a save_with_unique_slug() wybierze nowy slug i ponowi zapis.
+"""
+
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Ile znaków zostawić na sufiks "-123"
+SUFFIX_RESERVE = 10
+
+# Slug, gdy z nazwy nic nie zostanie (np. same emoji)
+DEFAULT_SLUG_BASE = 'wspolnota'
+
+# Ile razy ponowić zapis po konflikcie slugów
+SAVE_ATTEMPTS = 5
+
+
+def slug_base(model, name):
+    """Slug z nazwy (bez sufiksu), przycięty tak, żeby zmieścił się sufiks."""
+    max_length = model._meta.get_field('slug').max_length - SUFFIX_RESERVE
+    return slugify(name, allow_unicode=True)[:max_length].strip('-') or DEFAULT_SLUG_BASE
+
+
+def _taken_slugs(model, bases):
+    """
+    Zajęte slugi dla podanych baz - jedno zapytanie.
+
+    Zwraca {baza: (czy baza zajęta, najwyższy zajęty sufiks)}.
+    """
+    prefixes = Q()
+    for base in bases:
+        prefixes |= Q(slug__startswith=base)
+    slugs = model.objects.filter(prefixes).values_list('slug', flat=True)
+
+    taken = {base: (False, 0) for base in bases}
+    patterns = {base: re.compile(rf'{re.escape(base)}(?:-(\d+))?') for base in bases}
+    for slug in slugs:
+        # "oaza-mlodziezowa" też zaczyna się od "oaza" - liczymy tylko "oaza" i "oaza-<liczba>"
+        for base in _candidate_bases(slug, taken):
+            match = patterns[base].fullmatch(slug)
+            if match is None:
+                continue
+            base_taken, max_suffix = taken[base]
+            if match.group(1) is None:
+                taken[base] = (True, max_suffix)
+            else:
+                taken[base] = (base_taken, max(max_suffix, int(match.group(1))))
+    return taken
+
+
+def _candidate_bases(slug, bases):
+    """Bazy, z których mógł powstać slug: on sam albo on bez końcówki "-<liczba>"."""
+    candidates = [slug]
+    head, sep, tail = slug.rpartition('-')
+    if sep and tail.isdigit():
+        candidates.append(head)
+    return [candidate for candidate in candidates if candidate in bases]
+
+
+def allocate_slugs(model, names):
+    """
+    Wolne slugi dla listy nazw (jedno zapytanie).
+
+    Powtórzenia nazw na liście dostają kolejne numery. Slugi nadane wcześniej
+    na tej samej liście są pomijane - "Oaza", "Oaza", "Oaza 1" daje
+    "oaza", "oaza-1", "oaza-1-1" (a nie dwa razy "oaza-1").
+    """
+    bases = [slug_base(model, name) for name in names]
+    if not bases:
+        return []
+    taken = _taken_slugs(model, set(bases))
+
+    slugs = []
+    assigned = set()
+    for base in bases:
+        base_taken, max_suffix = taken[base]
+        if not base_taken and base not in assigned:
+            slug = base
+        else:
+            max_suffix += 1
+            while f'{base}-{max_suffix}' in assigned:
+                max_suffix += 1
+            slug = f'{base}-{max_suffix}'
+        taken[base] = (True, max_suffix)
+        assigned.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def allocate_slug(model, name):
+    """Wolny slug dla jednej nazwy (jedno zapytanie)."""
+    return allocate_slugs(model, [name])[0]
+
+
+def is_slug_conflict(model, error):
+    """
+    Czy IntegrityError to naruszenie unikalności sluga (a nie np. klucza obcego)?
+
+    Nazwa ograniczenia z PostgreSQL: "<tabela>_slug_key" (UNIQUE w CREATE TABLE)
+    albo "<tabela>_slug_<hash>_uniq" (ograniczenie dodane przez Django później).
+    """
+    diag = getattr(error.__cause__, 'diag', None)
+    constraint = getattr(diag, 'constraint_name', None) or ''
+    prefix = f'{model._meta.db_table}_slug'
+    return constraint.startswith(prefix) and constraint.endswith(('_key', '_uniq'))
+
+
+def save_with_unique_slug(instance, save, source_field='name'):
+    """
+    Nadaj obiektowi wolny slug i zapisz go (save - np. super().save z argumentami).
+
+    Konflikt na unikalnym slugu (równoległy zapis tej samej nazwy) →
+    nowy slug i kolejna próba, najwyżej SAVE_ATTEMPTS razy.
+    """
+    model = type(instance)
+    name = getattr(instance, source_field)
+    instance.slug = allocate_slug(model, name)
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        try:
+            # Savepoint - po konflikcie zewnętrzna transakcja jest dalej używalna
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            if attempt == SAVE_ATTEMPTS or not model.objects.filter(slug=instance.slug).exists():
+                raise  # inny błąd niż zajęty slug (albo kolejne konflikty)
+            instance.slug = allocate_slug(model, name)
@@ -0,0 +1,122 @@
+"""
+Podpowiedzi "Czy chodziło Ci o...?" dla wyszukiwania wspólnot.
+
+Gdy wyszukiwanie pełnotekstowe nic nie znajdzie (np. literówka:
+"Emanuel Krakow" zamiast "Emmanuel Kraków"), szukamy podobnych
+nazw wspólnot, miast i tagów po trigramach (rozszerzenie pg_trgm).
+
+Operator %> (trigram_word_similar) korzysta z indeksów GIN gin_trgm_ops,
+więc nie skanujemy całej tabeli. Dodatkowo całość ma twardy limit czasu
+(statement_timeout) - jeśli baza nie zdąży, po prostu nie pokazujemy podpowiedzi.
+"""
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+
+from .directory import filters_cache_key
+from .models import CommunityProfile, Tag
+
+# Ile podpowiedzi pokazać
+SUGGESTIONS_LIMIT = 5
+
+# Maksymalny czas (ms) na wszystkie zapytania o podpowiedzi
+SUGGESTIONS_TIMEOUT_MS = 200
+
+# Próg podobieństwa (0-1) - niżej = więcej, ale mniej trafnych podpowiedzi
+SIMILARITY_THRESHOLD = 0.4
+
+SUGGESTIONS_CACHE_TIMEOUT = 300
+
+
+def _find_suggestions(text, limit):
+    """
+    Zapytania o podobne nazwy wspólnot, miasta i tagi.
+
+    Zwraca listę słowników: {'text', 'param', 'value', 'similarity'}
+    param/value - parametr GET, którym użytkownik zastosuje podpowiedź.
+    """
+    suggestions = []
+
+    communities = (
+        CommunityProfile.objects
+        .filter(is_active=True, name__trigram_word_similar=text)
+        .annotate(similarity=TrigramWordSimilarity(text, 'name'))
+        .order_by('-similarity')
+        .values_list('name', 'similarity')[:limit]
+    )
+    for name, similarity in communities:
+        suggestions.append({'text': name, 'param': 'search', 'value': name, 'similarity': similarity})
+
+    cities = (
+        CommunityProfile.objects
+        .filter(is_active=True, city__trigram_word_similar=text)
+        .order_by()
+        .values('city')
+        .annotate(similarity=Max(TrigramWordSimilarity(text, 'city')))
+        .order_by('-similarity')[:limit]
+    )
+    for row in cities:
+        suggestions.append({'text': row['city'], 'param': 'city', 'value': row['city'], 'similarity': row['similarity']})
+
+    tags = (
+        Tag.objects
+        .filter(name__trigram_word_similar=text)
+        .annotate(similarity=TrigramWordSimilarity(text, 'name'))
+        .order_by('-similarity')
+        .values_list('name', 'slug', 'similarity')[:limit]
+    )
+    for name, slug, similarity in tags:
+        suggestions.append({'text': name, 'param': 'tag', 'value': slug, 'similarity': similarity})
+
+    # Najlepsze dopasowania ze wszystkich kategorii, bez powtórzeń
+    suggestions.sort(key=lambda suggestion: -suggestion['similarity'])
+    unique, seen = [], set()
+    for suggestion in suggestions:
+        key = (suggestion['param'], suggestion['text'].lower())
+        if key not in seen:
+            seen.add(key)
+            unique.append(suggestion)
+    return unique[:limit]
+
+
+def suggest_search_corrections(text, limit=SUGGESTIONS_LIMIT):
+    """
+    Podpowiedzi dla tekstu, który nie dał żadnych wyników.
+
+    Wynik jest zapamiętywany w cache (z generacją katalogu).
+    Przekroczenie limitu czasu = brak podpowiedzi (pusta lista), nie błąd strony.
+    """
+    text = text.strip()
+    if len(text) < 3:
+        return []
+
+    cache_key = filters_cache_key('communities:suggestions', {'search': text.lower(), 'limit': limit})
+    suggestions = cache.get(cache_key)
+    if suggestions is not None:
+        return suggestions
+
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Ustawienia tylko dla tej transakcji (SET LOCAL)
+                cursor.execute(
+                    "SELECT set_config('statement_timeout', %s, true), "
+                    "set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                    [f'{SUGGESTIONS_TIMEOUT_MS}ms', str(SIMILARITY_THRESHOLD)],
+                )
+            suggestions = _find_suggestions(text, limit)
+            with connection.cursor() as cursor:
+                # Przy zewnętrznej transakcji (ATOMIC_REQUESTS, testy) atomic() to tylko
+                # savepoint - SET LOCAL obowiązywałby do końca całego requestu
+                cursor.execute(
+                    'SET LOCAL statement_timeout TO DEFAULT; '
+                    'SET LOCAL pg_trgm.word_similarity_threshold TO DEFAULT'
+                )
+    except DatabaseError:
+        # Przekroczony limit czasu (lub brak pg_trgm) - strona działa dalej bez podpowiedzi
+        return []
+
+    cache.set(cache_key, suggestions, SUGGESTIONS_CACHE_TIMEOUT)
+    return suggestions
@@ -0,0 +1,55 @@
+"""
+Tablica ID tagów zapisana przy wspólnocie (CommunityProfile.tag_ids).
+
+Filtr "wspólnoty z tagami 1, 3 i 7" przez tabelę pośrednią to JOIN + DISTINCT
+(albo GROUP BY / HAVING przy trybie "wszystkie"). Z tablicą i indeksem GIN
+to jeden warunek:
+    - wszystkie wybrane tagi:  tag_ids @> ARRAY[1,3,7]
+    - którykolwiek z tagów:    tag_ids && ARRAY[1,3,7]
+
+Tablica jest kopią danych z tabeli pośredniej - aktualizują ją sygnały
+(communities/signals.py) przy każdej zmianie tagów wspólnoty.
+"""
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+
+from .models import CommunityProfile
+
+# Tryby filtrowania po wielu tagach (?tags_mode=...)
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
+
+
+def build_tag_ids():
+    """
+    Wyrażenie: posortowana tablica ID tagów wspólnoty (podzapytanie, działa w UPDATE).
+    """
+    through = CommunityProfile.tags.through
+    return ArraySubquery(
+        through.objects
+        .filter(communityprofile_id=OuterRef('pk'))
+        .order_by('tag_id')
+        .values('tag_id')
+    )
+
+
+def update_tag_ids(community_ids):
+    """
+    Przelicz tablicę tagów dla podanych wspólnot (jedno zapytanie UPDATE).
+    """
+    community_ids = list(community_ids)
+    if not community_ids:
+        return 0
+    return CommunityProfile.objects.filter(pk__in=community_ids).update(tag_ids=build_tag_ids())
+
+
+def filter_by_tags(queryset, tag_ids, mode=TAGS_MODE_ANY):
+    """
+    Wspólnoty mające wszystkie (mode='all') lub którykolwiek (mode='any') z tagów.
+
+    Bez JOIN-a i bez DISTINCT - warunek na tablicy z indeksem GIN.
+    """
+    if mode == TAGS_MODE_ALL:
+        return queryset.filter(tag_ids__contains=tag_ids)
+    return queryset.filter(tag_ids__overlap=tag_ids)
@@ -1,3 +1,701 @@
-from django.test import TestCase
+"""
+Testy wydajności: stała liczba zapytań SQL niezależnie od ilości danych.
 
-# Create your tests here.
+Te same testy uruchamiamy na bazach różnej wielkości (10, 1000 i - opcjonalnie -
+50 000 wspólnot z członkami i tagami, generator z communities/seeding.py).
+Limit zapytań (QUERY_BUDGETS) jest WSPÓLNY dla wszystkich rozmiarów - jeśli liczba
+zapytań rośnie z danymi (N+1, brak select_related, COUNT w pętli...), test na większej
+bazie nie przejdzie.
+Dodatkowo każdy request musi się zmieścić w RESPONSE_TIME_CEILING sekund.
+
+Duża baza (50 000 wspólnot) tylko na żądanie:
+    PERF_TESTS_LARGE=1 python manage.py test communities
+
+W testach budżetu działa też NPlusOneMiddleware w trybie 'raise' - ustawionym jawnie
+(override_settings), niezależnie od sposobu uruchomienia testów.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+import unittest
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from . import importer
+from .directory import filter_communities, normalize_filters
+from .export import EXPORT_COLUMNS
+from .facets import compute_facets
+from .geo import filter_nearby
+from .importer import import_communities
+from .middleware import NPlusOneError, NPlusOneMiddleware
+from .models import CommunityProfile, Membership, PersonProfile, Tag
+from .pagination import KeysetPaginator
+from .permissions import MembershipResolver
+from .search import search_communities
+from .seeding import TAG_NAMES, seed_portal
+from .services import (
+    create_communities, create_community, deactivate_memberships, join_community, leave_community,
+)
+from .slugs import allocate_slugs
+from .suggestions import suggest_search_corrections
+from .text import fold_text
+from .typeahead import typeahead_index
+
+# Maksymalny czas odpowiedzi (sekundy) - z zapasem na wolne maszyny CI
+RESPONSE_TIME_CEILING = float(os.getenv('PERF_TEST_TIME_CEILING', '2.0'))
+
+# Liczba zapytań na widok - TAKA SAMA dla każdej wielkości bazy.
+# Każdy pomiar zaczyna się od pustego cache (najgorszy przypadek).
+# Zalogowany użytkownik: +2 zapytania (sesja, użytkownik).
+QUERY_BUDGETS = {
+    'list': 7,
+    'list_cached': 3,
+    'list_search': 7,
+    'list_tags': 7,
+    'detail_anonymous': 3,
+    'detail_member': 6,
+    'profile': 6,
+    'manage': 5,
+    'join': 5,
+    'leave': 5,
+    'change_role': 9,
+    'bulk_remove': 9,
+    'export': 4,
+}
+
+# Ziarno generatora danych - te same dane w każdym uruchomieniu
+SEED = 42
+
+# Średnia liczba członków zwykłej wspólnoty
+MEMBERS_PER_COMMUNITY = 5
+
+# Wspólnota, na której testujemy panel zarządzania i szczegóły
+BIG_COMMUNITY_MEMBERS = 200
+
+USER_PREFIX = 'perf_user_'
+
+
+def seed_test_portal(communities):
+    """
+    Baza testowa: `communities` wspólnot - generator z communities/seeding.py
+    (ten sam co komenda seed_portal) plus jedna duża wspólnota
+    (BIG_COMMUNITY_MEMBERS członków) z pełną hierarchią ról.
+
+    Zwraca słownik z obiektami potrzebnymi w testach.
+    """
+    User = get_user_model()
+    user_count = max(BIG_COMMUNITY_MEMBERS + 10, min(communities // 10, 5000))
+    seed_portal(
+        users=user_count,
+        communities=communities - 1,
+        memberships=(communities - 1) * MEMBERS_PER_COMMUNITY,
+        seed=SEED,
+        prefix=USER_PREFIX,
+        password='test-password',
+    )
+    user_ids = list(User.objects.filter(username__startswith=USER_PREFIX).order_by('pk').values_list('pk', flat=True))
+
+    # Duża wspólnota: owner, admin, lider, reszta członkowie
+    big_roles = {user_ids[0]: 'owner', user_ids[1]: 'admin', user_ids[2]: 'leader'}
+    big_roles.update((user_id, 'member') for user_id in user_ids[3:BIG_COMMUNITY_MEMBERS])
+    tags = list(Tag.objects.filter(name__in=TAG_NAMES))
+    tags.sort(key=lambda tag: TAG_NAMES.index(tag.name))
+    big = CommunityProfile(
+        name='Wspólnota Testowa',
+        slug=allocate_slugs(CommunityProfile, ['Wspólnota Testowa'])[0],
+        description='Duża wspólnota do testów wydajności',
+        city='Kraków',
+        city_key=fold_text('Kraków'),
+        denomination='catholic',
+        tag_ids=sorted({tags[0].pk, tags[1].pk}),
+        created_by_id=user_ids[0],
+    )
+    create_communities([big], [big_roles])
+
+    return {
+        'big': big,
+        'owner': User.objects.get(pk=user_ids[0]),
+        'admin': User.objects.get(pk=user_ids[1]),
+        'member': User.objects.get(pk=user_ids[3]),
+        'outsider': User.objects.get(pk=user_ids[BIG_COMMUNITY_MEMBERS + 5]),
+        'tags': tags,
+    }
+
+
+class QueryBudgetMixin:
+    """
+    Wspólne testy budżetu zapytań - podklasa ustawia `size` (liczba wspólnot).
+    """
+    size = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_test_portal(cls.size)
+        cls.big = cls.data['big']
+
+    def setUp(self):
+        # Zimny cache przed każdym testem - liczymy najgorszy przypadek
+        cache.clear()
+
+    def request_within_budget(self, budget_name, method, url, data=None, user=None):
+        """Wykonaj request: dokładnie QUERY_BUDGETS[budget_name] zapytań, czas < RESPONSE_TIME_CEILING."""
+        if user is not None:
+            self.client.force_login(user)
+        cache.clear()  # force_login mógł coś zapamiętać
+        with self.assertNumQueries(QUERY_BUDGETS[budget_name]):
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, data or {})
+            elapsed = time.perf_counter() - start
+        self.assertLess(
+            elapsed, RESPONSE_TIME_CEILING,
+            f'{budget_name}: {elapsed:.2f} s przy {self.size} wspólnotach',
+        )
+        return response
+
+    # --- Lista wspólnot ---
+
+    def test_list(self):
+        response = self.request_within_budget('list', 'get', reverse('communities:community_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['communities']), min(self.size, 12))
+
+    def test_list_cached(self):
+        url = reverse('communities:community_list')
+        self.client.get(url)
+        with self.assertNumQueries(QUERY_BUDGETS['list_cached']):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_search(self):
+        response = self.request_within_budget(
+            'list_search', 'get', reverse('communities:community_list'), {'search': 'wspólnota'},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_tags_and_city(self):
+        tags = self.data['tags']
+        response = self.request_within_budget(
+            'list_tags', 'get', reverse('communities:community_list'),
+            {'tags': [tags[0].pk, tags[1].pk], 'tags_mode': 'all', 'city': 'krak', 'sort': '-member_count'},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    # --- Szczegóły wspólnoty ---
+
+    def test_detail_anonymous(self):
+        response = self.request_within_budget('detail_anonymous', 'get', reverse('communities:community_detail', args=[self.big.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['members']), BIG_COMMUNITY_MEMBERS)
+
+    def test_detail_member(self):
+        response = self.request_within_budget(
+            'detail_member', 'get', reverse('communities:community_detail', args=[self.big.pk]), user=self.data['member'],
+        )
+        self.assertTrue(response.context['is_member'])
+
+    # --- Profil ---
+
+    def test_profile(self):
+        response = self.request_within_budget('profile', 'get', reverse('communities:profile'), user=self.data['owner'])
+        self.assertEqual(response.status_code, 200)
+
+    # --- Panel zarządzania ---
+
+    def test_manage(self):
+        response = self.request_within_budget(
+            'manage', 'get', reverse('communities:community_manage', args=[self.big.pk]), user=self.data['owner'],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['has_members'])
+
+    def test_export(self):
+        response = self.request_within_budget(
+            'export', 'get', reverse('communities:community_member_export', args=[self.big.pk]), user=self.data['owner'],
+        )
+        # Zapytanie o wiersze wykonuje się dopiero podczas wysyłania pliku
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), BIG_COMMUNITY_MEMBERS + 1)
+
+    # --- Zapisy ---
+
+    def test_join_and_leave(self):
+        url_join = reverse('communities:join_community', args=[self.big.pk])
+        response = self.request_within_budget('join', 'post', url_join, user=self.data['outsider'])
+        self.assertEqual(response.status_code, 302)
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.member_count, BIG_COMMUNITY_MEMBERS + 1)
+
+        url_leave = reverse('communities:leave_community', args=[self.big.pk])
+        response = self.request_within_budget('leave', 'post', url_leave)
+        self.assertEqual(response.status_code, 302)
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.member_count, BIG_COMMUNITY_MEMBERS)
+
+    def test_change_role(self):
+        membership = Membership.objects.get(community=self.big, person=self.data['member'])
+        response = self.request_within_budget(
+            'change_role', 'post',
+            reverse('communities:change_member_role', args=[self.big.pk, membership.pk]),
+            {'role': 'leader'},
+            user=self.data['owner'],
+        )
+        self.assertEqual(response.status_code, 302)
+        membership.refresh_from_db()
+        self.assertEqual((membership.role, membership.role_rank), ('leader', Membership.ROLE_RANKS['leader']))
+
+    def test_bulk_remove(self):
+        memberships = list(
+            Membership.objects.filter(community=self.big, role='member').values_list('pk', flat=True)[:50]
+        )
+        response = self.request_within_budget(
+            'bulk_remove', 'post',
+            reverse('communities:bulk_member_action', args=[self.big.pk]),
+            {'action': 'remove', 'membership_ids': memberships},
+            user=self.data['owner'],
+        )
+        self.assertEqual(response.status_code, 302)
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.member_count, BIG_COMMUNITY_MEMBERS - 50)
+
+
+@override_settings(NPLUSONE_MODE='raise')
+class SmallPortalQueryBudgetTests(QueryBudgetMixin, TestCase):
+    size = 10
+
+
+@override_settings(NPLUSONE_MODE='raise')
+class MediumPortalQueryBudgetTests(QueryBudgetMixin, TestCase):
+    size = 1000
+
+
+@unittest.skipUnless(os.getenv('PERF_TESTS_LARGE'), 'Duża baza tylko z PERF_TESTS_LARGE=1')
+@override_settings(NPLUSONE_MODE='raise')
+class LargePortalQueryBudgetTests(QueryBudgetMixin, TestCase):
+    size = 50000
+
+
+class AllocateSlugsTests(TestCase):
+    """Slugi nadawane partią (import, seed) - bez duplikatów w obrębie partii."""
+
+    def test_numbered_names_in_one_batch(self):
+        self.assertEqual(
+            allocate_slugs(CommunityProfile, ['Oaza', 'Oaza', 'Oaza 1']),
+            ['oaza', 'oaza-1', 'oaza-1-1'],
+        )
+
+    def test_numbered_name_after_existing_base(self):
+        owner = get_user_model().objects.create_user('slug_owner', password='test-password')
+        CommunityProfile.objects.create(name='Oaza', created_by=owner)
+        slugs = allocate_slugs(CommunityProfile, ['Oaza', 'Oaza 1'])
+        self.assertEqual(len(set(slugs)), 2)
+        self.assertNotIn('oaza', slugs)
+
+
+class SearchCursorPaginationTests(TestCase):
+    """Paginacja kursorowa po trafności (-rank) - granice stron bez pominięć i powtórzeń."""
+
+    def test_rank_pages_cover_every_result_once(self):
+        owner = get_user_model().objects.create_user('rank_owner', password='test-password')
+        # Różna liczba powtórzeń słowa w opisie → różne (niecałkowite) trafności, po kilka równych
+        for index in range(9):
+            CommunityProfile.objects.create(
+                name=f'Wspólnota {index}',
+                description=' '.join(['emmanuel'] * (index % 3 + 1)),
+                created_by=owner,
+            )
+        queryset = search_communities(CommunityProfile.objects.filter(is_active=True), 'emmanuel')
+        paginator = KeysetPaginator(queryset, per_page=2, ordering=('-rank', '-pk'))
+
+        seen = []
+        page = paginator.page()
+        seen.extend(community.pk for community in page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            seen.extend(community.pk for community in page)
+
+        expected = list(queryset.order_by('-rank', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(expected), 9)
+
+
+class CommunitySaveTests(TestCase):
+    """Edycja wspólnoty (formularz, admin) nie nadpisuje liczników członków."""
+
+    def test_stale_save_keeps_member_count(self):
+        User = get_user_model()
+        owner = User.objects.create_user('save_owner', password='test-password')
+        joiner = User.objects.create_user('save_joiner', password='test-password')
+        community = create_community(CommunityProfile(name='Oaza', city='Kraków'), owner=owner)
+
+        stale = CommunityProfile.objects.get(pk=community.pk)
+        join_community(joiner.pk, community.pk)
+        stale.name = 'Oaza Betania'
+        stale.save()
+
+        community.refresh_from_db()
+        self.assertEqual(community.name, 'Oaza Betania')
+        self.assertEqual((community.member_count, community.regular_member_count), (2, 1))
+
+
+# --- Testy zachowania (po jednym zestawie na funkcję) ---
+
+def make_person(username, first_name='Jan', last_name='Kowalski'):
+    """Użytkownik z profilem osoby."""
+    user = get_user_model().objects.create_user(username, password='test-password')
+    PersonProfile.objects.create(user=user, first_name=first_name, last_name=last_name)
+    return user
+
+
+def make_community(name, owner, **fields):
+    """Wspólnota z właścicielem (jak formularz tworzenia)."""
+    tags = fields.pop('tags', ())
+    return create_community(CommunityProfile(name=name, **fields), owner=owner, tags=tags)
+
+
+class FacetTests(TestCase):
+    """Liczniki filtrów liczone bez własnego wymiaru."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_person('facet_owner')
+        cls.prayer, cls.youth = Tag.objects.create(name='modlitwa', slug='modlitwa'), Tag.objects.create(name='młodzież', slug='mlodziez')
+        make_community('Oaza', owner, city='Kraków', denomination='catholic', tags=[cls.prayer])
+        make_community('Krąg', owner, city='krakow', denomination='catholic', tags=[cls.prayer, cls.youth])
+        make_community('Zbór', owner, city='Gdańsk', denomination='protestant', tags=[cls.youth])
+
+    def test_denomination_counts_ignore_selected_denomination(self):
+        facets = compute_facets({'denomination': 'catholic'})
+        self.assertEqual(facets['denomination'], {'catholic': 2, 'protestant': 1})
+        # Pozostałe wymiary - już z filtrem denominacji
+        self.assertEqual(facets['tag'], {self.prayer.pk: 2, self.youth.pk: 1})
+
+    def test_any_tag_mode_can_be_extended(self):
+        facets = compute_facets({'tags': [self.prayer.pk]})
+        self.assertEqual(facets['tag'], {self.prayer.pk: 2, self.youth.pk: 2})
+        facets = compute_facets({'tags': [self.prayer.pk], 'tags_mode': 'all'})
+        self.assertEqual(facets['tag'], {self.prayer.pk: 2, self.youth.pk: 1})
+
+    def test_city_spellings_share_one_facet(self):
+        cities = dict(compute_facets({})['city'])
+        self.assertEqual(len(cities), 2)
+        self.assertEqual(cities['Gdańsk'], 1)
+        self.assertEqual(sum(cities.values()), 3)
+
+
+class CacheInvalidationTests(TestCase):
+    """Cache katalogu i ról unieważniany po zatwierdzeniu zmian."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_person('cache_owner')
+
+    def test_directory_shows_community_created_after_caching(self):
+        url = reverse('communities:community_list')
+        make_community('Oaza Betania', self.owner)
+        self.assertEqual(len(self.client.get(url).context['communities']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_community('Krąg Emmanuel', self.owner)
+        self.assertEqual(len(self.client.get(url).context['communities']), 2)
+
+    def test_edit_refreshes_cached_results(self):
+        community = make_community('Oaza Betania', self.owner)
+        url = reverse('communities:community_list')
+        self.client.get(url, {'search': 'betania'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            community.name = 'Oaza Tabor'
+            community.save()
+        self.assertEqual(list(self.client.get(url, {'search': 'betania'}).context['communities']), [])
+
+    def test_join_invalidates_cached_roles(self):
+        community = make_community('Oaza', self.owner)
+        joiner = make_person('cache_joiner')
+        self.assertFalse(MembershipResolver(joiner).is_member(community))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            join_community(joiner.pk, community.pk)
+        self.assertTrue(MembershipResolver(joiner).is_member(community))
+
+    def test_lost_version_key_does_not_revive_old_roles(self):
+        community = make_community('Oaza', self.owner)
+        joiner = make_person('cache_joiner')
+        self.assertFalse(MembershipResolver(joiner).is_member(community))
+        with self.captureOnCommitCallbacks(execute=True):
+            join_community(joiner.pk, community.pk)
+        # Klucz wersji wypadł z cache (np. FileBasedCache MAX_ENTRIES)
+        cache.delete(f'communities:roles:version:{joiner.pk}')
+        self.assertTrue(MembershipResolver(joiner).is_member(community))
+
+
+class SuggestionTests(TestCase):
+    """Podpowiedzi "czy chodziło Ci o" (pg_trgm)."""
+
+    def test_typo_suggests_community_name(self):
+        make_community('Wspólnota Emmanuel', make_person('suggest_owner'), city='Kraków')
+        cache.clear()
+        texts = [suggestion['text'] for suggestion in suggest_search_corrections('Emanuel')]
+        self.assertIn('Wspólnota Emmanuel', texts)
+
+    def test_timeout_does_not_leak_into_outer_transaction(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            before = cursor.fetchone()[0]
+        suggest_search_corrections('cokolwiek')
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            self.assertEqual(cursor.fetchone()[0], before)
+
+
+class AutocompleteTests(TestCase):
+    """Endpoint podpowiedzi w trakcie pisania."""
+
+    def setUp(self):
+        make_community('Wspólnota Emmanuel', make_person('typeahead_owner'), city='Kraków')
+        Tag.objects.create(name='modlitwa', slug='modlitwa')
+        typeahead_index.build()
+        self.addCleanup(setattr, typeahead_index, 'built_at', None)
+
+    def test_matches_names_cities_and_tags(self):
+        url = reverse('communities:community_autocomplete')
+        data = self.client.get(url, {'q': 'emm'}).json()
+        self.assertEqual([item['name'] for item in data['communities']], ['Wspólnota Emmanuel'])
+        self.assertEqual(self.client.get(url, {'q': 'krak'}).json()['cities'], [{'name': 'Kraków'}])
+        self.assertEqual(self.client.get(url, {'q': 'modl'}).json()['tags'], [{'name': 'modlitwa', 'slug': 'modlitwa'}])
+
+    def test_short_query_returns_nothing(self):
+        data = self.client.get(reverse('communities:community_autocomplete'), {'q': 'w'}).json()
+        self.assertEqual(data['communities'], [])
+
+    def test_database_error_returns_empty_result(self):
+        typeahead_index.built_at = None
+        with mock.patch.object(typeahead_index, 'build', side_effect=DatabaseError):
+            data = self.client.get(reverse('communities:community_autocomplete'), {'q': 'emm'}).json()
+        self.assertEqual(data['communities'], [])
+
+
+class CityFilterTests(TestCase):
+    """Filtr miasta bez polskich znaków i wielkości liter."""
+
+    def test_folded_city_matches(self):
+        owner = make_person('city_owner')
+        make_community('Oaza', owner, city='Kraków')
+        make_community('Krąg', owner, city='Łódź')
+        self.assertEqual(fold_text('  KRAKÓW '), 'krakow')
+        self.assertEqual(fold_text('Łódź'), 'lodz')
+        for value in ('krakow', 'KRAKÓW', 'krak'):
+            filters = normalize_filters(QueryDict(urlencode({'city': value})))
+            self.assertEqual([c.name for c in filter_communities(filters)], ['Oaza'])
+
+
+class NearbyTests(TestCase):
+    """Wspólnoty w pobliżu - prostokąt + dokładna odległość."""
+
+    def test_only_communities_within_radius(self):
+        owner = make_person('geo_owner')
+        make_community('Kraków centrum', owner, city='Kraków', latitude=50.0614, longitude=19.9366)
+        make_community('Wieliczka', owner, city='Wieliczka', latitude=49.9871, longitude=20.0647)
+        make_community('Warszawa', owner, city='Warszawa', latitude=52.2297, longitude=21.0122)
+        make_community('Bez współrzędnych', owner, city='Kraków')
+
+        nearby = filter_nearby(CommunityProfile.objects.all(), 50.06, 19.94, 5).order_by('distance')
+        self.assertEqual([c.name for c in nearby], ['Kraków centrum'])
+        nearby = filter_nearby(CommunityProfile.objects.all(), 50.06, 19.94, 20).order_by('distance')
+        self.assertEqual([c.name for c in nearby], ['Kraków centrum', 'Wieliczka'])
+        self.assertLess(nearby[1].distance, 20)
+
+
+class TagFilterTests(TestCase):
+    """Wiele tagów: którykolwiek / wszystkie."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_person('tags_owner')
+        cls.a, cls.b, cls.c = (Tag.objects.create(name=name, slug=name) for name in ('a', 'b', 'c'))
+        make_community('AB', owner, tags=[cls.a, cls.b])
+        make_community('A', owner, tags=[cls.a])
+        make_community('C', owner, tags=[cls.c])
+
+    def names(self, params):
+        return sorted(c.name for c in filter_communities(normalize_filters(QueryDict(params))))
+
+    def test_any_and_all(self):
+        self.assertEqual(self.names(f'tags={self.a.pk}&tags={self.b.pk}'), ['A', 'AB'])
+        self.assertEqual(self.names(f'tags={self.a.pk}&tags={self.b.pk}&tags_mode=all'), ['AB'])
+
+    def test_out_of_range_tag_id_is_ignored(self):
+        self.assertEqual(normalize_filters(QueryDict('tags=99999999999999999999')), {})
+        response = self.client.get(reverse('communities:community_list'), {'tags': '3000000000'})
+        self.assertEqual(response.status_code, 200)
+
+
+class JoinLeaveTests(TestCase):
+    """Dołączanie przez upsert i warunkowe usuwanie."""
+
+    def setUp(self):
+        self.owner = make_person('join_owner')
+        self.person = make_person('join_person')
+        self.community = make_community('Oaza', self.owner)
+
+    def test_rejoin_reactivates_membership(self):
+        membership_id = join_community(self.person.pk, self.community.pk)
+        self.assertIsNone(join_community(self.person.pk, self.community.pk))  # już jest członkiem
+        deactivate_memberships(self.community.pk, [Membership.objects.get(pk=membership_id)])
+
+        self.assertEqual(join_community(self.person.pk, self.community.pk), membership_id)
+        self.assertTrue(Membership.objects.get(pk=membership_id).is_active)
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.member_count, 2)
+
+    def test_owner_cannot_leave(self):
+        self.assertIsNone(leave_community(self.owner.pk, self.community.pk))
+        self.assertTrue(Membership.objects.filter(person=self.owner, community=self.community, is_active=True).exists())
+
+        join_community(self.person.pk, self.community.pk)
+        self.assertEqual(leave_community(self.person.pk, self.community.pk), 'member')
+        self.community.refresh_from_db()
+        self.assertEqual((self.community.member_count, self.community.owner_count), (1, 1))
+
+
+class BulkMemberActionTests(TestCase):
+    """Akcje zbiorcze - te same zasady co pojedyncze akcje."""
+
+    def test_leader_removes_only_regular_members(self):
+        owner, admin, leader, member = (make_person(f'bulk_{role}') for role in ('owner', 'admin', 'leader', 'member'))
+        community = make_community('Oaza', owner)
+        for user, role in ((admin, 'admin'), (leader, 'leader'), (member, 'member')):
+            join_community(user.pk, community.pk, role=role)
+        targets = Membership.objects.filter(community=community, person__in=[admin, member])
+
+        self.client.force_login(leader)
+        response = self.client.post(
+            reverse('communities:bulk_member_action', args=[community.pk]),
+            {'action': 'remove', 'membership_ids': [membership.pk for membership in targets]},
+        )
+        self.assertEqual(response.status_code, 302)
+        remaining = set(Membership.objects.filter(community=community).values_list('person__username', flat=True))
+        self.assertEqual(remaining, {'bulk_owner', 'bulk_admin', 'bulk_leader'})
+        community.refresh_from_db()
+        self.assertEqual((community.member_count, community.regular_member_count), (3, 0))
+
+    def test_regular_member_is_refused(self):
+        owner, member = make_person('bulk_owner'), make_person('bulk_member')
+        community = make_community('Oaza', owner)
+        join_community(member.pk, community.pk)
+        self.client.force_login(member)
+        self.client.post(
+            reverse('communities:bulk_member_action', args=[community.pk]),
+            {'action': 'remove', 'membership_ids': list(Membership.objects.values_list('pk', flat=True))},
+        )
+        self.assertEqual(Membership.objects.filter(community=community).count(), 2)
+
+
+class MemberExportTests(TestCase):
+    """Eksport członków CSV/JSONL."""
+
+    def setUp(self):
+        self.owner = make_person('export_owner', 'Anna', 'Nowak')
+        self.community = make_community('Oaza', self.owner)
+        join_community(make_person('export_member', '=HYPERLINK("http://x")', '+48').pk, self.community.pk)
+        self.client.force_login(self.owner)
+        self.url = reverse('communities:community_member_export', args=[self.community.pk])
+
+    def test_csv_rows_and_formula_cells(self):
+        content = b''.join(self.client.get(self.url).streaming_content).decode()
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual(rows[0], list(EXPORT_COLUMNS))
+        self.assertEqual(rows[1][:3], ['Anna', 'Nowak', 'export_owner'])
+        self.assertEqual(rows[2][:2], ['\'=HYPERLINK("http://x")', "'+48"])
+
+    def test_jsonl_keeps_raw_values(self):
+        response = self.client.get(self.url, {'format': 'jsonl'})
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([line['username'] for line in lines], ['export_owner', 'export_member'])
+        self.assertEqual(lines[1]['first_name'], '=HYPERLINK("http://x")')
+
+    def test_regular_member_cannot_export(self):
+        self.client.force_login(get_user_model().objects.get(username='export_member'))
+        self.assertNotEqual(self.client.get(self.url).status_code, 200)
+
+
+class ImportTests(TestCase):
+    """Masowy import - statystyki i ponowienie po konflikcie slugów."""
+
+    def setUp(self):
+        self.owner = make_person('import_owner')
+        make_person('import_member')
+
+    def test_stats(self):
+        rows = [
+            {'name': 'Oaza', 'city': 'Kraków', 'tags': 'modlitwa;Młodzież', 'owner': 'import_owner',
+             'members': 'import_member:leader;nieznany'},
+            {'name': 'Oaza', 'city': 'Gdańsk', 'owner': 'import_owner'},
+            {'name': '', 'city': 'Kraków'},
+        ]
+        stats = import_communities(rows)
+        self.assertEqual((stats.rows, stats.communities, stats.memberships, stats.skipped), (3, 2, 3, 1))
+        self.assertEqual(stats.tags_created, 2)
+        self.assertEqual(sorted(CommunityProfile.objects.values_list('slug', flat=True)), ['oaza', 'oaza-1'])
+        community = CommunityProfile.objects.get(city='Kraków')
+        self.assertEqual((community.member_count, community.leader_count), (2, 1))
+
+    def test_slug_conflict_is_retried(self):
+        make_community('Oaza', self.owner)
+        real_allocate = importer.allocate_slugs
+        calls = []
+
+        def stale_first(model, names):
+            calls.append(names)
+            # Pierwsza próba: slug zajęty "równolegle" (jak po wyścigu)
+            return ['oaza'] if len(calls) == 1 else real_allocate(model, names)
+
+        with mock.patch.object(importer, 'allocate_slugs', side_effect=stale_first):
+            stats = import_communities([{'name': 'Oaza', 'city': 'Kraków'}])
+        self.assertEqual((len(calls), stats.communities), (2, 1))
+        self.assertTrue(CommunityProfile.objects.filter(slug='oaza-1').exists())
+
+
+class PerformanceMiddlewareTests(TestCase):
+    """Server-Timing i wykrywanie N+1."""
+
+    @override_settings(PERF_TIMING_HEADER=True, PERF_TIMING_SAMPLE_RATE=1.0)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('communities:community_list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=')
+        self.assertNotIn('Server-Timing', self.client.get(f'{settings.STATIC_URL}missing.css'))
+
+    @override_settings(PERF_TIMING_HEADER=False, PERF_TIMING_SAMPLE_RATE=1.0)
+    def test_header_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('communities:community_list')))
+
+    @override_settings(NPLUSONE_MODE='raise', NPLUSONE_THRESHOLD=3)
+    def test_repeated_query_shape_raises(self):
+        def view(request):
+            for pk in range(5):
+                CommunityProfile.objects.filter(pk=pk).exists()
+            return HttpResponse()
+
+        middleware = NPlusOneMiddleware(view)
+        with self.assertRaises(NPlusOneError):
+            middleware(RequestFactory().get('/'))
+
+    @override_settings(NPLUSONE_MODE='raise', NPLUSONE_THRESHOLD=3)
+    def test_distinct_queries_pass(self):
+        def view(request):
+            CommunityProfile.objects.exists()
+            Tag.objects.exists()
+            return HttpResponse('ok')
+
+        self.assertEqual(NPlusOneMiddleware(view)(RequestFactory().get('/')).content, b'ok')
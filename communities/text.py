@@ -0,0 +1,22 @@
+"""
+Normalizacja tekstu do porównań (miasta, podpowiedzi, wyszukiwanie po prefiksie).
+
+"Kraków", "krakow " i "KRAKÓW" → "krakow"
+"""
+
+import unicodedata
+
+# Litery, które NIE rozkładają się na literę + znak diakrytyczny (NFKD)
+_EXTRA_FOLDS = str.maketrans({'ł': 'l', 'đ': 'd', 'ø': 'o', 'ß': 'ss'})
+
+
+def fold_text(value):
+    """
+    Zwróć klucz porównania: bez polskich znaków, małymi literami,
+    bez nadmiarowych spacji.
+    """
+    if not value:
+        return ''
+    value = ' '.join(value.split()).casefold().translate(_EXTRA_FOLDS)
+    value = unicodedata.normalize('NFKD', value)
+    return ''.join(char for char in value if not unicodedata.combining(char))
@@ -0,0 +1,278 @@
+"""
+Podpowiedzi w trakcie pisania (typeahead / autocomplete).
+
+Każde naciśnięcie klawisza w polu wyszukiwania to zapytanie - nie chcemy,
+żeby każde trafiało do PostgreSQL. Dlatego każdy proces (worker gunicorna)
+trzyma w pamięci mały indeks prefiksów:
+    - nazwy aktywnych wspólnot (od początku każdego słowa)
+    - miasta
+    - nazwy tagów
+
+Indeks:
+    - jest budowany przy starcie (portal_united/wsgi.py) albo przy pierwszym użyciu
+    - jest aktualizowany na bieżąco z sygnałów (zapis/usunięcie wspólnoty lub tagu)
+    - co REBUILD_INTERVAL sekund jest przebudowywany w tle - żeby zmiany
+      zrobione w INNYCH workerach też w końcu dotarły
+
+Wyszukiwanie to bisect po posortowanej liście kluczy - mikrosekundy.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.db import DatabaseError, connection
+
+from .models import CommunityProfile, Tag
+from .text import fold_text
+
+logger = logging.getLogger(__name__)
+
+# Co ile sekund przebudować indeks z bazy (zmiany z innych workerów)
+REBUILD_INTERVAL = 600
+
+# Maksymalna liczba wyników w jednej kategorii
+MAX_RESULTS_PER_CATEGORY = 10
+
+
+class PrefixIndex:
+    """
+    Posortowana lista (klucz, id) + słownik id → dane.
+
+    Jeden element może mieć kilka kluczy (np. każde słowo nazwy),
+    wyniki są deduplikowane po id.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._items = {}
+        self._bulk = False
+
+    def __len__(self):
+        return len(self._items)
+
+    @staticmethod
+    def _item_keys(label, every_word):
+        folded = fold_text(label)
+        if not folded:
+            return []
+        if not every_word:
+            return [folded]
+        # "wspolnota emmanuel krakow" → też "emmanuel krakow" i "krakow"
+        words = folded.split(' ')
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def add(self, item_id, label, data, every_word=False):
+        self.remove(item_id)
+        keys = self._item_keys(label, every_word)
+        if self._bulk:
+            self._keys.extend((key, item_id) for key in keys)
+        else:
+            for key in keys:
+                insort(self._keys, (key, item_id))
+        self._items[item_id] = (keys, data)
+
+    def start_bulk(self):
+        """
+        Budowanie od zera: add() tylko dopisuje klucze, finish_bulk() sortuje raz.
+
+        insort przy każdym kluczu to O(n²) - setki tysięcy kluczy to sekundy.
+        W trybie bulk nie wolno wywoływać remove() ani search().
+        """
+        self._bulk = True
+
+    def finish_bulk(self):
+        self._keys.sort()
+        self._bulk = False
+
+    def remove(self, item_id):
+        entry = self._items.pop(item_id, None)
+        if entry is None:
+            return
+        for key in entry[0]:
+            position = bisect_left(self._keys, (key, item_id))
+            if position < len(self._keys) and self._keys[position] == (key, item_id):
+                del self._keys[position]
+
+    def search(self, prefix, limit):
+        results, seen = [], set()
+        position = bisect_left(self._keys, (prefix,))
+        while position < len(self._keys) and len(results) < limit:
+            key, item_id = self._keys[position]
+            if not key.startswith(prefix):
+                break
+            if item_id not in seen:
+                seen.add(item_id)
+                results.append(self._items[item_id][1])
+            position += 1
+        return results
+
+
+class TypeaheadIndex:
+    """
+    Indeks podpowiedzi jednego procesu (wspólnoty, miasta, tagi).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuilding = False
+        self.built_at = None
+        # Zmiany z sygnałów w trakcie budowania (None = nikt nie buduje)
+        self._pending = None
+        self._reset()
+
+    def _reset(self):
+        self.communities = PrefixIndex()
+        self.cities = PrefixIndex()
+        self.tags = PrefixIndex()
+        # Miasto może mieć wiele wspólnot - usuwamy je dopiero gdy zniknie ostatnia
+        self._community_city = {}
+        self._city_refs = Counter()
+
+    # --- Budowanie ---
+
+    def build(self):
+        """
+        Zbuduj indeks od zera (2 zapytania, tylko potrzebne kolumny).
+
+        Zmiany z sygnałów, które przyjdą w trakcie, są zapamiętywane
+        i nakładane na nowy indeks tuż przed podmianą.
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            fresh = TypeaheadIndex()
+            for index in (fresh.communities, fresh.cities, fresh.tags):
+                index.start_bulk()
+            communities = CommunityProfile.objects.filter(is_active=True).order_by().values_list('pk', 'name', 'city')
+            for pk, name, city in communities.iterator(chunk_size=2000):
+                fresh._add_community(pk, name, city)
+            for pk, name, slug in Tag.objects.order_by().values_list('pk', 'name', 'slug'):
+                fresh._add_tag(pk, name, slug)
+            for index in (fresh.communities, fresh.cities, fresh.tags):
+                index.finish_bulk()
+
+            with self._lock:
+                for change in self._pending:
+                    change(fresh)
+                self.communities, self.cities, self.tags = fresh.communities, fresh.cities, fresh.tags
+                self._community_city, self._city_refs = fresh._community_city, fresh._city_refs
+                self.built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def warm(self):
+        """Zbuduj indeks przy starcie procesu - błąd bazy nie blokuje startu."""
+        try:
+            self.build()
+        except DatabaseError:
+            logger.warning('Nie udało się zbudować indeksu podpowiedzi przy starcie.', exc_info=True)
+
+    def _rebuild_in_background(self):
+        try:
+            self.build()
+        except DatabaseError:
+            logger.warning('Nie udało się przebudować indeksu podpowiedzi.', exc_info=True)
+        finally:
+            self._rebuilding = False
+            connection.close()  # wątek ma własne połączenie z bazą
+
+    def _ensure_fresh(self):
+        """Czy indeks jest gotowy? Błąd bazy przy pierwszym budowaniu = False (bez podpowiedzi)."""
+        if self.built_at is None:
+            # Pierwsze użycie - trzeba poczekać
+            with self._lock:
+                if self.built_at is None:
+                    try:
+                        self.build()
+                    except DatabaseError:
+                        logger.warning('Nie udało się zbudować indeksu podpowiedzi.', exc_info=True)
+                        return False
+            return True
+
+        if time.monotonic() - self.built_at > REBUILD_INTERVAL and not self._rebuilding:
+            # Stary indeks - przebuduj w tle, a w międzyczasie odpowiadaj ze starego
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+        return True
+
+    # --- Aktualizacje (z sygnałów) ---
+
+    def _add_community(self, pk, name, city):
+        self.communities.add(pk, name, {'id': pk, 'name': name}, every_word=True)
+        city_key = fold_text(city)
+        if city_key:
+            self._community_city[pk] = city_key
+            self._city_refs[city_key] += 1
+            if self._city_refs[city_key] == 1:
+                self.cities.add(city_key, city, {'name': city})
+
+    def _remove_community(self, pk):
+        self.communities.remove(pk)
+        city_key = self._community_city.pop(pk, None)
+        if city_key:
+            self._city_refs[city_key] -= 1
+            if self._city_refs[city_key] <= 0:
+                del self._city_refs[city_key]
+                self.cities.remove(city_key)
+
+    def _add_tag(self, pk, name, slug):
+        self.tags.add(pk, name, {'name': name, 'slug': slug}, every_word=True)
+
+    def _apply(self, change):
+        """
+        Zastosuj zmianę (funkcja przyjmująca indeks) do bieżącego indeksu
+        i zapamiętaj ją dla trwającej przebudowy - inaczej podmiana na
+        świeży indeks (zbudowany z wcześniejszego stanu bazy) by ją zgubiła.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(change)
+            if self.built_at is not None:
+                change(self)
+            # Indeks jeszcze niezbudowany - zbuduje się przy pierwszym użyciu (już z tą zmianą)
+
+    def update_community(self, community):
+        pk, name, city, is_active = community.pk, community.name, community.city, community.is_active
+
+        def change(index):
+            index._remove_community(pk)
+            if is_active:
+                index._add_community(pk, name, city)
+        self._apply(change)
+
+    def remove_community(self, pk):
+        self._apply(lambda index: index._remove_community(pk))
+
+    def update_tag(self, tag):
+        pk, name, slug = tag.pk, tag.name, tag.slug
+        self._apply(lambda index: index._add_tag(pk, name, slug))
+
+    def remove_tag(self, pk):
+        self._apply(lambda index: index.tags.remove(pk))
+
+    # --- Wyszukiwanie ---
+
+    def lookup(self, query, limit=5):
+        """
+        Zwróć podpowiedzi dla wpisanego tekstu:
+            {'communities': [...], 'cities': [...], 'tags': [...]}
+        """
+        prefix = fold_text(query)
+        limit = max(1, min(limit, MAX_RESULTS_PER_CATEGORY))
+        if not prefix or not self._ensure_fresh():
+            return {'communities': [], 'cities': [], 'tags': []}
+
+        with self._lock:
+            return {
+                'communities': self.communities.search(prefix, limit),
+                'cities': self.cities.search(prefix, limit),
+                'tags': self.tags.search(prefix, limit),
+            }
+
+
+# Jeden indeks na proces
+typeahead_index = TypeaheadIndex()
@@ -9,6 +9,7 @@ urlpatterns = [
     # path('communities/<int:pk>/', views.community_detail, name='community_detail'),  # Szczegóły
     path('', views.HomeView.as_view(), name='home'), # Strona główna
     path('communities/', views.CommunityListView.as_view(), name='community_list'),  # Lista
+    path('communities/autocomplete/', views.community_autocomplete, name='community_autocomplete'),  # Podpowiedzi (JSON)
     path('communities/<int:pk>/', views.CommunityDetailView.as_view(), name='community_detail'), # Szczegóły
     path('profile/', views.ProfileView.as_view(), name='profile'),
     path('profile/edit/', views.ProfileEditView.as_view(), name='profile_edit'),
@@ -22,4 +23,6 @@ urlpatterns = [
     path('communities/<int:pk>/manage/', views.CommunityManageView.as_view(), name='community_manage'),
     path('communities/<int:pk>/member/<int:membership_id>/change-role/', views.change_member_role, name='change_member_role'),
     path('communities/<int:pk>/member/<int:membership_id>/remove/', views.remove_member, name='remove_member'),
+    path('communities/<int:pk>/members/export/', views.CommunityMemberExportView.as_view(), name='community_member_export'),  # CSV/JSONL
+    path('communities/<int:pk>/members/bulk/', views.bulk_member_action, name='bulk_member_action'),  # Akcje zbiorcze
 ]
@@ -1,15 +1,28 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import transaction
 from django.db.models import Q
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.decorators.http import require_POST
-from django.views.generic import TemplateView, ListView, DetailView, UpdateView, CreateView, DeleteView
+from django.views.decorators.http import require_GET, require_POST
+from django.views.generic import View, TemplateView, ListView, DetailView, UpdateView, CreateView, DeleteView
 from django.urls import reverse_lazy
 from .models import CommunityProfile, Tag, PersonProfile, Membership
+from . import counters, services
 from .forms import CommunityCreateForm, CommunityEditForm
 from .mixins import CommunityAdminRequiredMixin, CommunityOwnerRequiredMixin, CommunityLeaderRequiredMixin
+from .export import EXPORT_FORMATS, EXPORT_STREAMS, member_export_rows
+from .members import load_member_sections
+from .permissions import MANAGER_ROLES, get_membership_resolver, removal_error, role_change_error
+from .pagination import CursorPage, InvalidCursor, KeysetPaginator
+from .directory import filter_communities, filters_cache_key, normalize_filters
+from .facets import get_facets
+from .geo import DEFAULT_RADIUS_KM, RADIUS_OPTIONS
+from .suggestions import suggest_search_corrections
+from .typeahead import typeahead_index
 
 @login_required
 @require_POST  # Tylko POST request (bezpieczeństwo - nie da się kliknąć w link GET)
@@ -18,8 +31,8 @@ def join_community(request, pk):
     Dołącz do wspólnoty.
 
     Logika:
-    - Sprawdź czy użytkownik NIE jest już członkiem
-    - Stwórz Membership z rolą 'member'
+    - Stwórz Membership z rolą 'member' (albo reaktywuj nieaktywne)
+      - jeśli użytkownik już jest członkiem, nic się nie zmienia
     - Przekieruj z komunikatem sukcesu
     
     @login_required - wymaga zalogowania (przekierowuje do /accounts/login/)
@@ -42,27 +55,18 @@ def join_community(request, pk):
         )
         return redirect('communities:profile_edit')
     
-    # Sprawdź czy użytkownik już jest członkiem
-    already_member = Membership.objects.filter(
-        person=request.user,
-        community=community,
-        is_active=True 
-    ).exists()
+    # Dołącz - jedno zapytanie INSERT ... ON CONFLICT (razem z licznikami)
+    # Nieaktywne członkostwo zostaje reaktywowane; już aktywne → None
+    membership_id = services.join_community(request.user.pk, community.pk)
     
-    if already_member:
+    if membership_id is None:
         # Już jest członkiem - nie dodawaj ponownie
         messages.warning(
             request, 
             f'Już należysz do wspólnoty "{community.name}".'
         )
     else:
-        # Stwórz nowe członkostwo
-        Membership.objects.create(
-            person=request.user,
-            community=community,
-            role='member',  # Domyślnie zwykły członek
-            is_active=True # 💡na przyszlosc - mozna zrobic False i aktywowac
-        )
+        get_membership_resolver(request.user).invalidate()
         
         messages.success(
             request,
@@ -89,13 +93,9 @@ def leave_community(request, pk):
     community = get_object_or_404(CommunityProfile, pk=pk, is_active=True)
     
     # Sprawdź czy użytkownik jest członkiem
-    try:
-        membership = Membership.objects.get(
-            person=request.user,
-            community=community,
-            is_active=True
-        )
-    except Membership.DoesNotExist:
+    resolver = get_membership_resolver(request.user)
+    membership = resolver.membership_in(community)
+    if membership is None:
         # Nie jest członkiem
         messages.warning(
             request,
@@ -114,7 +114,16 @@ def leave_community(request, pk):
     
     # Opuść wspólnotę - usuń membership
     # OPCJA A: Całkowite usunięcie (bez historii)
-    membership.delete()
+    # Jedno zapytanie DELETE ... RETURNING (razem z licznikami) - warunki roli
+    # są sprawdzane jeszcze raz w bazie (rola mogła się zmienić w międzyczasie)
+    removed_role = services.leave_community(request.user.pk, community.pk)
+    resolver.invalidate()
+    if removed_role is None:
+        messages.warning(
+            request,
+            f'Nie udało się opuścić wspólnoty "{community.name}" - odśwież stronę i spróbuj ponownie.'
+        )
+        return redirect('communities:community_detail', pk=community.pk)
     
     # OPCJA B: Dezaktywacja (zachowaj historię)
     # membership.is_active = False
@@ -139,6 +148,28 @@ class CommunityListView(ListView):
     context_object_name = 'communities'
     paginate_by = 12  # 12 wspólnot na stronę
 
+    # Tryb paginacji:
+    # 'cursor' - kursorowa (?cursor=...) - stały koszt każdej strony, bez COUNT
+    # 'offset' - klasyczna (?page=N) - pokazuje "strona X z Y"
+    pagination_mode = 'cursor'
+
+    # Dozwolone sortowania (?sort=...) → pełna kolejność (zawsze zakończona pk).
+    # Każde ma pasujący indeks w CommunityProfile.Meta.indexes.
+    SORT_OPTIONS = {
+        '-created_at': ('-created_at', '-pk'),
+        'created_at': ('created_at', 'pk'),
+        'name': ('name', 'pk'),
+        '-name': ('-name', '-pk'),
+        '-member_count': ('-member_count', '-pk'),  # najpopularniejsze
+        '-rank': ('-rank', '-pk'),  # tylko przy wyszukiwaniu
+        'distance': ('distance', 'pk'),  # najbliższe - tylko z położeniem (?lat=&lng=)
+    }
+
+    # Ile sekund trzymać wyniki w cache. Zmiany wspólnot i tagów unieważniają
+    # cache od razu (generacja katalogu), ten limit dotyczy tylko danych
+    # zmienianych bez sygnałów - np. liczników członków przy sortowaniu po popularności.
+    RESULT_CACHE_TIMEOUT = 300
+
     def get_queryset(self):
         """
         Filtrowanie wspólnot na podstawie parametrów GET.
@@ -146,7 +177,7 @@ class CommunityListView(ListView):
         Proste wyszukiwanie - jedno pole szuka po wszystkim.
 
         Wyszukiwanie zaawansowane - bsługuje:
-        - search: wyszukiwanie po nazwie i opisie
+        - search: wyszukiwanie pełnotekstowe (nazwa, tagi, miasto, opis) - wyniki wg trafności
         - city: filtrowanie po mieście
         - denomination: filtrowanie po denominacji
         - tags: filtrowanie po tagach (można wybrać wiele)
@@ -154,74 +185,179 @@ class CommunityListView(ListView):
 
         queryset = CommunityProfile.objects.filter(is_active=True).select_related('created_by').prefetch_related('tags')
 
-        # Wyszukiwanie po nazwie i opisie
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(city__icontains=search) |
-                Q(tags__name__icontains=search)  # Szuka też w tagach!
-            ).distinct()
-
-    # ZAAWANSOWANE wyszukiwanie
-        # Filtrowanie po mieście
-        city = self.request.GET.get('city')
-        if city:
-            queryset = queryset.filter(city__icontains=city)
-        
-        # Filtrowanie po denominacji
-        denomination = self.request.GET.get('denomination')
-        if denomination:
-            queryset = queryset.filter(denomination=denomination)
-        
-        # Filtrowanie tag (tylko jeden z dropdown)
-        tag = self.request.GET.get('tag')
-        if tag:
-            queryset = queryset.filter(tags__slug=tag)
-        # # Filtrowanie po tagach
-        # tag_slug = self.request.GET.get('tag')
-        # if tag_slug:
-        #     queryset = queryset.filter(tags__slug=tag_slug)
-        
-        # Filtrowanie po tagach - WYBÓR WIELU -nieaktywne (można wybrać wiele)
-        # Pobierz listę ID tagów z GET (może być wiele)
-        tag_ids = self.request.GET.getlist('tags')  # getlist! nie get
-        if tag_ids:
-            # Filtruj wspólnoty które mają KTÓRYKOLWIEK z wybranych tagów
-            queryset = queryset.filter(tags__id__in=tag_ids).distinct()
-        
-        # Wyszukiwanie po nazwie
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search)
-            )
-        
+        # Filtry z GET w postaci kanonicznej (patrz communities/directory.py)
+        self.filters = normalize_filters(self.request.GET)
+        queryset = filter_communities(self.filters, queryset)
+
         # Sortowanie (opcjonalnie)
-        sort_by = self.request.GET.get('sort', '-created_at')
-        queryset = queryset.order_by(sort_by)
+        self.ordering = self.get_sort_ordering(queryset)
+        return queryset.order_by(*self.ordering)
 
-        return queryset.distinct()
+    def get_sort_ordering(self, queryset):
+        """
+        Zwróć kolejność sortowania na podstawie ?sort=...
+
+        Przy wyszukiwaniu domyślnie najtrafniejsze wyniki na górze,
+        przy wyszukiwaniu w pobliżu - najbliższe.
+        Nieznane wartości są ignorowane (nie przekazujemy GET prosto do order_by).
+        """
+        annotations = queryset.query.annotations
+        if 'distance' in annotations:
+            default_sort = 'distance'
+        elif 'rank' in annotations:
+            default_sort = '-rank'
+        else:
+            default_sort = '-created_at'
+        sort_by = self.request.GET.get('sort', default_sort)
+        if sort_by not in self.SORT_OPTIONS or sort_by.lstrip('-') in ('rank', 'distance') and sort_by.lstrip('-') not in annotations:
+            sort_by = default_sort
+        return self.SORT_OPTIONS[sort_by]
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Paginacja kursorowa (domyślnie) lub klasyczna (pagination_mode = 'offset').
+
+        Wynik (ID wspólnot na stronie + kursory/numer strony) jest zapamiętywany
+        w cache - przy trafieniu pobieramy tylko wspólnoty po pk (pk__in).
+        """
+        cache_key = self.get_result_cache_key(page_size)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return self.paginate_from_cache(queryset, page_size, cached)
+
+        if self.pagination_mode != 'cursor':
+            result = super().paginate_queryset(queryset, page_size)
+            paginator, page = result[0], result[1]
+            cached = {'count': paginator.count, 'number': page.number}
+        else:
+            paginator = KeysetPaginator(queryset, page_size, self.ordering)
+            try:
+                page = paginator.page(self.request.GET.get('cursor'))
+            except InvalidCursor:
+                raise Http404('Nieprawidłowy kursor strony.')
+            result = (paginator, page, page.object_list, page.has_other_pages())
+            cached = {'next': page.next_cursor, 'previous': page.previous_cursor}
+
+        cached['pks'] = [community.pk for community in page.object_list]
+        cache.set(cache_key, cached, self.RESULT_CACHE_TIMEOUT)
+        return result
+
+    def paginate_from_cache(self, queryset, page_size, cached):
+        """
+        Odtwórz stronę z zapamiętanej listy ID (jedno zapytanie pk__in + prefetch tagów).
+
+        Zapytanie idzie przez ten sam queryset - zostają adnotacje (rank, distance).
+        """
+        object_list = []
+        if cached['pks']:
+            communities = queryset.filter(pk__in=cached['pks'])
+            by_pk = {community.pk: community for community in communities}
+            # Zachowaj kolejność z cache
+            object_list = [by_pk[pk] for pk in cached['pks'] if pk in by_pk]
+
+        if self.pagination_mode != 'cursor':
+            paginator = self.get_paginator(queryset, page_size)
+            paginator.count = cached['count']  # bez COUNT(*)
+            page = Page(object_list, cached['number'], paginator)
+        else:
+            paginator = KeysetPaginator(queryset, page_size, self.ordering)
+            page = CursorPage(object_list, next_cursor=cached['next'], previous_cursor=cached['previous'])
+
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_result_cache_key(self, page_size):
+        """
+        Klucz cache wyników: filtry + sortowanie + strona (kursor lub numer).
+        """
+        params = dict(self.filters, sort=list(self.ordering), per_page=page_size)
+        if self.pagination_mode == 'cursor':
+            params['cursor'] = self.request.GET.get('cursor', '')
+        else:
+            params['page'] = self.request.GET.get('page', '1')
+        return filters_cache_key('communities:results', params)
+
+    def get_result_count(self):
+        """
+        Liczba wszystkich wyników dla aktualnych filtrów (wspólna dla wszystkich stron i sortowań).
+        """
+        cache_key = filters_cache_key('communities:result-count', self.filters)
+        count = cache.get(cache_key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(cache_key, count, self.RESULT_CACHE_TIMEOUT)
+        return count
     
     def get_context_data(self, **kwargs):
         """Dodatkowe dane do template"""
         context = super().get_context_data(**kwargs)
 
-        # Lista wszystkich tagów (dla formularza)
-        context['all_tags'] = Tag.objects.all().order_by('name')
+        # Liczniki filtrów dla aktualnych wyników (3 zapytania GROUP BY + cache)
+        facets = get_facets(self.filters)
+
+        # Lista wszystkich tagów (dla formularza) - z liczbą pasujących wspólnot
+        all_tags = list(Tag.objects.all().order_by('name'))
+        for tag in all_tags:
+            tag.facet_count = facets['tag'].get(tag.pk, 0)
+            tag.selected = tag.pk in self.filters.get('tags', [])
+        context['all_tags'] = all_tags
         # context['tags'] = Tag.objects.all()
-        context['denominations'] = CommunityProfile.DENOMINATION_CHOICES
+        context['denominations'] = [
+            (value, label, facets['denomination'].get(value, 0))
+            for value, label in CommunityProfile.DENOMINATION_CHOICES
+        ]
+        context['city_facets'] = facets['city']
 
                 # Zachowaj parametry wyszukiwania (dla paginacji i formularza)
         context['current_search'] = self.request.GET.get('search', '')
         context['current_city'] = self.request.GET.get('city', '')
         context['current_denomination'] = self.request.GET.get('denomination', '')
         context['selected_tags'] = self.request.GET.getlist('tags')
+        context['pagination_mode'] = self.pagination_mode
+        context['near_me'] = 'lat' in self.filters
+        context['current_radius'] = self.filters.get('radius', DEFAULT_RADIUS_KM)
+        context['radius_options'] = RADIUS_OPTIONS
+        context['result_count'] = self.get_result_count()
+
+        # Brak wyników wyszukiwania → "Czy chodziło Ci o...?" (literówki, pg_trgm)
+        context['suggestions'] = []
+        if 'search' in self.filters and not context['result_count']:
+            context['suggestions'] = suggest_search_corrections(self.filters['search'])
 
         return context
-    
+
+
+# Minimalna długość tekstu dla podpowiedzi
+AUTOCOMPLETE_MIN_LENGTH = 2
+AUTOCOMPLETE_DEFAULT_LIMIT = 5
+
+
+@require_GET
+def community_autocomplete(request):
+    """
+    Podpowiedzi w trakcie pisania (JSON): nazwy wspólnot, miasta, tagi.
+
+    GET /communities/autocomplete/?q=kra&limit=5
+
+    Odpowiedź pochodzi z indeksu w pamięci procesu (communities/typeahead.py),
+    więc kolejne naciśnięcia klawiszy nie trafiają do bazy danych.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = int(request.GET.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+    except ValueError:
+        limit = AUTOCOMPLETE_DEFAULT_LIMIT
+
+    if len(query) < AUTOCOMPLETE_MIN_LENGTH:
+        results = {'communities': [], 'cities': [], 'tags': []}
+    else:
+        results = typeahead_index.lookup(query, limit)
+
+    response = JsonResponse({'query': query, **results})
+    # Podpowiedzi mogą chwilę poleżeć w cache przeglądarki
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
 class CommunityDetailView(DetailView):
     """Szczegóły wspólnoty"""
     model = CommunityProfile
@@ -238,29 +374,14 @@ class CommunityDetailView(DetailView):
         context = super().get_context_data(**kwargs)
         context['members'] = self.object.memberships.filter(
             is_active=True
-        ).select_related('person__person_profile').order_by('-joined_date')
+        ).select_related('person__person_profile').order_by('role_rank', '-joined_date')  # indeks membership_community_rank_idx
 
         # NOWE - sprawdź czy zalogowany użytkownik jest członkiem
-        if self.request.user.is_authenticated:
-            try:
-                # Spróbuj znaleźć membership
-                membership = self.object.memberships.get(
-                    person=self.request.user,
-                    is_active=True
-                )
-                context['user_membership'] = membership
-                context['is_member'] = True
-                context['can_leave'] = membership.role not in ['owner', 'admin']
-            except Membership.DoesNotExist:
-                # Nie jest członkiem
-                context['user_membership'] = None
-                context['is_member'] = False
-                context['can_leave'] = False
-        else:
-            # Użytkownik niezalogowany
-            context['user_membership'] = None
-            context['is_member'] = False
-            context['can_leave'] = False
+        # (niezalogowany / nie-członek → None)
+        membership = get_membership_resolver(self.request.user).membership_in(self.object)
+        context['user_membership'] = membership
+        context['is_member'] = membership is not None
+        context['can_leave'] = membership is not None and membership.role not in ['owner', 'admin']
         return context
 
 class ProfileView(LoginRequiredMixin, TemplateView):
@@ -303,7 +424,7 @@ class ProfileView(LoginRequiredMixin, TemplateView):
         context['managed_communities'] = user.memberships.filter(
             is_active=True,
             role__in=['owner', 'admin']
-        ).select_related('community')
+        ).select_related('community').order_by('role_rank', '-joined_date')
         
         return context
 
@@ -363,24 +484,19 @@ class CommunityCreateView(LoginRequiredMixin, CreateView):
         """
         Wywoływane gdy formularz jest poprawnie wypełniony.
         
-        Tu ustawiamy created_by (twórca wspólnoty) na current user.
+        Wspólnota, członkostwo właściciela (current user) i tagi są zapisywane
+        razem, w jednej transakcji (patrz communities/services.py).
         """
         
         # Nie zapisuj jeszcze do bazy (commit=False)
         community = form.save(commit=False)
         
-        # Ustaw twórcę na zalogowanego użytkownika
-        community.created_by = self.request.user
-        
-        # Teraz zapisz do bazy
-        community.save()
-        
-        # Zapisz relacje ManyToMany (tagi)
-        # WAŻNE: form.save_m2m() musi być AFTER save()
-        form.save_m2m()
-        
-        # SIGNAL automatycznie utworzy Membership z rolą 'owner'!
-        # (sprawdź communities/signals.py)
+        # Zapisz wspólnotę + owner + tagi (created_by = zalogowany użytkownik)
+        self.object = services.create_community(
+            community,
+            owner=self.request.user,
+            tags=form.cleaned_data.get('tags') or (),
+        )
         
         # Komunikat sukcesu
         messages.success(
@@ -389,9 +505,8 @@ class CommunityCreateView(LoginRequiredMixin, CreateView):
         )
         
         # Przekieruj do profilu nowo utworzonej wspólnoty
-        self.success_url = reverse_lazy('communities:community_detail', kwargs={'pk': community.pk})
-        
-        return super().form_valid(form)
+        # (bez super().form_valid() - zapisałby wspólnotę i tagi drugi raz)
+        return redirect('communities:community_detail', pk=community.pk)
     
     def form_invalid(self, form):
         """
@@ -443,39 +558,51 @@ class CommunityManageView(CommunityLeaderRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Lista członków pogrupowana po rolach
-        context['owners'] = self.community.memberships.filter(
-            role='owner', is_active=True
-        ).select_related('person__person_profile')
-        
-        context['admins'] = self.community.memberships.filter(
-            role='admin', is_active=True
-        ).select_related('person__person_profile')
+        # Członkowie pogrupowani po rolach - jedno zapytanie, strona w każdej sekcji
+        # (patrz communities/members.py)
+        context['sections'] = load_member_sections(self.community, self.request.GET)
+        context['has_members'] = any(section.page.paginator.count for section in context['sections'])
+        context['search_query'] = self.request.GET.get('q', '').strip()
         
-        context['leaders'] = self.community.memberships.filter(
-            role__in=['leader', 'service_leader'], is_active=True
-        ).select_related('person__person_profile')
-        
-        context['members'] = self.community.memberships.filter(
-            role='member', is_active=True
-        ).select_related('person__person_profile')
-        
-        # Sprawdź rolę current user (co może robić)
-        user_membership = self.community.memberships.filter(
-            person=self.request.user, is_active=True
-        ).first()
+        # Sprawdź rolę current user (co może robić) - już pobraną przez mixin uprawnień
+        user_membership = get_membership_resolver(self.request.user).membership_in(self.community)
         
         context['user_membership'] = user_membership
         context['is_owner'] = user_membership and user_membership.role == 'owner'
         context['is_admin'] = user_membership and user_membership.role in ['owner', 'admin']
         context['is_leader'] = user_membership and user_membership.role in ['owner', 'admin', 'leader']
 
-        # Statystyki
-        context['total_members'] = self.community.get_member_count()
+        # Statystyki (zapisane liczniki - bez COUNT)
+        context['total_members'] = self.community.member_count
         
         return context
 
 
+class CommunityMemberExportView(CommunityLeaderRequiredMixin, View):
+    """
+    Eksport listy członków (CSV albo JSONL: ?format=jsonl).
+
+    Plik jest wysyłany strumieniowo - wiersze czytane kursorem po stronie serwera
+    (patrz communities/export.py), więc pamięć nie rośnie z liczbą członków.
+
+    Dostęp: owner, admin, leader
+    """
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            export_format = 'csv'
+        content_type, extension = EXPORT_FORMATS[export_format]
+
+        rows = member_export_rows(self.community)
+        response = StreamingHttpResponse(EXPORT_STREAMS[export_format](rows), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.community.slug}-czlonkowie.{extension}"'
+        )
+        response['Cache-Control'] = 'no-store'  # dane osobowe - nie trzymaj w cache
+        return response
+
+
 @login_required
 @require_POST
 def change_member_role(request, pk, membership_id):
@@ -494,88 +621,51 @@ def change_member_role(request, pk, membership_id):
     # Pobierz wspólnotę
     community = get_object_or_404(CommunityProfile, pk=pk, is_active=True)
     
-    # Pobierz członkostwo które chcemy zmienić
+    # Pobierz członkostwo które chcemy zmienić (z osobą - do komunikatu)
     membership = get_object_or_404(
-        Membership,
+        Membership.objects.select_related('person'),
         pk=membership_id,
         community=community,
         is_active=True
     )
     
     # Pobierz członkostwo current user (sprawdzamy jego uprawnienia)
-    try:
-        user_membership = Membership.objects.get(
-            person=request.user,
-            community=community,
-            is_active=True
-        )
-    except Membership.DoesNotExist:
+    user_membership = get_membership_resolver(request.user).membership_in(community)
+    if user_membership is None:
         messages.error(request, 'Nie jesteś członkiem tej wspólnoty.')
         return redirect('communities:community_detail', pk=pk)
     
     # Pobierz nową rolę z POST
     new_role = request.POST.get('role')
     
-    # WALIDACJA UPRAWNIEŃ
-    
-    # Nie można zmienić roli samemu sobie
-    if membership.person == request.user:
-        messages.error(request, 'Nie możesz zmienić własnej roli. Poproś innego admina.')
+    # WALIDACJA UPRAWNIEŃ (zasady - patrz communities/permissions.py)
+    # - Owner może nadać każdą rolę
+    # - Admin może zmieniać do leader (NIE admin/owner)
+    # - Leader NIE może zmieniać ról, nikt nie zmienia roli samemu sobie
+    error = role_change_error(user_membership, membership, new_role)
+    if error:
+        messages.error(request, error)
         return redirect('communities:community_manage', pk=pk)
     
-    # NOWE: Leader NIE może zmieniać ról
-    if user_membership.role == 'leader':
-        messages.error(
+    # SPECJALNY PRZYPADEK: Nadawanie owner
+    if new_role == 'owner':
+        # Ostrzeżenie - teraz będzie dwóch ownerów
+        messages.warning(
             request,
-            'Jako lider nie masz uprawnień do zmiany ról. '
-            'Role może zmieniać tylko właściciel lub administrator.'
+            f'⚠️ {membership.person.username} został właścicielem (owner). '
+            f'Teraz jest dwóch właścicieli tej wspólnoty.'
         )
-        return redirect('communities:community_manage', pk=pk)
-
-    # Owner może wszystko
-    if user_membership.role == 'owner':
-        # Owner może nadać każdą rolę
-        if new_role in dict(Membership.ROLE_CHOICES):
-            
-            # SPECJALNY PRZYPADEK: Nadawanie owner
-            if new_role == 'owner':
-                # Ostrzeżenie - teraz będzie dwóch ownerów
-                messages.warning(
-                    request,
-                    f'⚠️ {membership.person.username} został właścicielem (owner). '
-                    f'Teraz jest dwóch właścicieli tej wspólnoty.'
-                )
-            
-            membership.role = new_role
-            membership.save()
-            
-            messages.success(
-                request,
-                f'✅ Zmieniono rolę {membership.person.username} na {membership.get_role_display()}.'
-            )
-        else:
-            messages.error(request, 'Nieprawidłowa rola.')
-    
-    # Admin może zmieniać do leader (NIE admin/owner)
-    elif user_membership.role == 'admin':
-        if new_role in ['member', 'service_leader', 'leader']:
-            membership.role = new_role
-            membership.save()
-            
-            messages.success(
-                request,
-                f'✅ Zmieniono rolę {membership.person.username} na {membership.get_role_display()}.'
-            )
-        else:
-            messages.error(
-                request,
-                'Jako administrator możesz nadawać role tylko do poziomu Leader. '
-                'Role Admin/Owner może nadać tylko właściciel.'
-            )
     
-    else:
-        # Ani owner ani admin - brak uprawnień
-        messages.error(request, 'Nie masz uprawnień do zmiany ról.')
+    old_role = membership.role
+    membership.role = new_role
+    with transaction.atomic():
+        membership.save()
+        counters.membership_role_changed(community.pk, old_role, new_role)
+    
+    messages.success(
+        request,
+        f'✅ Zmieniono rolę {membership.person.username} na {membership.get_role_display()}.'
+    )
     
     return redirect('communities:community_manage', pk=pk)
 
@@ -596,68 +686,121 @@ def remove_member(request, pk, membership_id):
     community = get_object_or_404(CommunityProfile, pk=pk, is_active=True)
     
     membership = get_object_or_404(
-        Membership,
+        Membership.objects.select_related('person'),
         pk=membership_id,
         community=community,
         is_active=True
     )
-        # Pobierz członkostwo current user
-    try:
-        user_membership = Membership.objects.get(
-            person=request.user,
-            community=community,
-            is_active=True
-        )
-    except Membership.DoesNotExist:
+    # Pobierz członkostwo current user
+    user_membership = get_membership_resolver(request.user).membership_in(community)
+    if user_membership is None:
         messages.error(request, 'Nie jesteś członkiem tej wspólnoty.')
         return redirect('communities:community_detail', pk=pk)
     
     # Sprawdź uprawnienia - owner/admin/leader
-    if user_membership.role not in ['owner', 'admin', 'leader']:
+    if user_membership.role not in MANAGER_ROLES:
         messages.error(request, 'Nie masz uprawnień do zarządzania członkami.')
         return redirect('communities:community_detail', pk=pk)
-
-    # # Sprawdź uprawnienia current user
-    # if not community.user_can_edit(request.user):
-    #     messages.error(request, 'Nie masz uprawnień do zarządzania członkami.')
-    #     return redirect('communities:community_detail', pk=pk)
-    
-    # WALIDACJA
-    
-    # Nie można usunąć samego siebie (użyj "Opuść wspólnotę")
-    if membership.person == request.user:
-        messages.error(
-            request,
-            'Nie możesz usunąć samego siebie. Użyj przycisku "Opuść wspólnotę".'
-        )
-        return redirect('communities:community_manage', pk=pk)
     
-    # Nie można usunąć owner (owner musi sam opuścić lub przekazać uprawnienia)
-    if membership.role == 'owner':
-        messages.error(
-            request,
-            'Nie można usunąć właściciela (owner). '
-            'Właściciel musi sam opuścić wspólnotę lub przekazać uprawnienia.'
-        )
+    # WALIDACJA (zasady - patrz communities/permissions.py)
+    # - Nie można usunąć samego siebie (użyj "Opuść wspólnotę")
+    # - Nie można usunąć owner (owner musi sam opuścić lub przekazać uprawnienia)
+    # - Leader może usunąć tylko zwykłych członków (nie admin/leader)
+    error = removal_error(user_membership, membership)
+    if error:
+        messages.error(request, error)
         return redirect('communities:community_manage', pk=pk)
-    
-    # NOWE: Leader może usunąć tylko zwykłych członków (nie admin/leader)
-    if user_membership.role == 'leader': 
-        if membership.role in ['admin', 'leader', 'service_leader']:
-            messages.error(
-                request,
-                'Jako lider możesz usuwać tylko zwykłych członków. '
-                'Administratorów i innych liderów może usunąć tylko właściciel lub administrator.'
-            )
-            return redirect('communities:community_manage', pk=pk)
 
     # Usuń członka
     member_name = membership.person.username
-    membership.delete()
+    with transaction.atomic():
+        membership.delete()
+        counters.membership_removed(community.pk, membership.role)
     
     messages.success(
         request,
         f'✅ Użytkownik {member_name} został usunięty ze wspólnoty.'
     )
     
-    return redirect('communities:community_manage', pk=pk)
\ No newline at end of file
+    return redirect('communities:community_manage', pk=pk)
+
+# Akcje zbiorcze w panelu zarządzania
+BULK_MEMBER_ACTIONS = {
+    'remove': 'Usunięto',
+    'deactivate': 'Dezaktywowano',
+    'set_role': 'Zmieniono rolę',
+}
+
+
+@login_required
+@require_POST
+def bulk_member_action(request, pk):
+    """
+    Akcja na wielu członkach naraz (zaznaczonych w panelu zarządzania).
+
+    POST:
+        action - 'remove' | 'deactivate' | 'set_role'
+        membership_ids - ID zaznaczonych członkostw (wiele)
+        role - nowa rola (tylko dla set_role)
+
+    Te same zasady co przy pojedynczych akcjach (communities/permissions.py),
+    sprawdzane w pamięci dla każdego członka. Członkowie, których nie wolno
+    zmienić, są pomijani (z komunikatem). Reszta - jedno zapytanie
+    UPDATE/DELETE w jednej transakcji (communities/services.py).
+    """
+    community = get_object_or_404(CommunityProfile, pk=pk, is_active=True)
+
+    user_membership = get_membership_resolver(request.user).membership_in(community)
+    if user_membership is None:
+        messages.error(request, 'Nie jesteś członkiem tej wspólnoty.')
+        return redirect('communities:community_detail', pk=pk)
+
+    if user_membership.role not in MANAGER_ROLES:
+        messages.error(request, 'Nie masz uprawnień do zarządzania członkami.')
+        return redirect('communities:community_detail', pk=pk)
+
+    action = request.POST.get('action')
+    new_role = request.POST.get('role')
+    membership_ids = [value for value in request.POST.getlist('membership_ids') if value.isdigit()]
+    if action not in BULK_MEMBER_ACTIONS:
+        messages.error(request, 'Wybierz akcję.')
+        return redirect('communities:community_manage', pk=pk)
+    if not membership_ids:
+        messages.warning(request, 'Nie zaznaczono żadnych członków.')
+        return redirect('communities:community_manage', pk=pk)
+
+    with transaction.atomic():
+        # Zablokuj wiersze - liczniki liczone z tych ról muszą się zgadzać
+        targets = list(
+            Membership.objects
+            .select_for_update()
+            .filter(community=community, pk__in=membership_ids, is_active=True)
+            .only('pk', 'person_id', 'role')
+        )
+
+        allowed, skipped = [], {}
+        for target in targets:
+            if action == 'set_role':
+                error = role_change_error(user_membership, target, new_role)
+            else:
+                error = removal_error(user_membership, target)
+            if error:
+                skipped[error] = skipped.get(error, 0) + 1
+            else:
+                allowed.append(target)
+
+        if action == 'remove':
+            changed = services.remove_memberships(community.pk, allowed)
+        elif action == 'deactivate':
+            changed = services.deactivate_memberships(community.pk, allowed)
+        else:
+            changed = services.set_memberships_role(community.pk, allowed, new_role)
+
+    if changed:
+        messages.success(request, f'✅ {BULK_MEMBER_ACTIONS[action]}: {changed} członków.')
+    elif not skipped:
+        messages.info(request, 'Nic nie zostało zmienione.')
+    for error, count in skipped.items():
+        messages.warning(request, f'Pominięto {count}: {error}')
+
+    return redirect('communities:community_manage', pk=pk)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 # from decouple import config, Csv
@@ -29,6 +30,8 @@ load_dotenv(BASE_DIR / '.env')
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 # print("DEBUG =", DEBUG, type(DEBUG)) sanity check xD
 DB_LIVE = os.getenv("DB_LIVE", "False").lower() == "true"
+# Uruchomione przez `python manage.py test` albo pytest
+TESTING = (len(sys.argv) > 1 and sys.argv[1] == 'test') or 'pytest' in sys.modules
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -69,6 +72,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # PostgreSQL - wyszukiwanie pełnotekstowe, indeksy GIN
+    'django.contrib.postgres',
     # Apps
     # 'communities',
     'communities.apps.CommunitiesConfig', # - zamiast 'communities'
@@ -83,6 +88,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Pomiar czasu requestów: Server-Timing + log (communities/middleware.py)
+    'communities.middleware.PerformanceTimingMiddleware',
+    # Wykrywanie N+1 (testy: błąd, staging: ostrzeżenie w logu, produkcja: wyłączone)
+    'communities.middleware.NPlusOneMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -140,6 +149,69 @@ else:
         'PORT': '5432',
         }
     }
+# ===========================================================================
+# CACHE
+# ===========================================================================
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Cache katalogu wspólnot, podpowiedzi, ról użytkowników (communities/permissions.py).
+
+if DB_LIVE:
+    # Produkcja - pliki na dysku, WSPÓLNE dla wszystkich workerów gunicorna
+    # (unieważnienie cache w jednym workerze widzą wszystkie)
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', '/tmp/portal_united_cache'),
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    # Lokalnie i w testach - pamięć procesu
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'portal-united',
+        }
+    }
+# ===========================================================================
+# POMIAR WYDAJNOŚCI + LOGOWANIE
+# ===========================================================================
+# Jaka część requestów jest mierzona (PerformanceTimingMiddleware), 1.0 = wszystkie
+PERF_TIMING_SAMPLE_RATE = float(os.getenv('PERF_TIMING_SAMPLE_RATE', '1.0'))
+# Nagłówek Server-Timing w odpowiedzi (czasy widoczne w DevTools)
+# Domyślnie tylko lokalnie - na produkcji zdradzałby liczbę zapytań i czasy każdemu
+PERF_TIMING_HEADER = os.getenv('PERF_TIMING_HEADER', str(DEBUG)).lower() == 'true'
+
+# Wykrywanie N+1 (NPlusOneMiddleware): 'raise' / 'warn' / 'off'
+# Staging: NPLUSONE_MODE=warn (ostrzeżenie ze stosem wywołań w logu)
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', 'raise' if TESTING else ('warn' if DEBUG else 'off'))
+# Ile zapytań o tym samym kształcie w jednym requeście to już N+1
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', '10'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '{asctime} {levelname} {name} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        # Logi aplikacji (tworzenie wspólnot, podpowiedzi...) i pomiary requestów
+        'communities': {
+            'handlers': ['console'],
+            'level': os.getenv('COMMUNITIES_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # ===========================================================================
 # STATIC FILES (CSS, JavaScript, Images)
 # ===========================================================================
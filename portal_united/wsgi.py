@@ -17,4 +17,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portal_united.settings')
 # Poczekaj 3 sekundy na bazę danych (Railway workaround)
 time.sleep(3)
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Zbuduj indeks podpowiedzi (typeahead) od razu przy starcie workera,
+# żeby pierwsze wpisywanie w wyszukiwarkę nie czekało na bazę
+from communities.typeahead import typeahead_index  # noqa: E402
+
+typeahead_index.warm()